@@ -0,0 +1,8 @@
+"""
+Ferramentas de avaliação dos scripts Mininet-WiFi gerados por LGEs.
+
+Os módulos deste pacote automatizam as etapas descritas no README:
+geração dos scripts a partir dos prompts, validação e consolidação
+dos resultados. Todos podem ser executados a partir da raiz do
+repositório com ``python3 -m avaliacao.<modulo>``.
+"""
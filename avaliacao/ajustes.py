@@ -0,0 +1,404 @@
+"""
+Esforço de correção dos scripts: diferença mínima entre a versão gerada
+e a versão corrigida à mão.
+
+A versão corrigida fica ao lado do script gerado, com o sufixo
+``.corrigido.py`` (``scripts/basico/d_gpt1.corrigido.py``). As duas
+ASTs são comparadas com um casamento no estilo do GumTree:
+
+1. de cima para baixo, subárvores idênticas (mesmo hash) são casadas,
+   das mais altas para as mais baixas;
+2. de baixo para cima, nós ainda livres são casados com o nó do mesmo
+   tipo que contém a maioria dos parceiros dos seus filhos;
+3. os filhos livres de cada par casado são alinhados por tipo com
+   ``difflib``, o que revela renomeações e mudanças de valor.
+
+Do casamento sai o script de edição (atualizar, inserir, remover,
+mover) e a classificação do esforço, seguindo o README: ajustes
+*pequenos* mexem só em imports, nomes e parâmetros (ou removem uma
+instrução simples de uma linha, como a chamada a um método
+inexistente); qualquer outra mudança é *estrutural*. O corpus inteiro
+é processado em paralelo, e o resultado pode ir para o repositório de
+resultados (colunas ``needs_adjustment`` e ``adjustment``).
+
+Exemplo::
+
+    python3 -m avaliacao.ajustes comparar scripts/basico/d_gpt1.py \\
+        scripts/basico/d_gpt1.corrigido.py
+    python3 -m avaliacao.ajustes corpus scripts --gravar
+"""
+
+import argparse
+import ast
+import difflib
+import os
+import shutil
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from avaliacao import cenarios, resultados
+
+FIXED_SUFFIX = '.corrigido.py'
+
+NONE = 'nenhum'
+SMALL = 'pequeno'
+STRUCTURAL = 'estrutural'
+# A versão corrigida não compila: não há como medir o esforço
+UNKNOWN = 'indeterminado'
+
+UPDATE = 'atualizar'
+INSERT = 'inserir'
+DELETE = 'remover'
+MOVE = 'mover'
+
+# Nós cujas inserções/remoções contam como ajuste pequeno
+IMPORT_KINDS = {'Import', 'ImportFrom', 'alias'}
+PARAMETER_KINDS = {'keyword', 'Constant'}
+SIMPLE_STATEMENTS = {'Expr', 'Assign', 'AugAssign', 'AnnAssign', 'Pass'}
+
+# Valor guardado para cada tipo de nó (o resto só tem tipo)
+_VALUE_FIELDS = {
+    'Name': 'id', 'Attribute': 'attr', 'keyword': 'arg', 'arg': 'arg',
+    'FunctionDef': 'name', 'AsyncFunctionDef': 'name', 'ClassDef': 'name',
+    'ImportFrom': 'module', 'Global': 'names', 'Nonlocal': 'names',
+}
+
+
+class Node:
+    "Nó da árvore comparada (AST sem contextos Load/Store)."
+
+    __slots__ = ('kind', 'value', 'children', 'parent', 'line', 'end_line',
+                 'hash', 'height', 'size', 'order', 'partner')
+
+    def __init__(self, kind, value, line, end_line, parent):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.end_line = end_line
+        self.parent = parent
+        self.children = []
+        self.partner = None
+
+    def descendants(self):
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children)
+
+
+def _value(node):
+    if isinstance(node, ast.Constant):
+        return repr(node.value)
+    if isinstance(node, ast.alias):
+        return node.name + (' as %s' % node.asname if node.asname else '')
+    value = getattr(node, _VALUE_FIELDS.get(type(node).__name__, ''), None)
+    if isinstance(value, list):
+        return ','.join(value)
+    return value
+
+
+def build_tree(source):
+    "Árvore a partir do código; nós em pré-ordem na lista devolvida."
+    tree = ast.parse(source)
+    nodes = []
+
+    def visit(node, parent, line):
+        line = getattr(node, 'lineno', line)
+        end = getattr(node, 'end_lineno', line) or line
+        current = Node(type(node).__name__, _value(node), line, end, parent)
+        current.order = len(nodes)
+        nodes.append(current)
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.expr_context, ast.boolop, ast.operator,
+                                  ast.unaryop, ast.cmpop)):
+                # Operadores viram parte do valor do nó pai
+                current.value = (current.value or '') + type(child).__name__
+                continue
+            current.children.append(visit(child, current, line))
+        return current
+
+    visit(tree, None, 1)
+    for node in reversed(nodes):
+        node.height = 1 + max((c.height for c in node.children), default=0)
+        node.size = 1 + sum(c.size for c in node.children)
+        node.hash = hash((node.kind, node.value,
+                          tuple(c.hash for c in node.children)))
+    return nodes
+
+
+def _link(a, b):
+    a.partner, b.partner = b, a
+
+
+def _link_subtree(a, b):
+    stack = [(a, b)]
+    while stack:
+        x, y = stack.pop()
+        _link(x, y)
+        stack.extend(zip(x.children, y.children))
+
+
+def match_top_down(old, new, min_height=2):
+    "Casa subárvores idênticas, das mais altas para as mais baixas."
+    candidates = {}
+    for node in new:
+        if node.height >= min_height:
+            candidates.setdefault(node.hash, []).append(node)
+    total_old, total_new = len(old), len(new)
+    for node in sorted(old, key=lambda n: (-n.height, n.order)):
+        if node.partner or node.height < min_height:
+            continue
+        free = [c for c in candidates.get(node.hash, ()) if not c.partner]
+        if not free:
+            continue
+        # Entre cópias idênticas, prefere a de posição relativa mais próxima
+        best = min(free, key=lambda c: abs(c.order / total_new
+                                           - node.order / total_old))
+        _link_subtree(node, best)
+
+
+def match_bottom_up(old, new):
+    """Casa nós livres com o nó do mesmo tipo que contém a maioria dos
+    parceiros dos seus filhos (coeficiente de Dice ≥ 0,5)."""
+    _link(old[0], new[0])
+    for node in sorted(old, key=lambda n: -n.order):
+        if node.partner or not node.children:
+            continue
+        votes = Counter(c.partner.parent for c in node.children
+                        if c.partner and c.partner.parent)
+        for candidate, common in votes.most_common():
+            if candidate.partner or candidate.kind != node.kind:
+                continue
+            dice = 2 * common / (len(node.children)
+                                 + len(candidate.children))
+            if dice >= 0.5:
+                _link(node, candidate)
+            break
+
+
+def recover(old, new):
+    "Alinha com ``difflib`` os filhos livres de cada par casado."
+    queue = deque((n, n.partner) for n in old if n.partner)
+    while queue:
+        a, b = queue.popleft()
+        free_a = [c for c in a.children if not c.partner]
+        free_b = [c for c in b.children if not c.partner]
+        if not free_a or not free_b:
+            continue
+        matcher = difflib.SequenceMatcher(
+            None, [c.kind for c in free_a], [c.kind for c in free_b],
+            autojunk=False)
+        for i, j, size in matcher.get_matching_blocks():
+            for x, y in zip(free_a[i:i + size], free_b[j:j + size]):
+                _link(x, y)
+                queue.append((x, y))
+
+
+@dataclass
+class Operation:
+    "Uma edição do script mínimo."
+    action: str
+    kind: str
+    line: int
+    detail: str = ''
+    size: int = 1
+    small: bool = False
+
+    def __str__(self):
+        text = '%4d: %-9s %s' % (self.line, self.action, self.kind)
+        if self.detail:
+            text += ' ' + self.detail
+        return text
+
+
+def _statement(node):
+    while node.parent and node.parent.kind != 'Module' and not (
+            node.kind in SIMPLE_STATEMENTS or node.kind in IMPORT_KINDS):
+        node = node.parent
+    return node
+
+
+def _small(action, node):
+    "Se a edição é um ajuste pequeno (imports, nomes, parâmetros)."
+    if _statement(node).kind in IMPORT_KINDS:
+        return True
+    if action == UPDATE:
+        return True
+    if action in (INSERT, DELETE) and node.kind in PARAMETER_KINDS:
+        return True
+    if action == DELETE and node.kind in SIMPLE_STATEMENTS:
+        return node.line == node.end_line
+    return False
+
+
+def edit_script(old, new):
+    "Edições que transformam a árvore ``old`` na ``new``."
+    ops = []
+    for a in old:
+        b = a.partner
+        if b is None:
+            if a.parent is not None and a.parent.partner:
+                ops.append(Operation(DELETE, a.kind, a.line, a.value or '',
+                                     a.size, _small(DELETE, a)))
+            continue
+        if a.value != b.value:
+            ops.append(Operation(UPDATE, a.kind, b.line,
+                                 '%s -> %s' % (a.value, b.value), 1,
+                                 _small(UPDATE, a)))
+        if (a.parent is not None and b.parent is not None
+                and a.parent.partner is not b.parent):
+            ops.append(Operation(MOVE, a.kind, b.line, a.value or '', a.size,
+                                 False))
+    for b in new:
+        if b.partner is None and b.parent is not None and b.parent.partner:
+            ops.append(Operation(INSERT, b.kind, b.line, b.value or '', b.size,
+                                 _small(INSERT, b)))
+    return sorted(ops, key=lambda op: (op.line, op.action))
+
+
+@dataclass
+class Patch:
+    "Diferença entre um script gerado e a versão corrigida."
+    path: str
+    fixed: str
+    operations: list = field(default_factory=list)
+    effort: str = NONE
+    nodes: int = 0
+    duration: float = 0.0
+    error: str = None
+
+    def summary(self):
+        counts = Counter(op.action for op in self.operations)
+        return ', '.join('%d %s' % (n, a) for a, n in sorted(counts.items()))
+
+
+def compare(path, fixed):
+    "Script de edição e esforço para transformar ``path`` em ``fixed``."
+    start = time.time()
+    patch = Patch(path, fixed)
+    try:
+        old = build_tree(cenarios.read_text(path))
+    except SyntaxError:
+        # O script gerado nem compila: conta como texto (sempre estrutural
+        # se mudou mais que uma linha).
+        lines = list(difflib.unified_diff(
+            cenarios.read_text(path).splitlines(),
+            cenarios.read_text(fixed).splitlines(), n=0))
+        changed = [l for l in lines[2:] if l[:1] in '+-']
+        patch.nodes = len(changed)
+        patch.effort = SMALL if len(changed) <= 2 else STRUCTURAL
+        patch.error = 'script gerado não compila'
+        patch.duration = time.time() - start
+        return patch
+    try:
+        new = build_tree(cenarios.read_text(fixed))
+    except SyntaxError as exc:
+        patch.effort = UNKNOWN
+        patch.error = 'versão corrigida não compila: %s' % exc
+        patch.duration = time.time() - start
+        return patch
+    match_top_down(old, new)
+    match_bottom_up(old, new)
+    recover(old, new)
+    patch.operations = edit_script(old, new)
+    patch.nodes = sum(op.size for op in patch.operations)
+    if patch.operations:
+        patch.effort = (SMALL if all(op.small for op in patch.operations)
+                        else STRUCTURAL)
+    patch.duration = time.time() - start
+    return patch
+
+
+def fixed_path(path):
+    "Caminho da versão corrigida de um script gerado."
+    return path[:-3] + FIXED_SUFFIX
+
+
+def corpus_pairs(root=cenarios.SCRIPTS_DIR):
+    "Pares (gerado, corrigido) com versão corrigida no diretório."
+    return [(p, fixed_path(p)) for p in cenarios.generated_scripts(root)
+            if os.path.exists(fixed_path(p))]
+
+
+def _compare(pair):
+    return compare(*pair)
+
+
+def compare_all(pairs, workers=None):
+    "Compara todos os pares em processos paralelos."
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_compare, pairs, chunksize=4))
+
+
+def record(patch):
+    "Registro do estágio ``ajuste`` para o repositório de resultados."
+    rec = resultados.RunRecord.for_script('ajuste', patch.path)
+    if patch.effort != UNKNOWN:
+        rec.needs_adjustment = bool(patch.operations) or patch.nodes > 0
+        rec.adjustment = patch.effort if rec.needs_adjustment else None
+    rec.duration = patch.duration
+    rec.metrics = {'edicoes': (len(patch.operations), 'operacoes'),
+                   'nos_alterados': (patch.nodes, 'nos')}
+    rec.artifacts = [('corrigido', os.path.abspath(patch.fixed))]
+    rec.extra = {'operacoes': [str(op) for op in patch.operations],
+                 'erro': patch.error}
+    return rec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.ajustes',
+        description='Esforço de correção: diferença mínima entre a AST '
+                    'gerada e a corrigida.')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    cmp_ = sub.add_parser('comparar', help='compara dois scripts')
+    cmp_.add_argument('gerado')
+    cmp_.add_argument('corrigido', nargs='?',
+                      help='padrão: <gerado>%s' % FIXED_SUFFIX)
+    reg = sub.add_parser('registrar',
+                         help='guarda a versão corrigida ao lado do script')
+    reg.add_argument('gerado')
+    reg.add_argument('corrigido')
+    reg.add_argument('--sobrescrever', action='store_true')
+    cor = sub.add_parser('corpus', help='compara todo o corpus')
+    cor.add_argument('raiz', nargs='?', default=cenarios.SCRIPTS_DIR)
+    cor.add_argument('--paralelo', type=int)
+    cor.add_argument('--gravar', action='store_true',
+                     help='grava no repositório de resultados')
+    cor.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'registrar':
+        target = fixed_path(args.gerado)
+        if os.path.exists(target) and not args.sobrescrever:
+            parser.error('%s já existe (use --sobrescrever)' % target)
+        shutil.copyfile(args.corrigido, target)
+        print(target)
+        return 0
+    if args.comando == 'comparar':
+        patch = compare(args.gerado, args.corrigido or
+                        fixed_path(args.gerado))
+        for op in patch.operations:
+            print(op)
+        print('esforço: %s (%d nós; %s)' % (patch.effort, patch.nodes,
+                                            patch.error or patch.summary()
+                                            or '-'))
+        return 0
+    patches = compare_all(corpus_pairs(args.raiz), args.paralelo)
+    for patch in patches:
+        print('%-40s %-10s %4d nós  %s' % (
+            os.path.relpath(patch.path), patch.effort, patch.nodes,
+            patch.error if patch.effort == UNKNOWN else patch.summary()))
+    if args.gravar:
+        store = resultados.ResultsStore(args.banco)
+        store.append_many([record(p) for p in patches])
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
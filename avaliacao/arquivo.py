@@ -0,0 +1,316 @@
+"""
+Arquivo comprimido dos logs de cada execução, com índice invertido.
+
+Cada execução produz a saída do Mininet-WiFi, os logs do hostapd e do
+wpa_supplicant, do Open vSwitch e os ``/tmp/*.log`` dos próprios
+scripts, que se perdem ou são sobrescritos na execução seguinte. O
+executor (``avaliacao.execucao --arquivo``) guarda cada log como um
+quadro zstd independente, anexado a segmentos de até ``SEGMENT_SIZE``
+bytes, e indexa em SQLite os termos, a origem (``fonte:hostapd``), os
+nós citados no nome ou no texto do arquivo (``no:ap2``) e as
+assinaturas das linhas de erro (``sig:<hash>``). Uma consulta intersecta
+as listas de ocorrência no índice e só descomprime os logs encontrados.
+
+Requer zstd: ``compression.zstd`` (Python 3.14+) ou o pacote
+``zstandard``.
+
+Exemplo::
+
+    python3 -m avaliacao.arquivo buscar fonte:hostapd no:ap2 failed
+"""
+
+import argparse
+import fcntl
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from avaliacao import resultados
+from avaliacao.erros import normalize_message
+
+DEFAULT_DIR = os.path.join(resultados.DEFAULT_DIR, 'arquivo')
+SEGMENT_SIZE = 64 * 1024 * 1024
+LEVEL = 10
+
+# Logs coletados após cada execução (além da saída do script)
+LOG_SOURCES = ('/tmp/*.log', '/tmp/*.apconf', '/tmp/*.staconf',
+               '/var/log/openvswitch/ovs-vswitchd.log',
+               '/var/log/openvswitch/ovsdb-server.log')
+
+# Pontuação no fim do termo (``Error:``, ``ap2-wlan1:``) não faz parte dele
+TOKEN_RE = re.compile(r'[a-z0-9_][a-z0-9_.:-]{1,63}')
+TOKEN_END = '.:-'
+# ``mn3_ap1`` (nome com o prefixo do rádio da execução) cita ``ap1``
+NODE_RE = re.compile(r'(?<![a-z0-9:.])((?:sta|ap|car|h|s|c|r)\d+)(?![0-9])')
+ERROR_LINE_RE = re.compile(r'error|fail|traceback|exception|denied|'
+                           r'refused|timeout|invalid|could not|cannot',
+                           re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_run ON entries(run_id);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    entry INTEGER NOT NULL,
+    PRIMARY KEY (token, entry)
+) WITHOUT ROWID;
+"""
+
+
+def _codec():
+    "Funções ``(comprimir, descomprimir)`` do zstd disponível."
+    try:
+        from compression import zstd
+        return (lambda data: zstd.compress(data, level=LEVEL),
+                zstd.decompress)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError('zstd indisponível: use Python 3.14+ '
+                           '(compression.zstd) ou instale o pacote '
+                           'zstandard') from None
+    compressor = zstandard.ZstdCompressor(level=LEVEL)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def source_of(name):
+    "Origem do log deduzida do nome do arquivo."
+    lower = name.lower()
+    if 'hostapd' in lower or lower.endswith('.apconf'):
+        return 'hostapd'
+    if 'wpa' in lower or lower.endswith('.staconf'):
+        return 'wpa_supplicant'
+    if 'ovs' in lower:
+        return 'ovs'
+    if lower.startswith('saida'):
+        return 'mininet'
+    return 'script'
+
+
+def line_signature(line):
+    "Hash de uma linha de erro normalizada (sem números, caminhos...)."
+    text = normalize_message(line.lower())
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def tokens(name, text):
+    "Termos indexados de um log."
+    lower = text.lower()
+    found = {t for t in (t.rstrip(TOKEN_END) for t in TOKEN_RE.findall(lower))
+             if len(t) > 1}
+    found.add('fonte:' + source_of(name))
+    found.add('arquivo:' + os.path.basename(name).lower())
+    for node in NODE_RE.findall(os.path.basename(name).lower() + '\n' + lower):
+        found.add('no:' + node)
+    for line in set(text.splitlines()):
+        if ERROR_LINE_RE.search(line):
+            found.add('sig:' + line_signature(line))
+    return found
+
+
+class LogCollector:
+    """Coleta os logs criados ou aumentados durante uma execução.
+
+    ``snapshot()`` antes da execução guarda o tamanho de cada arquivo;
+    ``collect()`` depois devolve só o trecho novo dos que cresceram (os
+    logs do OVS são compartilhados entre execuções)."""
+
+    def __init__(self, patterns=LOG_SOURCES):
+        self.patterns = patterns
+        self.before = {}
+
+    def _files(self):
+        for pattern in self.patterns:
+            for path in glob.glob(pattern):
+                if os.path.isfile(path):
+                    yield path
+
+    def snapshot(self):
+        self.before = {}
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            self.before[path] = (st.st_size, st.st_mtime)
+
+    def collect(self):
+        logs = []
+        for path in self._files():
+            try:
+                st = os.stat(path)
+                size, mtime = self.before.get(path, (0, None))
+                if (st.st_size, st.st_mtime) == (size, mtime):
+                    continue
+                if st.st_size < size:
+                    # Arquivo recriado: guarda o conteúdo todo
+                    size = 0
+                with open(path, 'rb') as f:
+                    f.seek(size)
+                    logs.append((path, f.read()))
+            except OSError:
+                continue
+        return logs
+
+
+class LogArchive:
+    "Segmentos zstd anexáveis e índice invertido em SQLite."
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.compress, self.decompress = _codec()
+        self.db = sqlite3.connect(os.path.join(directory, 'indice.sqlite'),
+                                  timeout=60, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, 'seg-%06d.zst' % number)
+
+    def _append(self, frames):
+        """Anexa quadros ao segmento atual sob trava de arquivo;
+        devolve ``(segmento, [deslocamentos])``."""
+        with open(os.path.join(self.directory, '.trava'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            segments = sorted(glob.glob(os.path.join(self.directory,
+                                                     'seg-*.zst')))
+            number = int(segments[-1][-10:-4]) if segments else 0
+            path = self._segment_path(number)
+            if (os.path.exists(path)
+                    and os.path.getsize(path) >= SEGMENT_SIZE):
+                number += 1
+                path = self._segment_path(number)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                offsets = []
+                for frame in frames:
+                    offsets.append(offset)
+                    f.write(frame)
+                    offset += len(frame)
+        return number, offsets
+
+    def add(self, run_id, logs):
+        "Arquiva ``[(nome, bytes)]`` de uma execução."
+        logs = [(name, data if isinstance(data, bytes) else data.encode())
+                for name, data in logs if data]
+        if not logs:
+            return 0
+        frames = [self.compress(data) for _, data in logs]
+        segment, offsets = self._append(frames)
+        now = time.time()
+        with self.lock, self.db:
+            for (name, data), frame, offset in zip(logs, frames, offsets):
+                cur = self.db.execute(
+                    'INSERT INTO entries (run_id, name, source, segment, '
+                    'offset, length, size, created) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, name, source_of(os.path.basename(name)),
+                     segment, offset, len(frame), len(data), now))
+                text = data.decode('utf-8', errors='replace')
+                self.db.executemany(
+                    'INSERT OR IGNORE INTO postings VALUES (?, ?)',
+                    [(t, cur.lastrowid) for t in tokens(name, text)])
+        return len(logs)
+
+    def read(self, entry):
+        "Conteúdo de uma entrada (descomprime só o quadro dela)."
+        segment, offset, length = self.db.execute(
+            'SELECT segment, offset, length FROM entries WHERE id = ?',
+            (entry,)).fetchone()
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return self.decompress(f.read(length)).decode(
+                'utf-8', errors='replace')
+
+    def search(self, terms, limit=100):
+        """Entradas que contêm todos os termos:
+        ``[(id, run_id, nome, fonte)]``, das mais recentes."""
+        terms = sorted({t.lower() for t in terms})
+        if not terms:
+            return []
+        marks = ', '.join('?' * len(terms))
+        return self.db.execute(
+            'SELECT e.id, e.run_id, e.name, e.source FROM entries e '
+            'JOIN (SELECT entry FROM postings WHERE token IN (%s) '
+            'GROUP BY entry HAVING COUNT(*) = ?) p ON p.entry = e.id '
+            'ORDER BY e.created DESC LIMIT ?' % marks,
+            terms + [len(terms), limit]).fetchall()
+
+    def lines(self, entry, terms):
+        "Linhas da entrada que contêm algum dos termos livres."
+        words = [t.lower() for t in terms if ':' not in t]
+        return [line for line in self.read(entry).splitlines()
+                if any(w in line.lower() for w in words)]
+
+    def close(self):
+        self.db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.arquivo',
+        description='Arquivo comprimido dos logs das execuções.')
+    parser.add_argument('--diretorio', default=DEFAULT_DIR)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    find = sub.add_parser('buscar', help='busca logs por termos (E lógico)')
+    find.add_argument('termos', nargs='+',
+                      help='palavras, fonte:X, no:X, arquivo:X ou sig:X')
+    find.add_argument('--limite', type=int, default=100)
+    find.add_argument('--trechos', action='store_true',
+                      help='mostra as linhas com as palavras buscadas')
+    show = sub.add_parser('mostrar', help='mostra os logs de uma execução')
+    show.add_argument('execucao')
+    add = sub.add_parser('adicionar', help='arquiva arquivos de log')
+    add.add_argument('execucao')
+    add.add_argument('arquivos', nargs='+')
+    args = parser.parse_args(argv)
+    try:
+        archive = LogArchive(args.diretorio)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if args.comando == 'buscar':
+        for entry, run_id, name, source in archive.search(args.termos,
+                                                          args.limite):
+            print('%s  %-14s %s' % (run_id, source, name))
+            if args.trechos:
+                for line in archive.lines(entry, args.termos):
+                    print('    ' + line)
+    elif args.comando == 'mostrar':
+        for (entry, name) in archive.db.execute(
+                'SELECT id, name FROM entries WHERE run_id = ? ORDER BY id',
+                (args.execucao,)):
+            print('==> %s <==' % name)
+            print(archive.read(entry))
+    else:
+        logs = []
+        for path in args.arquivos:
+            with open(path, 'rb') as f:
+                logs.append((path, f.read()))
+        print('%d logs arquivados' % archive.add(args.execucao, logs))
+    archive.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Auditoria, em tempo de execução, dos parâmetros nomeados dos scripts.
+
+O Mininet-WiFi aceita ``**params`` nos nós e links: opções alucinadas
+(``autoTxPower=True``, ``associationMethod='new'``, ``use_htb=True`` num
+link sem fio) são ignoradas em silêncio e o script parece funcionar.
+Os ganchos (``avaliacao.ganchos``) envolvem as chamadas ``add*`` da
+rede e o atributo ``params`` de nós e interfaces, onde a biblioteca
+guarda esses parâmetros, e registram as chaves que ela lê. Ao final da
+execução, cada chave passada pelo script é:
+
+* consumida, se a biblioteca a leu (``params['x']``, ``get``, ``in``,
+  ``pop``), percorreu ``params`` ou o repassou (``f(**params)``) ou se ela corresponde a um parâmetro nomeado do método
+  chamado ou de ``__init__``/``config`` das classes criadas (o
+  ``TCIntf.config(bw=..., delay=...)`` recebe as chaves por ``**``);
+* ignorada, se ficou guardada em ``params`` sem nenhuma leitura;
+* indeterminada, se a chamada não criou nenhum ``params`` observável.
+
+O relatório vai para ``extra['parametros']`` e a contagem de chaves
+ignoradas para a métrica ``parametros_ignorados``.
+"""
+
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+
+# Arquivo do relatório gravado pelos ganchos
+CONFIG_ENV = 'AVALIACAO_PARAMETROS'
+
+# Métodos da rede que repassam ``**params`` a nós e links
+METHODS = ('addHost', 'addSwitch', 'addController', 'addNAT', 'addLink',
+           'addStation', 'addAccessPoint', 'addCar', 'addSensor',
+           'addApSensor', 'addModem')
+
+
+class TrackedParams(dict):
+    "``params`` que registra as chaves lidas (cópias compartilham o registro)."
+    __slots__ = ('read',)
+
+    def __init__(self, data=(), read=None):
+        super().__init__(data)
+        self.read = set() if read is None else read
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self.read.add(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self.read.add(key)
+        return dict.get(self, key, default)
+
+    def pop(self, key, *default):
+        self.read.add(key)
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        self.read.add(key)
+        return dict.setdefault(self, key, default)
+
+    # Iteração e repasse (``f(**params)``, ``dict(params)``, ``{**params}``,
+    # ``items()``) leem todas as chaves: com ``__iter__`` próprio, o
+    # desempacotamento usa ``keys()`` e ``[]`` em vez do atalho de ``dict``
+    def _read_all(self):
+        self.read.update(dict.keys(self))
+
+    def __iter__(self):
+        self._read_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._read_all()
+        return dict.keys(self)
+
+    def items(self):
+        self._read_all()
+        return dict.items(self)
+
+    def values(self):
+        self._read_all()
+        return dict.values(self)
+
+    def copy(self):
+        return TrackedParams(dict.items(self), self.read)
+
+
+@functools.lru_cache(maxsize=None)
+def _named(func):
+    "Parâmetros nomeados (não ``*args``/``**kwargs``) de uma função."
+    try:
+        signature = inspect.signature(inspect.unwrap(func))
+    except (TypeError, ValueError):
+        return frozenset()
+    return frozenset(
+        p.name for p in signature.parameters.values()
+        if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+
+
+def signature_keys(cls):
+    "Chaves consumidas por ``__init__``/``config`` ao longo da MRO."
+    keys = set()
+    for base in cls.__mro__:
+        for name in ('__init__', 'config'):
+            func = base.__dict__.get(name)
+            if inspect.isfunction(func):
+                keys |= _named(func)
+    return keys
+
+
+class Call:
+    "Chamada ``add*`` do script e os ``params`` criados durante ela."
+
+    def __init__(self, method, keys, named, line, node=None):
+        self.method = method
+        self.keys = keys
+        self.named = named
+        self.line = line
+        self.node = node
+        self.params = []
+
+    def report(self):
+        consumed = set(self.named)
+        for params, cls in self.params:
+            consumed |= params.read | signature_keys(cls)
+        pending = [k for k in self.keys if k not in consumed]
+        stored = set().union(*(dict.keys(p) for p, _ in self.params))
+        entry = {'metodo': self.method, 'linha': self.line, 'no': self.node,
+                 'chaves': list(self.keys)}
+        if not self.params:
+            entry['indeterminados'] = pending
+        else:
+            # Chave ausente de todos os ``params``: a biblioteca a retirou
+            entry['ignorados'] = [k for k in pending if k in stored]
+        return entry
+
+
+class Audit:
+    "Chamadas auditadas de uma execução."
+
+    def __init__(self, script):
+        self.scripts = {script, os.path.abspath(script)}
+        self.calls = []
+        self._local = threading.local()
+
+    def _active(self):
+        if not hasattr(self._local, 'calls'):
+            self._local.calls = []
+        return self._local.calls
+
+    def track(self, params, owner):
+        "Embrulha ``params`` e o associa às chamadas em andamento."
+        tracked = TrackedParams(params)
+        for call in self._active():
+            call.params.append((tracked, type(owner)))
+        return tracked
+
+    def _line(self):
+        frame = sys._getframe(2)
+        while frame:
+            if frame.f_code.co_filename in self.scripts:
+                return frame.f_lineno
+            frame = frame.f_back
+        return None
+
+    def wrap(self, method):
+        "Versão auditada de um método ``add*`` da rede."
+        audit = self
+
+        @functools.wraps(method)
+        def audited(self, *args, **kwargs):
+            active = audit._active()
+            if active:
+                # ``Mininet_wifi.addLink`` -> ``Mininet.addLink``: só a
+                # chamada do script conta
+                return method(self, *args, **kwargs)
+            node = args[0] if args and isinstance(args[0], str) else None
+            call = Call(method.__name__, sorted(kwargs), _named(method),
+                        audit._line(), node)
+            audit.calls.append(call)
+            active.append(call)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                active.remove(call)
+        return audited
+
+    def report(self):
+        return [call.report() for call in self.calls if call.keys]
+
+    def save(self, path):
+        tmp = '%s.tmp' % path
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f)
+        os.replace(tmp, path)
+
+
+class ParamsAttribute:
+    "Atributo ``params`` que entrega à auditoria o dicionário atribuído."
+
+    def __init__(self, audit):
+        self.audit = audit
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__['params']
+        except KeyError:
+            raise AttributeError('params') from None
+
+    def __set__(self, obj, value):
+        if type(value) is dict:
+            value = self.audit.track(value, obj)
+        obj.__dict__['params'] = value
+
+
+def load(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def attach(record, calls):
+    "Relatório das chamadas e contagem de chaves ignoradas no ``RunRecord``."
+    if calls is None:
+        return
+    record.extra['parametros'] = calls
+    record.metrics['parametros_ignorados'] = (
+        sum(len(c.get('ignorados', ())) for c in calls), 'chaves')
@@ -0,0 +1,125 @@
+"""
+Cache persistente das respostas de geração.
+
+Uma geração local (gpt-oss-20B em CPU) leva minutos; reexecutar o
+pipeline com os mesmos parâmetros não deve repeti-la. A chave combina
+o nome e o digest do modelo, o hash da conversa completa montada, as
+opções de amostragem (temperatura, seed, ...), o conjunto de exemplos
+few-shot e o índice da amostra. As entradas ficam em SQLite e as menos
+usadas recentemente são removidas quando o tamanho total passa do
+limite.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from avaliacao import cenarios
+
+DEFAULT_PATH = os.path.join(cenarios.ROOT, '.cache', 'geracao.sqlite')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions(last_used);
+"""
+
+
+def _sha256(obj):
+    data = json.dumps(obj, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def cache_key(model, digest, messages, options=None, fewshot=(),
+              sample=None):
+    """Chave determinística de uma requisição de geração.
+
+    ``digest`` identifica os pesos do modelo: o mesmo nome apontando
+    para pesos novos não reaproveita respostas antigas."""
+    return _sha256({
+        'model': model,
+        'digest': digest or '',
+        'prompt': _sha256(messages),
+        'options': options or {},
+        'fewshot': sorted(fewshot),
+        'sample': sample,
+    })
+
+
+class GenerationCache:
+    "Cache LRU em SQLite, seguro para várias threads e processos."
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30,
+                                   check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def get(self, key):
+        "Entrada armazenada (dicionário) ou ``None``."
+        with self._lock:
+            row = self._db.execute(
+                'SELECT payload FROM completions WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute(
+                    'UPDATE completions SET last_used = ? WHERE key = ?',
+                    (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, model, payload):
+        "Armazena (ou substitui) uma entrada e aplica o limite de tamanho."
+        data = json.dumps(payload, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO completions '
+                '(key, model, payload, size, created, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, data, len(data.encode('utf-8')), now, now))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM completions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self._db.execute(
+                'SELECT key, size FROM completions ORDER BY last_used'):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany('DELETE FROM completions WHERE key = ?',
+                             victims)
+
+    def stats(self):
+        "Número de entradas e bytes ocupados."
+        with self._lock:
+            count, size = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) '
+                'FROM completions').fetchone()
+        return {'entries': count, 'bytes': size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,92 @@
+"""
+Catálogo das APIs do Mininet/Mininet-WiFi usado nas verificações
+estáticas.
+
+O catálogo lista, por módulo, os nomes exportados e, para as classes
+e métodos relevantes, os parâmetros nomeados e as chaves aceitas em
+``**params``. ``catalogos/mn_wifi-2.6.json`` é uma semente curada à
+mão para a versão usada no artigo; catálogos de outras versões são
+gerados por introspecção da biblioteca instalada
+(``avaliacao.introspeccao``), em JSON ou JSON comprimido (``.json.gz``).
+"""
+
+import functools
+import gzip
+import json
+import os
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'catalogos')
+DEFAULT_VERSION = '2.6'
+
+# Pacotes cujos imports são verificados contra o catálogo
+TRACKED_PACKAGES = ('mininet', 'mn_wifi')
+
+
+class Catalog:
+    "Consulta aos nomes, parâmetros e métodos de uma versão da biblioteca."
+
+    def __init__(self, data):
+        self.version = data.get('version', '')
+        self.modules = data['modules']
+
+    @staticmethod
+    def tracked(module):
+        "Indica se o módulo pertence aos pacotes verificados."
+        return module.split('.')[0] in TRACKED_PACKAGES
+
+    def has_module(self, module):
+        return module in self.modules
+
+    def exhaustive(self, module):
+        "Se a lista de nomes do módulo é completa (nomes ausentes são erro)."
+        return self.modules.get(module, {}).get('exhaustive', False)
+
+    def lookup(self, qualname):
+        """Entrada de ``pacote.modulo.Nome`` ou ``None``; nomes reexportados
+        (``ref``) levam à entrada do módulo que os define."""
+        module, _, name = qualname.rpartition('.')
+        entry = self.modules.get(module, {}).get('names', {}).get(name)
+        if entry and 'ref' in entry:
+            return self.lookup(entry['ref']) or entry
+        return entry
+
+    def method(self, qualname, name):
+        "Entrada do método ``name`` da classe ``qualname`` ou ``None``."
+        entry = self.lookup(qualname) or {}
+        return entry.get('methods', {}).get(name)
+
+    def has_methods(self, qualname):
+        entry = self.lookup(qualname) or {}
+        return 'methods' in entry
+
+
+def catalog_path(version=DEFAULT_VERSION, directory=CATALOG_DIR):
+    "Catálogo da versão (``.json`` ou, na falta dele, ``.json.gz``)."
+    path = os.path.join(directory, 'mn_wifi-%s.json' % version)
+    if not os.path.exists(path) and os.path.exists(path + '.gz'):
+        return path + '.gz'
+    return path
+
+
+def versions(directory=CATALOG_DIR):
+    "Versões com catálogo no diretório."
+    found = set()
+    for name in os.listdir(directory):
+        for suffix in ('.json', '.json.gz'):
+            if name.startswith('mn_wifi-') and name.endswith(suffix):
+                found.add(name[len('mn_wifi-'):-len(suffix)])
+    return sorted(found)
+
+
+def read_catalog(path):
+    "Lê um catálogo serializado (JSON, opcionalmente gzip)."
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return Catalog(json.load(f))
+
+
+@functools.lru_cache(maxsize=None)
+def load(version=DEFAULT_VERSION):
+    "Catálogo da versão informada, carregado uma única vez por processo."
+    return read_catalog(catalog_path(version))
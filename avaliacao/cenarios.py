@@ -0,0 +1,88 @@
+"""
+Organização dos cenários, prompts e scripts do repositório.
+
+Centraliza a correspondência entre níveis de complexidade, tipos de
+prompt e os caminhos ``prompts/p-<nivel>_<tipo>.txt`` e
+``scripts/<nivel>/<s|d>_<modelo>.py`` usados no artigo.
+"""
+
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPTS_DIR = os.path.join(ROOT, 'prompts')
+SCRIPTS_DIR = os.path.join(ROOT, 'scripts')
+
+# Pasta de scripts -> prefixo do arquivo de prompt
+LEVELS = {
+    'basico': 'p-basico',
+    'intermed': 'p-interm',
+    'avancado': 'p-avanc',
+}
+
+# Prefixo do script -> sufixo do arquivo de prompt
+PROMPT_TYPES = {
+    's': 'simples',
+    'd': 'especifico',
+}
+
+CONTEXT_FILE = os.path.join(PROMPTS_DIR, 'contextualizacao.txt')
+
+
+def read_text(path):
+    "Lê um arquivo de texto em UTF-8."
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def prompt_path(level, prompt_type):
+    "Caminho do prompt de cenário para o nível e tipo informados."
+    if level not in LEVELS:
+        raise ValueError('nível desconhecido: %r' % level)
+    if prompt_type not in PROMPT_TYPES:
+        raise ValueError('tipo de prompt desconhecido: %r' % prompt_type)
+    name = '%s_%s.txt' % (LEVELS[level], PROMPT_TYPES[prompt_type])
+    return os.path.join(PROMPTS_DIR, name)
+
+
+def model_slug(model):
+    "Nome do modelo no formato usado nos arquivos (ex.: gpt-oss:20b -> gptoss20b)."
+    return re.sub(r'[^a-z0-9]', '', model.lower())
+
+
+def script_path(level, prompt_type, slug, sample=None, root=SCRIPTS_DIR):
+    """Caminho ``<root>/<nivel>/<s|d>_<modelo>.py`` de um script gerado.
+
+    Quando há várias amostras por célula, o índice da amostra é
+    acrescentado ao nome (``s_gptoss20b_2.py``)."""
+    name = '%s_%s' % (prompt_type, slug)
+    if sample is not None:
+        name += '_%d' % sample
+    return os.path.join(root, level, name + '.py')
+
+
+def parse_script_path(path):
+    """Extrai ``(nivel, tipo, modelo, amostra)`` de um caminho de script
+    gerado; a amostra é ``None`` sem o sufixo ``_N`` de ``script_path``.
+
+    Retorna ``None`` para arquivos fora da convenção (ex.: exemplos)."""
+    level = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    m = re.match(r'^([sd])_(\w+?)(?:_(\d+))?\.py$', os.path.basename(path))
+    if level not in LEVELS or not m:
+        return None
+    sample = int(m.group(3)) if m.group(3) is not None else None
+    return level, m.group(1), m.group(2), sample
+
+
+def generated_scripts(root=SCRIPTS_DIR):
+    "Lista ordenada dos scripts gerados que seguem a convenção de nomes."
+    found = []
+    for level in LEVELS:
+        folder = os.path.join(root, level)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if parse_script_path(path):
+                found.append(path)
+    return found
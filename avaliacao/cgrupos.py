@@ -0,0 +1,220 @@
+"""
+Envelopes de recursos (cgroup v2) para cada execução.
+
+Um script com laço infinito, um ``iperf -t`` longo ou um processo
+esquecido em segundo plano não pode prejudicar os demais trabalhadores
+de uma avaliação paralela. Cada execução roda num cgroup próprio
+(``/sys/fs/cgroup/avaliacao/<execução>``), com limites de CPU
+(``cpu.max``), memória (``memory.max``, sem swap) e processos
+(``pids.max``); os shells dos nós, o hostapd e os demais processos
+iniciados pelo script herdam o cgroup. Ao final, o estrangulamento de
+CPU (``cpu.stat``), os eventos de OOM (``memory.events``) e de limite
+de processos (``pids.events``) e os picos de uso vão para o registro, e
+tudo o que restou no cgroup é encerrado.
+
+Requer cgroup v2 com os controladores ``cpu``, ``memory`` e ``pids``
+habilitados (hosts só com cgroup v1 não são suportados).
+"""
+
+import os
+import re
+import signal
+import subprocess
+import time
+from dataclasses import dataclass
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PARENT = 'avaliacao'
+CPU_PERIOD = 100000
+
+SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?$', re.I)
+SIZE_UNITS = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+
+
+def parse_size(text):
+    "Tamanho em bytes a partir de ``512M``, ``2G``, ``1.5GiB``..."
+    match = SIZE_RE.match(str(text).strip())
+    if not match:
+        raise ValueError('tamanho inválido: %r' % text)
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+@dataclass
+class Limits:
+    "Limites de um envelope (``None`` = sem limite)."
+    cpus: float = None
+    memory: int = None
+    pids: int = None
+
+    def controllers(self):
+        return [name for name, value in (('cpu', self.cpus),
+                                         ('memory', self.memory),
+                                         ('pids', self.pids))
+                if value is not None]
+
+    def __bool__(self):
+        return bool(self.controllers())
+
+
+def _write(path, value):
+    "Escreve num arquivo do cgroup (via ``sudo tee`` sem privilégios)."
+    try:
+        with open(path, 'w') as f:
+            f.write(str(value))
+    except PermissionError:
+        subprocess.run(['sudo', '-n', 'tee', path], input=str(value),
+                       text=True, stdout=subprocess.DEVNULL, check=True)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def _keyed(path):
+    "Arquivo ``chave valor`` por linha como dicionário de inteiros."
+    values = {}
+    for line in _read(path).splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            values[parts[0]] = int(parts[1])
+    return values
+
+
+def check(limits, root=CGROUP_ROOT):
+    "``RuntimeError`` se o cgroup v2 não tem os controladores necessários."
+    path = os.path.join(root, 'cgroup.controllers')
+    if not os.path.exists(path):
+        raise RuntimeError('cgroup v2 indisponível em %s' % root)
+    missing = set(limits.controllers()) - set(_read(path).split())
+    if missing:
+        raise RuntimeError('controladores do cgroup v2 indisponíveis: %s'
+                           % ', '.join(sorted(missing)))
+
+
+class Envelope:
+    "cgroup de uma execução: criação, entrada, métricas e remoção."
+
+    def __init__(self, name, limits, root=CGROUP_ROOT):
+        self.root = root
+        self.limits = limits
+        self.parent = os.path.join(root, PARENT)
+        self.path = os.path.join(self.parent, name)
+
+    def create(self):
+        check(self.limits, self.root)
+        enable = ' '.join('+' + c for c in self.limits.controllers())
+        for directory in (self.parent, self.path):
+            if not os.path.isdir(directory):
+                try:
+                    os.mkdir(directory)
+                except PermissionError:
+                    subprocess.run(['sudo', '-n', 'mkdir', '-p', directory],
+                                   check=True)
+        if enable:
+            try:
+                _write(os.path.join(self.root, 'cgroup.subtree_control'),
+                       enable)
+                _write(os.path.join(self.parent, 'cgroup.subtree_control'),
+                       enable)
+            except OSError as exc:
+                raise RuntimeError('não foi possível habilitar %s: %s'
+                                   % (enable, exc)) from None
+        if self.limits.cpus is not None:
+            _write(os.path.join(self.path, 'cpu.max'), '%d %d' % (
+                int(self.limits.cpus * CPU_PERIOD), CPU_PERIOD))
+        if self.limits.memory is not None:
+            _write(os.path.join(self.path, 'memory.max'), self.limits.memory)
+            swap = os.path.join(self.path, 'memory.swap.max')
+            if os.path.exists(swap):
+                _write(swap, 0)
+        if self.limits.pids is not None:
+            _write(os.path.join(self.path, 'pids.max'), self.limits.pids)
+        return self
+
+    def wrap(self, command):
+        "Comando que entra no cgroup antes de executar ``command``."
+        return ['sh', '-c', 'echo $$ > "$0" && exec "$@"',
+                os.path.join(self.path, 'cgroup.procs')] + list(command)
+
+    def pids(self):
+        found = []
+        for directory, _, files in os.walk(self.path):
+            if 'cgroup.procs' in files:
+                found += [int(p) for p in _read(os.path.join(
+                    directory, 'cgroup.procs')).split()]
+        return found
+
+    def stats(self):
+        "Uso, estrangulamento, OOM e picos do cgroup."
+        cpu = _keyed(os.path.join(self.path, 'cpu.stat'))
+        memory = _keyed(os.path.join(self.path, 'memory.events'))
+        pids = _keyed(os.path.join(self.path, 'pids.events'))
+        stats = {
+            'cpu_uso': cpu.get('usage_usec', 0) / 1e6,
+            'cpu_estrangulado': cpu.get('throttled_usec', 0) / 1e6,
+            'periodos': cpu.get('nr_periods', 0),
+            'periodos_estrangulados': cpu.get('nr_throttled', 0),
+            'oom': memory.get('oom', 0),
+            'oom_kill': memory.get('oom_kill', 0),
+            'memoria_max_eventos': memory.get('max', 0),
+            'pids_max_eventos': pids.get('max', 0),
+        }
+        for name, key in (('memory.peak', 'memoria_pico'),
+                          ('pids.peak', 'pids_pico')):
+            text = _read(os.path.join(self.path, name)).strip()
+            if text.isdigit():
+                stats[key] = int(text)
+        return stats
+
+    def attach(self, record):
+        "Métricas e limites do envelope no ``RunRecord``."
+        stats = self.stats()
+        record.extra['cgroup'] = dict(stats, limites={
+            'cpus': self.limits.cpus, 'memoria': self.limits.memory,
+            'pids': self.limits.pids})
+        record.metrics['cgroup_cpu'] = (stats['cpu_uso'], 's')
+        record.metrics['cgroup_estrangulado'] = (stats['cpu_estrangulado'],
+                                                 's')
+        record.metrics['cgroup_oom_kill'] = (stats['oom_kill'], 'eventos')
+        record.metrics['cgroup_pids_max'] = (stats['pids_max_eventos'],
+                                             'eventos')
+        if 'memoria_pico' in stats:
+            record.metrics['cgroup_memoria_pico'] = (
+                stats['memoria_pico'] / 2 ** 20, 'MB')
+        if stats['oom_kill']:
+            record.extra['cgroup']['aviso'] = 'processo morto por falta de memória'
+
+    def kill(self):
+        "Encerra todos os processos restantes no cgroup."
+        path = os.path.join(self.path, 'cgroup.kill')
+        if os.path.exists(path):
+            _write(path, 1)
+            return
+        for pid in self.pids():
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                subprocess.run(['sudo', '-n', 'kill', '-9', str(pid)],
+                               stderr=subprocess.DEVNULL)
+
+    def remove(self, timeout=5.0):
+        "Encerra o que restou e remove o cgroup."
+        if not os.path.isdir(self.path):
+            return
+        self.kill()
+        deadline = time.time() + timeout
+        while self.pids() and time.time() < deadline:
+            time.sleep(0.05)
+        try:
+            os.rmdir(self.path)
+        except PermissionError:
+            subprocess.run(['sudo', '-n', 'rmdir', self.path],
+                           stderr=subprocess.DEVNULL)
+        except OSError:
+            pass
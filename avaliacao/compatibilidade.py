@@ -0,0 +1,281 @@
+"""
+Matriz de compatibilidade dos scripts gerados entre versões do
+Mininet-WiFi.
+
+Os scripts foram validados contra a versão 2.6. Com os catálogos de
+outras versões (``catalogos/``, gerados por ``avaliacao.introspeccao``),
+cada script é verificado contra todos eles numa única passada paralela:
+verificação estática (``avaliacao.estatico``) e, com ``--simular``,
+execução simulada (``avaliacao.simulacao``). O relatório mostra o estado
+de cada script por versão e, para os scripts cujo estado muda de uma
+versão para outra, as chamadas que quebram e em quais versões.
+
+Com ``--ambiente VERSAO=PYTHON``, os scripts divergentes são depois
+executados de verdade (``avaliacao.execucao``) no interpretador com
+aquela versão instalada, e os registros vão para o repositório de
+resultados.
+
+Exemplo::
+
+    python3 -m avaliacao.compatibilidade scripts --versoes 2.6 2.7
+    sudo python3 -m avaliacao.compatibilidade scripts \\
+        --ambiente 2.6=/usr/bin/python3 --ambiente 2.7=/opt/mn27/bin/python3
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from avaliacao import (catalogo, cenarios, erros, estatico, resultados,
+                       simulacao)
+
+log = logging.getLogger(__name__)
+
+OK = 'ok'
+WARNING = 'aviso'
+BROKEN = 'erro'
+
+
+@dataclass
+class Cell:
+    "Resultado de um script contra o catálogo de uma versão."
+    script: str
+    version: str
+    status: str = OK
+    issues: list = field(default_factory=list)
+    breaks: list = field(default_factory=list)
+    simulation: dict = None
+    classification: tuple = None
+    duration: float = 0.0
+
+    def signature(self):
+        "O que distingue a célula entre versões (estado e quebras)."
+        return self.status, frozenset(message for _, message in self.breaks)
+
+
+def evaluate(task):
+    "Verifica um par ``(script, versão, simular)``; roda num processo filho."
+    script, version, simulate = task
+    start = time.time()
+    cell = Cell(script, version)
+    catalog = catalogo.load(version)
+    issues = estatico.check_file(script, catalog)
+    cell.issues = [str(i) for i in issues]
+    cell.breaks = [(i.line, i.message) for i in issues if i.fatal]
+    traceback = ''
+    if simulate and not cell.breaks:
+        run = simulacao.dry_run(script, version)
+        # Como em ``resultados.validation_record``
+        cell.simulation = {'ok': run.ok, 'erro': run.error_type,
+                           'mensagem': run.message, 'linha': run.line,
+                           'traceback': run.traceback}
+        traceback = run.traceback
+        if not run.ok:
+            cell.breaks.append((run.line, run.summary()))
+    if cell.breaks:
+        cell.status = BROKEN
+        found = erros.classify(issues=issues, dry_run_traceback=traceback,
+                               catalog=catalog)
+        if found:
+            cell.classification = (found.error_class, found.cause,
+                                   found.signature)
+    elif issues:
+        cell.status = WARNING
+    cell.duration = time.time() - start
+    return cell
+
+
+class Matrix:
+    "Células script x versão e os scripts que divergem entre versões."
+
+    def __init__(self, scripts, versions, cells):
+        self.scripts = scripts
+        self.versions = versions
+        self.cells = {(c.script, c.version): c for c in cells}
+
+    def cell(self, script, version):
+        return self.cells[script, version]
+
+    def divergent(self):
+        "Scripts cujo estado ou quebras mudam entre as versões."
+        return [s for s in self.scripts
+                if len({self.cell(s, v).signature()
+                        for v in self.versions}) > 1]
+
+    def breaks(self, script):
+        """``{versão: [(linha, mensagem)]}`` das quebras que não ocorrem em
+        todas as versões."""
+        common = set.intersection(*(
+            {m for _, m in self.cell(script, v).breaks}
+            for v in self.versions))
+        return {v: [(line, m) for line, m in self.cell(script, v).breaks
+                    if m not in common]
+                for v in self.versions}
+
+    def counts(self):
+        "``{versão: {estado: scripts}}``."
+        counts = {v: {OK: 0, WARNING: 0, BROKEN: 0} for v in self.versions}
+        for (_, version), cell in self.cells.items():
+            counts[version][cell.status] += 1
+        return counts
+
+    def to_dict(self):
+        return {'versoes': self.versions,
+                'divergentes': self.divergent(),
+                'celulas': [asdict(c) for c in self.cells.values()]}
+
+
+def evaluate_all(scripts, versions, workers=None, simulate=False):
+    "Todas as células em processos paralelos."
+    tasks = [(s, v, simulate) for s in scripts for v in versions]
+    with ProcessPoolExecutor(workers) as pool:
+        cells = list(pool.map(evaluate, tasks, chunksize=8))
+    return Matrix(scripts, versions, cells)
+
+
+def collect_scripts(paths):
+    "Scripts gerados dos diretórios e arquivos informados."
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            # Raiz com as pastas de nível ou a pasta de um nível
+            found.extend(cenarios.generated_scripts(path) or sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if cenarios.parse_script_path(os.path.join(path, name))))
+        else:
+            found.append(path)
+    return [os.path.abspath(p) for p in found]
+
+
+def parse_environment(text):
+    "``VERSAO=PYTHON`` de ``--ambiente``."
+    version, sep, python = text.partition('=')
+    if not sep or not version or not python:
+        raise argparse.ArgumentTypeError(
+            'ambiente inválido (use VERSAO=PYTHON): %r' % text)
+    return version, python
+
+
+def record(cell):
+    "Registro do estágio ``compatibilidade`` para o repositório."
+    rec = resultados.RunRecord.for_script(
+        'compatibilidade', cell.script, mnwifi_version=cell.version)
+    rec.ran = cell.status != BROKEN
+    rec.duration = cell.duration
+    rec.metrics = {'quebras': (len(cell.breaks), 'chamadas')}
+    rec.extra = {'estado': cell.status, 'problemas': cell.issues}
+    if cell.simulation is not None:
+        rec.extra['simulacao'] = cell.simulation
+    if cell.classification:
+        rec.error_class, rec.error_cause, rec.signature = cell.classification
+    elif cell.breaks:
+        rec.error_cause = cell.breaks[0][1]
+    return rec
+
+
+def run_versions(scripts, environments, timeout=120, sudo=True):
+    """Execuções reais dos scripts em cada ambiente (versão, python);
+    uma versão por vez, pois as execuções disputam o host."""
+    from avaliacao import execucao
+    records = []
+    for version, python in environments:
+        installed = execucao.installed_version(python)
+        if installed != version:
+            log.warning('*** %s tem o Mininet-WiFi %s, não %s', python,
+                        installed, version)
+        runner = execucao.Runner(timeout, python, sudo,
+                                 version=installed or version)
+        for script in scripts:
+            rec = runner.run(script)
+            log.info('*** %s [%s]: %s', os.path.relpath(script),
+                     rec.mnwifi_version,
+                     'rodou' if rec.ran else 'não rodou (%s)'
+                     % rec.error_cause)
+            records.append(rec)
+    return records
+
+
+def _print_matrix(matrix):
+    names = [os.path.relpath(s) for s in matrix.scripts]
+    width = max([len(n) for n in names] + [6])
+    print('%-*s  %s' % (width, 'script',
+                        '  '.join('%-6s' % v for v in matrix.versions)))
+    for script, name in zip(matrix.scripts, names):
+        print('%-*s  %s' % (width, name, '  '.join(
+            '%-6s' % matrix.cell(script, v).status
+            for v in matrix.versions)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.compatibilidade',
+        description='Compatibilidade dos scripts entre versões do '
+                    'Mininet-WiFi.')
+    parser.add_argument('scripts', nargs='*', default=[cenarios.SCRIPTS_DIR],
+                        help='scripts ou diretórios (padrão: scripts/)')
+    parser.add_argument('--versoes', nargs='+',
+                        help='versões com catálogo (padrão: todas)')
+    parser.add_argument('--simular', action='store_true',
+                        help='inclui a execução simulada de cada célula')
+    parser.add_argument('--paralelo', type=int)
+    parser.add_argument('--json', metavar='ARQUIVO',
+                        help='grava a matriz em JSON')
+    parser.add_argument('--gravar', action='store_true',
+                        help='grava as células no repositório de resultados')
+    parser.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    parser.add_argument('--ambiente', action='append', default=[],
+                        type=parse_environment, metavar='VERSAO=PYTHON',
+                        help='executa os scripts divergentes nessa versão')
+    parser.add_argument('--todos', action='store_true',
+                        help='com --ambiente, executa todos os scripts')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--sem-sudo', action='store_true')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    versions = args.versoes or catalogo.versions()
+    for version in versions:
+        if not os.path.exists(catalogo.catalog_path(version)):
+            parser.error('sem catálogo para a versão %s '
+                         '(python3 -m avaliacao.introspeccao)' % version)
+    scripts = collect_scripts(args.scripts)
+    if not scripts:
+        parser.error('nenhum script encontrado')
+
+    matrix = evaluate_all(scripts, versions, args.paralelo, args.simular)
+    _print_matrix(matrix)
+    divergent = matrix.divergent()
+    for script in divergent:
+        print('\n%s' % os.path.relpath(script))
+        for version, breaks in matrix.breaks(script).items():
+            for line, message in breaks:
+                print('  %-6s %d: %s' % (version, line or 0, message))
+    print('\n%d scripts, %d divergentes; %s' % (
+        len(scripts), len(divergent), '; '.join(
+            '%s: %d ok, %d aviso, %d erro' % (v, c[OK], c[WARNING],
+                                               c[BROKEN])
+            for v, c in matrix.counts().items())))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(matrix.to_dict(), f, ensure_ascii=False, indent=1)
+
+    records = [record(c) for c in matrix.cells.values()] if args.gravar \
+        else []
+    if args.ambiente:
+        records += run_versions(scripts if args.todos else divergent,
+                                args.ambiente, args.timeout,
+                                not args.sem_sudo)
+    if records:
+        store = resultados.ResultsStore(args.banco)
+        store.append_many(records)
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
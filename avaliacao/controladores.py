@@ -0,0 +1,346 @@
+"""
+Controladores OpenFlow isolados por execução.
+
+Muitos scripts fixam a porta do controlador (``RemoteController(ip=
+'127.0.0.1', port=6653)``, ``addController('c0', port=6633)`` ou o
+padrão 6653 do ``addController('c0')``): execuções simultâneas disputam
+a mesma porta, e um ``RemoteController`` sem nada escutando deixa os
+switches sem encaminhamento. Cada execução recebe uma vaga do pool, com
+um bloco de portas próprio (``BLOCK`` portas a partir de
+``BASE_PORT + vaga * BLOCK``):
+
+* a primeira porta do bloco é a de um controlador leve
+  (``ovs-testcontroller``) do pool, iniciado sob demanda para scripts
+  que usam ``RemoteController`` e mantido entre execuções;
+* as demais recebem os controladores locais (``Controller``,
+  ``OVSController``) criados pelo script.
+
+Os ganchos (``avaliacao.ganchos``) remapeiam as portas sem alterar o
+script e medem o tempo até cada switch se conectar ao controlador.
+
+Exemplo::
+
+    python3 -m avaliacao.controladores estado
+    python3 -m avaliacao.controladores parar
+"""
+
+import argparse
+import fcntl
+import glob
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from avaliacao import resultados
+
+log = logging.getLogger(__name__)
+
+POOL_DIR = os.path.join(resultados.DEFAULT_DIR, 'controladores')
+BASE_PORT = 16600
+SLOTS = 32
+BLOCK = 8
+START_TIMEOUT = 5.0
+
+# Controladores leves conhecidos pelo Mininet, em ordem de preferência
+COMMANDS = ('ovs-testcontroller', 'test-controller', 'controller')
+
+LOOPBACK = ('127.0.0.1', 'localhost', '::1', None, '')
+
+# Configuração passada aos ganchos do script
+CONFIG_ENV = 'AVALIACAO_CONTROLADOR'
+
+
+def find_command():
+    "Primeiro controlador leve disponível (ou ``None``)."
+    for name in COMMANDS:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def listening(port, host='127.0.0.1'):
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def _free(port):
+    with socket.socket() as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(('127.0.0.1', port))
+        except OSError:
+            return False
+    return True
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def pool_pids(directory=POOL_DIR):
+    "Pids dos controladores do pool (poupados pela limpeza)."
+    pids = set()
+    for path in glob.glob(os.path.join(directory, 'vaga-*.pid')):
+        try:
+            with open(path) as f:
+                pids.add(int(f.read().strip()))
+        except (OSError, ValueError):
+            continue
+    return pids
+
+
+@dataclass
+class Lease:
+    "Vaga do pool reservada para uma execução."
+    slot: int
+    port: int
+    ports: list
+    lock: object = None
+    started: float = None
+    # Falha ao subir o controlador do pool: os remotos não são remapeados
+    error: str = None
+
+    def config(self, output):
+        "Configuração dos ganchos (``AVALIACAO_CONTROLADOR``)."
+        return json.dumps({'remoto': None if self.error else self.port,
+                           'locais': self.ports, 'saida': output})
+
+
+class ControllerPool:
+    "Vagas com bloco de portas e controlador leve mantido entre execuções."
+
+    def __init__(self, directory=POOL_DIR, base=BASE_PORT, slots=SLOTS,
+                 block=BLOCK, command=None):
+        self.directory = directory
+        self.base = base
+        self.slots = slots
+        self.block = block
+        self.command = command or find_command()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, slot, suffix):
+        return os.path.join(self.directory, 'vaga-%02d.%s' % (slot, suffix))
+
+    def lease(self, timeout=None):
+        """Reserva uma vaga livre (trava de arquivo, válida entre processos)
+        cujo bloco de portas não está ocupado por outro programa."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            for slot in range(self.slots):
+                lock = open(self._path(slot, 'trava'), 'w')
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock.close()
+                    continue
+                lease = self._claim(slot, lock)
+                if lease:
+                    return lease
+                lock.close()
+            if deadline is not None and time.time() > deadline:
+                raise RuntimeError('nenhuma vaga de controlador livre')
+            time.sleep(0.2)
+
+    def _claim(self, slot, lock):
+        port = self.base + slot * self.block
+        ports = list(range(port + 1, port + self.block))
+        if not all(_free(p) for p in ports):
+            return None
+        pid = self._pid(slot)
+        if not _free(port) and not (pid and _alive(pid)):
+            # Porta do controlador ocupada por outro programa
+            return None
+        return Lease(slot, port, ports, lock)
+
+    def _pid(self, slot):
+        try:
+            with open(self._path(slot, 'pid')) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def ensure(self, lease):
+        """Garante o controlador da vaga escutando; devolve o tempo de
+        partida (0 se já estava no ar)."""
+        pid = self._pid(lease.slot)
+        if pid and _alive(pid) and listening(lease.port):
+            return 0.0
+        if not self.command:
+            raise RuntimeError('nenhum controlador leve instalado (%s)'
+                               % ', '.join(COMMANDS))
+        start = time.time()
+        with open(self._path(lease.slot, 'log'), 'ab') as out:
+            # Sessão própria: sobrevive ao executor e ao grupo da execução
+            proc = subprocess.Popen(
+                [self.command, 'ptcp:%d' % lease.port],
+                stdin=subprocess.DEVNULL, stdout=out, stderr=out,
+                start_new_session=True)
+        with open(self._path(lease.slot, 'pid'), 'w') as f:
+            f.write(str(proc.pid))
+        while not listening(lease.port):
+            if proc.poll() is not None or time.time() - start > START_TIMEOUT:
+                raise RuntimeError('controlador da vaga %d não subiu'
+                                   % lease.slot)
+            time.sleep(0.02)
+        lease.started = time.time() - start
+        return lease.started
+
+    def release(self, lease):
+        if lease.lock:
+            lease.lock.close()
+            lease.lock = None
+
+    def stop(self):
+        "Encerra os controladores do pool."
+        stopped = 0
+        for slot in range(self.slots):
+            pid = self._pid(slot)
+            if pid and _alive(pid):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    stopped += 1
+                except OSError as exc:
+                    log.warning('*** vaga %d: %s', slot, exc)
+            try:
+                os.remove(self._path(slot, 'pid'))
+            except OSError:
+                pass
+        return stopped
+
+    def status(self):
+        rows = []
+        for slot in range(self.slots):
+            pid = self._pid(slot)
+            if pid:
+                port = self.base + slot * self.block
+                rows.append((slot, port, pid,
+                             _alive(pid) and listening(port)))
+        return rows
+
+
+class ConnectionMonitor(threading.Thread):
+    """Mede, pelo OVS, o tempo entre um switch receber um dos controladores
+    da execução (linha nova na tabela ``Controller``) e a conexão."""
+
+    def __init__(self, ports, output, interval=0.05):
+        super().__init__(name='controladores', daemon=True)
+        self.ports = set(ports)
+        self.output = output
+        self.interval = interval
+        self.connections = {}
+
+    def poll(self):
+        "``[(uuid, alvo, conectado)]`` dos controladores no OVS."
+        try:
+            out = subprocess.run(
+                ['ovs-vsctl', '--timeout=2', '--format=json',
+                 '--columns=_uuid,target,is_connected', 'list',
+                 'Controller'], capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if out.returncode != 0:
+            return None
+        rows = []
+        for uuid, target, connected in json.loads(out.stdout)['data']:
+            try:
+                port = int(str(target).rsplit(':', 1)[1])
+            except (IndexError, ValueError):
+                continue
+            if port in self.ports:
+                rows.append((uuid[1], target, connected is True))
+        return rows
+
+    def run(self):
+        while True:
+            rows = self.poll()
+            if rows is None:
+                return
+            now = time.time()
+            changed = pending = False
+            for uuid, target, connected in rows:
+                entry = self.connections.get(uuid)
+                if entry is None:
+                    entry = self.connections[uuid] = {
+                        'alvo': target, 'visto': now, 'latencia': None}
+                    changed = True
+                if entry['latencia'] is None:
+                    if connected:
+                        entry['latencia'] = now - entry['visto']
+                        changed = True
+                    else:
+                        pending = True
+            if changed:
+                self.save()
+            time.sleep(self.interval if pending or not rows else 0.5)
+
+    def save(self):
+        tmp = '%s.tmp' % self.output
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.connections, f)
+        os.replace(tmp, self.output)
+
+
+def load_latency(path):
+    "Resumo das conexões medidas pelos ganchos (ou ``None``)."
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def attach(record, lease, latency):
+    "Vaga, portas e latência de conexão no ``RunRecord``."
+    record.extra['controlador'] = {
+        'vaga': lease.slot, 'porta': lease.port, 'portas': lease.ports,
+        'partida': lease.started, 'conexoes': latency or {},
+        'erro': lease.error}
+    values = [v['latencia'] for v in (latency or {}).values()
+              if v.get('latencia') is not None]
+    if values:
+        record.metrics['controlador_conexao'] = (max(values), 's')
+    if lease.started:
+        record.metrics['controlador_partida'] = (lease.started, 's')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.controladores',
+        description='Pool de controladores OpenFlow das execuções.')
+    parser.add_argument('--diretorio', default=POOL_DIR)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('estado', help='vagas com controlador iniciado')
+    sub.add_parser('parar', help='encerra os controladores do pool')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    pool = ControllerPool(args.diretorio)
+    if args.comando == 'parar':
+        print('%d controladores encerrados' % pool.stop())
+        return 0
+    for slot, port, pid, up in pool.status():
+        print('vaga %02d  porta %d  pid %d  %s'
+              % (slot, port, pid, 'no ar' if up else 'parado'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+Classificação automática das falhas em sintaxe, lógica/execução e
+alucinação.
+
+Combina as evidências disponíveis para cada execução que falhou: o
+traceback capturado na execução real ou simulada, os problemas da
+verificação estática e as métricas (perda total no ``pingAll``). Cada
+falha recebe uma classe e uma causa específica (ex.:
+``kwarg:Mininet_wifi.noise_threshold``, ``import:mn_wifi.node.Controller``).
+
+O traceback é normalizado (sem caminhos do script, números de linha e
+endereços) e resumido em um hash, de modo que milhares de falhas se
+agrupam em tempo linear por ``GROUP BY signature``.
+
+Exemplo::
+
+    python3 -m avaliacao.erros classificar
+    python3 -m avaliacao.erros grupos --min 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass
+
+from avaliacao import catalogo, estatico, resultados
+
+SYNTAX = 'sintaxe'
+LOGIC = 'logica'
+HALLUCINATION = 'alucinacao'
+
+FRAME_RE = re.compile(r'^  File "([^"]+)", line \d+, in (\S+)', re.M)
+TRACEBACK_RE = re.compile(r'^Traceback \(most recent call last\):', re.M)
+EXCEPTION_RE = re.compile(r'^([A-Za-z_][\w.]*(?:Error|Exception|Exit|'
+                          r'Interrupt|Warning))(?::\s*(.*))?$', re.M)
+
+# Mensagens das exceções que denunciam APIs inexistentes
+CANNOT_IMPORT_RE = re.compile(
+    r"cannot import name '(\w+)' from '([\w.]+)'")
+NO_MODULE_RE = re.compile(r"No module named '([\w.]+)'")
+KWARG_RE = re.compile(
+    r"(?:([\w.]+)\.)?(\w+)\(\) got an unexpected keyword argument '(\w+)'")
+OBJECT_ATTR_RE = re.compile(r"'(\w+)' object has no attribute '(\w+)'")
+MODULE_ATTR_RE = re.compile(r"module '([\w.]+)' has no attribute '(\w+)'")
+CALL_RE = re.compile(r'([A-Za-z_]\w*)\s*\(')
+
+# Mensagens dos problemas da verificação estática
+ISSUE_PATTERNS = (
+    (re.compile(r'(?:módulo|nome) inexistente: ([\w.]+)'), 'import'),
+    (re.compile(r"(\w+)\(\) não aceita o argumento '(\w+)'"), 'kwarg'),
+    (re.compile(r'(\w+) não possui o método (\w+)\(\)'), 'metodo'),
+)
+
+# Trechos de caminho que identificam bibliotecas (mantidos na assinatura)
+LIBRARY_MARKERS = ('mn_wifi/', 'mininet/', 'site-packages/', 'dist-packages/',
+                   '/lib/python')
+
+ADDRESS_RE = re.compile(r'0x[0-9a-fA-F]+')
+NUMBER_RE = re.compile(r'\b\d+(\.\d+)?\b')
+PATH_RE = re.compile(r'(/[^\s\'"]+)+')
+
+
+@dataclass
+class Classification:
+    "Classe, causa específica e assinatura de uma falha."
+    error_class: str
+    cause: str
+    signature: str
+
+
+@dataclass
+class Traceback:
+    "Último traceback encontrado em uma saída."
+    frames: list
+    exc_type: str
+    message: str
+
+    @property
+    def short_type(self):
+        return self.exc_type.rpartition('.')[2]
+
+
+def parse_traceback(text):
+    "Último traceback de ``text`` (ou ``None``)."
+    match = None
+    for match in TRACEBACK_RE.finditer(text or ''):
+        pass
+    if not match:
+        return None
+    body = text[match.end():]
+    frames = FRAME_RE.findall(body)
+    exceptions = [m for m in EXCEPTION_RE.finditer(body)
+                  if not m.group(0).startswith(' ')]
+    if not exceptions:
+        return None
+    last = exceptions[-1]
+    return Traceback(frames, last.group(1), (last.group(2) or '').strip())
+
+
+def _frame_label(path, function):
+    """Rótulo do quadro sem o caminho do script nem o número da linha.
+
+    Os nomes das funções do script são escolha do modelo e também são
+    descartados; quadros do ambiente de avaliação (stubs da simulação) e
+    do interpretador não entram na assinatura."""
+    path = path.replace('\\', '/')
+    if _harness(path):
+        return None
+    for marker in LIBRARY_MARKERS:
+        index = path.find(marker)
+        if index >= 0:
+            if marker.startswith(('mn_wifi', 'mininet')):
+                return '%s:%s' % (path[index:], function)
+            return '%s:%s' % (os.path.basename(path), function)
+    return '<script>'
+
+
+def _harness(path):
+    return ('/avaliacao/' in path or path.startswith('<')
+            or path.endswith('/runpy.py'))
+
+
+def normalize_message(message):
+    message = ADDRESS_RE.sub('0x?', message)
+    message = PATH_RE.sub(lambda m: os.path.basename(m.group(0)), message)
+    message = NUMBER_RE.sub('N', message)
+    return ' '.join(message.split())
+
+
+def signature(exc_type, message, frames=()):
+    "Hash da exceção normalizada e da pilha sem detalhes da execução."
+    labels = []
+    for path, function in frames:
+        label = _frame_label(path, function)
+        if label and (not labels or labels[-1] != label):
+            labels.append(label)
+    text = '\n'.join([exc_type.rpartition('.')[2],
+                      normalize_message(message)] + labels)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _tracked(name):
+    return catalogo.Catalog.tracked(name)
+
+
+def _catalog_classes(catalog):
+    "Nomes das classes do catálogo (para reconhecer objetos mn_wifi)."
+    return {name for module in catalog.modules.values()
+            for name, entry in module.get('names', {}).items()
+            if entry.get('kind') == 'class'}
+
+
+def _kwarg_owner(tb, label, source_line=''):
+    "Classe ou função que recebeu o argumento inesperado."
+    if (label and label != '__init__') or source_line.startswith('raise'):
+        return label
+    match = CALL_RE.search(source_line)
+    return match.group(1) if match else label
+
+
+def classify_traceback(tb, catalog, source_line=''):
+    "Classe e causa a partir de um traceback."
+    message = tb.message
+    if tb.short_type in ('SyntaxError', 'IndentationError', 'TabError'):
+        return SYNTAX, 'sintaxe:%s' % normalize_message(message)
+    if tb.short_type in ('ImportError', 'ModuleNotFoundError'):
+        match = CANNOT_IMPORT_RE.search(message)
+        if match and _tracked(match.group(2)):
+            return HALLUCINATION, 'import:%s.%s' % (match.group(2),
+                                                    match.group(1))
+        match = NO_MODULE_RE.search(message)
+        if match and _tracked(match.group(1)):
+            return HALLUCINATION, 'import:%s' % match.group(1)
+        if match:
+            return LOGIC, 'dependencia:%s' % match.group(1)
+    if tb.short_type == 'TypeError':
+        match = KWARG_RE.search(message)
+        if match:
+            owner = match.group(1) or _kwarg_owner(tb, match.group(2),
+                                                   source_line)
+            return HALLUCINATION, 'kwarg:%s.%s' % (owner.rpartition('.')[2],
+                                                   match.group(3))
+    if tb.short_type == 'AttributeError':
+        match = MODULE_ATTR_RE.search(message)
+        if match and _tracked(match.group(1)):
+            return HALLUCINATION, 'atributo:%s.%s' % match.groups()
+        match = OBJECT_ATTR_RE.search(message)
+        if match and match.group(1) in _catalog_classes(catalog):
+            return HALLUCINATION, 'atributo:%s.%s' % match.groups()
+    return LOGIC, '%s:%s' % (tb.short_type, normalize_message(message))
+
+
+def classify_issues(issues):
+    "Classe e causa a partir dos problemas fatais da verificação estática."
+    for issue in issues:
+        if not issue.fatal:
+            continue
+        if issue.kind == 'sintaxe':
+            return SYNTAX, 'sintaxe:%s' % normalize_message(issue.message)
+        for pattern, kind in ISSUE_PATTERNS:
+            match = pattern.search(issue.message)
+            if match:
+                return HALLUCINATION, '%s:%s' % (kind, '.'.join(
+                    match.groups()))
+        return HALLUCINATION, '%s:%s' % (issue.kind, issue.message)
+    return None
+
+
+def _source_line(output, tb):
+    """Linha de código exibida logo após o último quadro do traceback
+    fora do ambiente de avaliação."""
+    frames = [f for f in tb.frames if not _harness(f[0])]
+    if not frames:
+        return ''
+    index = output.rfind('  File "%s"' % frames[-1][0])
+    lines = output[index:].splitlines()
+    return lines[1].strip() if len(lines) > 1 else ''
+
+
+def classify(output='', issues=(), dry_run_traceback='', timed_out=False,
+             ping_loss=None, catalog=None):
+    """Classifica uma falha; ``None`` se não houver evidência de falha.
+
+    A ordem de precedência é: erro de sintaxe na verificação estática,
+    traceback da execução real, traceback da execução simulada, problemas
+    fatais da verificação estática, tempo limite e ausência total de
+    conectividade."""
+    catalog = catalog or catalogo.load()
+    static = classify_issues(issues)
+    if static and static[0] == SYNTAX:
+        return Classification(*static, signature('SyntaxError', static[1]))
+    for text in (output, dry_run_traceback):
+        tb = parse_traceback(text)
+        if tb:
+            error_class, cause = classify_traceback(
+                tb, catalog, _source_line(text, tb))
+            return Classification(error_class, cause,
+                                  signature(tb.exc_type, tb.message,
+                                            tb.frames))
+    if static:
+        return Classification(*static, signature('estatico', static[1]))
+    if timed_out:
+        cause = 'tempo limite excedido'
+    elif ping_loss is not None and ping_loss >= 100:
+        cause = 'sem conectividade (pingAll 100% de perda)'
+    else:
+        return None
+    return Classification(LOGIC, cause, signature('execucao', cause))
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def classify_row(store, row):
+    "Classifica um registro de ``runs`` a partir das evidências gravadas."
+    run, script, version, extra = row
+    extra = json.loads(extra or '{}')
+    try:
+        catalog = catalogo.load(version or catalogo.DEFAULT_VERSION)
+    except OSError:
+        catalog = catalogo.load()
+    issues = (estatico.check_file(script, catalog)
+              if script and os.path.exists(script) else [])
+    output = ''.join(_read(path) for (path,) in store.db.execute(
+        "SELECT path FROM artifacts WHERE run = ? AND kind = 'saida'",
+        (run,)))
+    loss = store.db.execute(
+        "SELECT value FROM metrics WHERE run = ? AND name = 'ping_perda'",
+        (run,)).fetchone()
+    # ``simulacao`` só existe (como dicionário) nos estágios que simulam
+    simulation = extra.get('simulacao')
+    if not isinstance(simulation, dict):
+        simulation = {}
+    return classify(output, issues, simulation.get('traceback') or '',
+                    extra.get('tempo_limite', False),
+                    loss[0] if loss else None, catalog)
+
+
+def classify_store(store, reclassify=False):
+    """Classifica em lote as execuções que falharam (``ran = 0`` ou
+    ``functional = 0``); devolve o número de registros atualizados."""
+    where = '(ran = 0 OR functional = 0)'
+    if not reclassify:
+        where += ' AND error_class IS NULL'
+    rows = store.db.execute(
+        'SELECT id, script, mnwifi_version, extra FROM runs WHERE ' + where
+    ).fetchall()
+    updates = []
+    for row in rows:
+        found = classify_row(store, row)
+        if found:
+            updates.append((found.error_class, found.cause, found.signature,
+                            row[0]))
+    with store.db:
+        store.db.executemany(
+            'UPDATE runs SET error_class = ?, error_cause = ?, '
+            'signature = ? WHERE id = ?', updates)
+    return len(updates)
+
+
+def clusters(store, minimum=1):
+    "Grupos de falhas com a mesma assinatura, dos mais frequentes."
+    return store.db.execute(
+        'SELECT signature, COUNT(*), error_class, error_cause, '
+        'GROUP_CONCAT(DISTINCT model) FROM runs '
+        'WHERE signature IS NOT NULL GROUP BY signature '
+        'HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC', (minimum,)).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.erros',
+        description='Classifica as falhas em sintaxe, lógica e alucinação.')
+    parser.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    cls = sub.add_parser('classificar', help='classifica as falhas em lote')
+    cls.add_argument('--todos', action='store_true',
+                     help='reclassifica também as já classificadas')
+    grp = sub.add_parser('grupos', help='agrupa as falhas por assinatura')
+    grp.add_argument('--min', type=int, default=1,
+                     help='tamanho mínimo do grupo')
+    args = parser.parse_args(argv)
+    store = resultados.ResultsStore(args.banco)
+    if args.comando == 'classificar':
+        print('%d falhas classificadas' % classify_store(store, args.todos))
+    else:
+        for sig, count, error_class, cause, models in clusters(store,
+                                                              args.min):
+            print('%s %4d %-10s %s (%s)' % (sig, count, error_class, cause,
+                                             models))
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
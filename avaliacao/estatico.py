@@ -0,0 +1,237 @@
+"""
+Verificação estática dos scripts contra o catálogo de APIs.
+
+Detecta, sem executar o script, as alucinações mais comuns descritas
+no README: imports de módulos ou nomes inexistentes, argumentos
+nomeados que o construtor do ``Mininet_wifi`` rejeita e métodos
+inventados na rede. Chaves desconhecidas em ``**params`` de nós e
+links não causam erro no Mininet-WiFi e são apenas avisos.
+
+A verificação é feita instrução por instrução, de modo que possa
+acompanhar a geração em streaming (ver ``avaliacao.extracao``).
+"""
+
+import argparse
+import ast
+import sys
+from dataclasses import dataclass
+
+from avaliacao import catalogo
+
+# Campos de instruções compostas que contêm outras instruções
+_BLOCK_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+ERROR = 'erro'
+WARNING = 'aviso'
+
+
+@dataclass
+class Issue:
+    "Problema encontrado em uma linha do script."
+    kind: str
+    severity: str
+    line: int
+    message: str
+
+    @property
+    def fatal(self):
+        return self.severity == ERROR
+
+    def __str__(self):
+        return '%d: %s [%s] %s' % (self.line, self.severity, self.kind,
+                                   self.message)
+
+
+def iter_statements(node):
+    "Instruções da árvore em ordem de aparição no código."
+    for field in _BLOCK_FIELDS:
+        for child in getattr(node, field, None) or ():
+            if isinstance(child, ast.stmt):
+                yield child
+            yield from iter_statements(child)
+
+
+def _own_nodes(stmt):
+    "Nós da instrução, sem descer nos blocos aninhados."
+    for field, value in ast.iter_fields(stmt):
+        if field in _BLOCK_FIELDS:
+            continue
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, ast.AST):
+                yield from ast.walk(item)
+
+
+class StatementChecker:
+    """Verifica instruções uma a uma, acumulando os nomes importados e as
+    variáveis que recebem instâncias de classes catalogadas."""
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or catalogo.load()
+        self.bindings = {}
+        self.instances = {}
+        self.missing = set()
+
+    def qualify(self, expr):
+        "Nome qualificado de uma expressão ``a.b.c`` importada, ou ``None``."
+        if isinstance(expr, ast.Name):
+            return self.bindings.get(expr.id)
+        if isinstance(expr, ast.Attribute):
+            base = self.qualify(expr.value)
+            if base:
+                return base + '.' + expr.attr
+        return None
+
+    def check(self, stmt):
+        "Problemas de uma instrução; atualiza o contexto de nomes."
+        if isinstance(stmt, ast.Import):
+            return self._import(stmt)
+        if isinstance(stmt, ast.ImportFrom):
+            return self._import_from(stmt)
+        issues = []
+        for node in _own_nodes(stmt):
+            if isinstance(node, ast.Call):
+                issues.extend(self._call(node))
+        self._track_assignment(stmt)
+        return issues
+
+    def _import(self, stmt):
+        issues = []
+        for alias in stmt.names:
+            if (self.catalog.tracked(alias.name)
+                    and not self.catalog.has_module(alias.name)):
+                issues.append(Issue('import', ERROR, stmt.lineno,
+                                    'módulo inexistente: %s' % alias.name))
+            if alias.asname:
+                self.bindings[alias.asname] = alias.name
+            else:
+                top = alias.name.split('.')[0]
+                self.bindings[top] = top
+        return issues
+
+    def _import_from(self, stmt):
+        module = stmt.module or ''
+        if stmt.level or not self.catalog.tracked(module):
+            return []
+        if not self.catalog.has_module(module):
+            return [Issue('import', ERROR, stmt.lineno,
+                          'módulo inexistente: %s' % module)]
+        issues = []
+        for alias in stmt.names:
+            if alias.name == '*':
+                continue
+            qualname = '%s.%s' % (module, alias.name)
+            known = (self.catalog.lookup(qualname) is not None
+                     or self.catalog.has_module(qualname))
+            if not known and self.catalog.exhaustive(module):
+                self.missing.add(qualname)
+                issues.append(Issue('import', ERROR, stmt.lineno,
+                                    'nome inexistente: %s' % qualname))
+            self.bindings[alias.asname or alias.name] = qualname
+        return issues
+
+    def _keywords(self, call, entry, label):
+        issues = []
+        params = set(entry.get('params', ()))
+        keys = entry.get('keys')
+        for kw in call.keywords:
+            if kw.arg is None or kw.arg in params:
+                continue
+            if not entry.get('varkw'):
+                issues.append(Issue(
+                    'kwarg', ERROR, call.lineno,
+                    '%s() não aceita o argumento %r' % (label, kw.arg)))
+            elif keys is not None and kw.arg not in keys:
+                issues.append(Issue(
+                    'parametro', WARNING, call.lineno,
+                    '%s(): parâmetro %r desconhecido (ignorado)'
+                    % (label, kw.arg)))
+        return issues
+
+    def _call(self, call):
+        func = call.func
+        qualname = self.qualify(func)
+        if qualname and self.catalog.tracked(qualname):
+            entry = self.catalog.lookup(qualname)
+            if entry is None:
+                module = qualname.rpartition('.')[0]
+                if (self.catalog.exhaustive(module)
+                        and qualname not in self.missing):
+                    self.missing.add(qualname)
+                    return [Issue('metodo', ERROR, call.lineno,
+                                  'nome inexistente: %s' % qualname)]
+                return []
+            return self._keywords(call, entry, qualname.rpartition('.')[2])
+        if (isinstance(func, ast.Attribute)
+                and isinstance(func.value, ast.Name)
+                and func.value.id in self.instances):
+            cls = self.instances[func.value.id]
+            entry = self.catalog.method(cls, func.attr)
+            if entry is None:
+                return [Issue('metodo', ERROR, call.lineno,
+                              '%s não possui o método %s()'
+                              % (cls.rpartition('.')[2], func.attr))]
+            return self._keywords(call, entry, func.attr)
+        return []
+
+    def _track_assignment(self, stmt):
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+            target, value = stmt.targets[0], stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            target, value = stmt.target, stmt.value
+        else:
+            return
+        if not isinstance(target, ast.Name):
+            return
+        qualname = None
+        if isinstance(value, ast.Call):
+            qualname = self.qualify(value.func)
+        if qualname and self.catalog.has_methods(qualname):
+            self.instances[target.id] = qualname
+        else:
+            self.instances.pop(target.id, None)
+
+
+def syntax_issue(exc):
+    return Issue('sintaxe', ERROR, exc.lineno or 0,
+                 '%s' % (exc.msg or exc.__class__.__name__))
+
+
+def check_source(source, catalog=None):
+    "Todos os problemas de um script completo."
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as exc:
+        return [syntax_issue(exc)]
+    checker = StatementChecker(catalog)
+    issues = []
+    for stmt in iter_statements(tree):
+        issues.extend(checker.check(stmt))
+    return issues
+
+
+def check_file(path, catalog=None):
+    with open(path, encoding='utf-8') as f:
+        return check_source(f.read(), catalog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.estatico',
+        description='Verifica scripts contra o catálogo do Mininet-WiFi.')
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--versao', default=catalogo.DEFAULT_VERSION)
+    args = parser.parse_args(argv)
+    catalog = catalogo.load(args.versao)
+    failed = 0
+    for path in args.scripts:
+        issues = check_file(path, catalog)
+        if any(i.fatal for i in issues):
+            failed += 1
+        for issue in issues:
+            print('%s:%s' % (path, issue))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
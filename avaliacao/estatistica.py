@@ -0,0 +1,332 @@
+"""
+Análise estatística dos resultados (modelo × nível × tipo de prompt).
+
+Lê o repositório de resultados (``avaliacao.resultados``) e calcula:
+
+* taxas de sucesso por célula com intervalo de confiança bootstrap;
+* o efeito pareado do prompt detalhado sobre o simples (mesmo modelo,
+  nível e amostra), com IC bootstrap e teste exato de McNemar;
+* teste exato de Fisher (simples × detalhado) e qui-quadrado de
+  independência entre modelos.
+
+A reamostragem é vetorizada com NumPy: todas as células e todas as
+réplicas são sorteadas de uma vez, então 10.000 réplicas sobre milhares
+de execuções levam segundos. As tabelas saem em Markdown, CSV ou LaTeX.
+
+Exemplo::
+
+    python3 -m avaliacao.estatistica --estagio execucao --formato latex
+"""
+
+import argparse
+import csv
+import io
+import math
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from avaliacao import resultados
+
+OUTCOMES = ('ran', 'functional')
+HEADERS = {'ran': 'rodou', 'functional': 'funcional'}
+CHUNK = 4000000
+
+
+def load_outcomes(store, stage, outcome='ran'):
+    """Linhas ``(modelo, nivel, tipo, amostra, sucesso)`` de um estágio.
+
+    Execuções sem número de amostra são numeradas pela ordem de criação
+    dentro da célula, para o pareamento simples × detalhado."""
+    if outcome not in OUTCOMES:
+        raise ValueError('resultado inválido: %r' % outcome)
+    rows = store.db.execute(
+        'SELECT model, level, prompt_type, sample, %s FROM runs '
+        'WHERE stage = ? AND %s IS NOT NULL AND model IS NOT NULL '
+        'ORDER BY created' % (outcome, outcome), (stage,)).fetchall()
+    counters = defaultdict(int)
+    result = []
+    for model, level, prompt_type, sample, value in rows:
+        if sample is None:
+            key = (model, level, prompt_type)
+            sample = counters[key]
+            counters[key] += 1
+        result.append((model, level, prompt_type, sample, int(value)))
+    return result
+
+
+def rates(rows, by=(0, 1, 2)):
+    "Sucessos e total por grupo (índices das colunas de ``rows``)."
+    groups = defaultdict(lambda: [0, 0])
+    for row in rows:
+        g = groups[tuple(row[i] for i in by)]
+        g[0] += row[4]
+        g[1] += 1
+    keys = sorted(groups)
+    successes = np.array([groups[k][0] for k in keys])
+    totals = np.array([groups[k][1] for k in keys])
+    return keys, successes, totals
+
+
+def bootstrap_rates(successes, totals, draws=10000, confidence=0.95,
+                    rng=None):
+    """IC percentil de cada taxa; reamostrar n resultados de Bernoulli é
+    equivalente a sortear de uma binomial, para todas as células de uma
+    vez (matriz células × réplicas)."""
+    rng = rng or np.random.default_rng()
+    p = successes / totals
+    samples = rng.binomial(totals[:, None], p[:, None],
+                           size=(len(totals), draws)) / totals[:, None]
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha], axis=1)
+    return p, low, high
+
+
+def pairs(rows, by=(0,)):
+    """Pares (simples, detalhado) com mesmo modelo, nível e amostra,
+    agrupados pelas colunas ``by``."""
+    cells = {}
+    for model, level, prompt_type, sample, value in rows:
+        cells[(model, level, sample, prompt_type)] = value
+    grouped = defaultdict(list)
+    for (model, level, sample, prompt_type), value in cells.items():
+        if prompt_type != 's' or (model, level, sample, 'd') not in cells:
+            continue
+        row = (model, level, prompt_type, sample)
+        grouped[tuple(row[i] for i in by)].append(
+            (value, cells[(model, level, sample, 'd')]))
+    return {k: np.array(v) for k, v in sorted(grouped.items())}
+
+
+def bootstrap_paired(pairs_array, draws=10000, confidence=0.95, rng=None):
+    """Efeito médio (detalhado - simples) com IC percentil, reamostrando
+    os pares com reposição (matriz réplicas × pares)."""
+    rng = rng or np.random.default_rng()
+    diffs = pairs_array[:, 1] - pairs_array[:, 0]
+    # Réplicas em blocos para limitar a matriz a ~CHUNK elementos
+    step = max(1, CHUNK // len(diffs))
+    means = np.concatenate([
+        diffs[rng.integers(0, len(diffs),
+                           size=(min(step, draws - i), len(diffs)))]
+        .mean(axis=1) for i in range(0, draws, step)])
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return diffs.mean(), low, high
+
+
+def _log_comb(n, k):
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def mcnemar(pairs_array):
+    "Teste exato de McNemar (bilateral) sobre os pares discordantes."
+    b = int(np.sum((pairs_array[:, 0] == 1) & (pairs_array[:, 1] == 0)))
+    c = int(np.sum((pairs_array[:, 0] == 0) & (pairs_array[:, 1] == 1)))
+    n = b + c
+    if not n:
+        return 1.0
+    tail = sum(math.exp(_log_comb(n, i) - n * math.log(2))
+               for i in range(min(b, c) + 1))
+    return min(1.0, 2 * tail)
+
+
+def fisher_exact(a, b, c, d):
+    """Teste exato de Fisher bilateral para a tabela ``[[a, b], [c, d]]``
+    (soma das tabelas tão ou menos prováveis que a observada)."""
+    row1, col1, n = a + b, a + c, a + b + c + d
+
+    def log_p(x):
+        return (_log_comb(col1, x) + _log_comb(n - col1, row1 - x)
+                - _log_comb(n, row1))
+
+    observed = log_p(a)
+    lo, hi = max(0, row1 + col1 - n), min(row1, col1)
+    return min(1.0, sum(math.exp(log_p(x)) for x in range(lo, hi + 1)
+                        if log_p(x) <= observed + 1e-7))
+
+
+def _gammaincc(s, x):
+    "Função gama incompleta superior regularizada Q(s, x)."
+    if x <= 0:
+        return 1.0
+    if x < s + 1:
+        # Série para P(s, x)
+        term = total = 1.0 / s
+        k = s
+        while abs(term) > abs(total) * 1e-15:
+            k += 1
+            term *= x / k
+            total += term
+        return 1.0 - total * math.exp(-x + s * math.log(x) - math.lgamma(s))
+    # Fração contínua (Lentz) para Q(s, x)
+    tiny = 1e-300
+    b = x + 1 - s
+    c, d = 1 / tiny, 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - s)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + s * math.log(x) - math.lgamma(s)) * h
+
+
+def chi_square(table):
+    """Qui-quadrado de independência; devolve ``(estatistica, gl, p)``.
+    Linhas ou colunas vazias são descartadas."""
+    table = np.asarray(table, dtype=float)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    if min(table.shape) < 2:
+        return 0.0, 0, 1.0
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+    stat = float(((table - expected) ** 2 / expected).sum())
+    dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+    return stat, dof, _gammaincc(dof / 2, stat / 2)
+
+
+class Table:
+    "Tabela simples exportável em Markdown, CSV ou LaTeX."
+
+    def __init__(self, title, header, rows):
+        self.title = title
+        self.header = header
+        self.rows = rows
+
+    def cells(self):
+        return [[_format(v) for v in row] for row in self.rows]
+
+    def markdown(self):
+        lines = ['### ' + self.title, '',
+                 '| ' + ' | '.join(self.header) + ' |',
+                 '|' + '---|' * len(self.header)]
+        lines += ['| ' + ' | '.join(r) + ' |' for r in self.cells()]
+        return '\n'.join(lines) + '\n'
+
+    def csv(self):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(self.header)
+        writer.writerows(self.cells())
+        return out.getvalue()
+
+    def latex(self):
+        def esc(text):
+            return text.replace('_', r'\_').replace('%', r'\%')
+        lines = [r'% ' + self.title,
+                 r'\begin{tabular}{' + 'l' * len(self.header) + '}',
+                 r'\toprule',
+                 ' & '.join(esc(h) for h in self.header) + r' \\',
+                 r'\midrule']
+        lines += [' & '.join(esc(c) for c in r) + r' \\'
+                  for r in self.cells()]
+        lines += [r'\bottomrule', r'\end{tabular}']
+        return '\n'.join(lines) + '\n'
+
+    def render(self, fmt):
+        return getattr(self, {'md': 'markdown'}.get(fmt, fmt))()
+
+
+def _format(value):
+    if isinstance(value, (float, np.floating)):
+        return '%.3f' % value
+    if isinstance(value, tuple):
+        return '[%.3f, %.3f]' % value
+    return str(value)
+
+
+def analyze(rows, draws=10000, confidence=0.95, seed=None, outcome='ran'):
+    "Tabelas da análise completa sobre as linhas de ``load_outcomes``."
+    rng = np.random.default_rng(seed)
+    name = HEADERS[outcome]
+    tables = []
+    keys, succ, tot = rates(rows)
+    p, low, high = bootstrap_rates(succ, tot, draws, confidence, rng)
+    tables.append(Table(
+        'Taxa de sucesso (%s) por modelo, nível e tipo de prompt' % name,
+        ['modelo', 'nível', 'tipo', 'n', 'sucessos', 'taxa', 'IC'],
+        [list(k) + [int(n), int(c), pi, (lo, hi)]
+         for k, n, c, pi, lo, hi in zip(keys, tot, succ, p, low, high)]))
+
+    paired = []
+    for by, label in (((0,), 'modelo'), ((1,), 'nível')):
+        for key, arr in pairs(rows, by).items():
+            mean, lo, hi = bootstrap_paired(arr, draws, confidence, rng)
+            paired.append([label, key[0], len(arr), arr[:, 0].mean(),
+                           arr[:, 1].mean(), mean, (lo, hi), mcnemar(arr)])
+    everything = pairs(rows, ()).get(())
+    if everything is not None:
+        mean, lo, hi = bootstrap_paired(everything, draws, confidence, rng)
+        paired.append(['total', '-', len(everything), everything[:, 0].mean(),
+                       everything[:, 1].mean(), mean, (lo, hi),
+                       mcnemar(everything)])
+    tables.append(Table(
+        'Efeito pareado do prompt detalhado (%s)' % name,
+        ['grupo', 'valor', 'pares', 'simples', 'detalhado', 'efeito', 'IC',
+         'p (McNemar)'], paired))
+
+    keys, succ, tot = rates(rows, (2,))
+    by_type = dict(zip([k[0] for k in keys], zip(succ, tot)))
+    tests = []
+    if 's' in by_type and 'd' in by_type:
+        (cs, ns), (cd, nd) = by_type['s'], by_type['d']
+        tests.append(['Fisher: simples × detalhado', '-',
+                      fisher_exact(int(cs), int(ns - cs),
+                                   int(cd), int(nd - cd))])
+    keys, succ, tot = rates(rows, (0,))
+    if len(keys) > 1:
+        stat, dof, pv = chi_square(np.stack([succ, tot - succ], axis=1))
+        tests.append(['Qui-quadrado: modelos (%d gl)' % dof, stat, pv])
+    keys, succ, tot = rates(rows, (1,))
+    if len(keys) > 1:
+        stat, dof, pv = chi_square(np.stack([succ, tot - succ], axis=1))
+        tests.append(['Qui-quadrado: níveis (%d gl)' % dof, stat, pv])
+    tables.append(Table('Testes de independência (%s)' % name,
+                        ['teste', 'estatística', 'p'], tests))
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.estatistica',
+        description='Análise estatística dos resultados.')
+    parser.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    parser.add_argument('--estagio', default='execucao',
+                        help='estágio dos registros (execucao, simulacao)')
+    parser.add_argument('--resultado', choices=OUTCOMES, default='ran')
+    parser.add_argument('--replicas', type=int, default=10000,
+                        help='réplicas bootstrap')
+    parser.add_argument('--confianca', type=float, default=0.95)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--formato', choices=('md', 'csv', 'latex'),
+                        default='md')
+    parser.add_argument('--saida', help='arquivo de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    store = resultados.ResultsStore(args.banco)
+    rows = load_outcomes(store, args.estagio, args.resultado)
+    store.close()
+    if not rows:
+        print('nenhum registro no estágio %r' % args.estagio,
+              file=sys.stderr)
+        return 1
+    tables = analyze(rows, args.replicas, args.confianca, args.seed,
+                     args.resultado)
+    text = '\n'.join(t.render(args.formato) for t in tables)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
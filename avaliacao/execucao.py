@@ -0,0 +1,520 @@
+"""
+Execução real dos scripts gerados no Mininet-WiFi.
+
+Cada script roda com ``sudo python3`` em um processo próprio, com
+tempo limite; a entrada padrão recebe ``exit`` para encerrar o
+``CLI(net)`` dos scripts interativos. A saída é guardada como artefato,
+as métricas impressas pelo Mininet (perda do ``pingAll``, vazão do
+``iperf``) são extraídas, e o resultado é gravado no repositório de
+resultados (``avaliacao.resultados``).
+
+Os scripts rodam por ``avaliacao.ganchos``: ``pkill``/``killall`` ficam
+restritos aos processos da própria execução e os processos em segundo
+plano de cada nó são registrados (``extra['processos']``), assim como os
+parâmetros nomeados que a biblioteca ignorou (``extra['parametros']``,
+``avaliacao.auditoria``). Cada execução tem ``/tmp`` privado
+(``avaliacao.isolamento``), guardado nos artefatos, uma vaga de portas
+de controlador (``avaliacao.controladores``) e, em execuções
+simultâneas, uma vaga de rádios hwsim (``avaliacao.radios``).
+Com ``--cli``, o ``CLI(net)`` recebe os comandos do cenário por um
+pseudoterminal (``avaliacao.sessao``) em vez de só ``exit``.
+
+Exemplo::
+
+    sudo python3 -m avaliacao.execucao scripts/basico/*.py
+"""
+
+import argparse
+import functools
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from avaliacao import (arquivo, auditoria, cenarios, cgrupos, controladores,
+                       erros, isolamento, limpeza, processos, radios,
+                       recursos, resultados, sessao)
+
+log = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = os.path.join(resultados.DEFAULT_DIR, 'artefatos')
+
+TRACEBACK_RE = re.compile(r'^Traceback \(most recent call last\):', re.M)
+EXCEPTION_RE = re.compile(r'^(\w+(?:\.\w+)*(?:Error|Exception|Exit)\b.*)$',
+                          re.M)
+PING_RE = re.compile(r'Results: (\d+(?:\.\d+)?)% dropped \((\d+)/(\d+)')
+IPERF_RE = re.compile(r"Results: \['([\d.]+) ([KMG]?)bits/sec'")
+STARTED_RE = re.compile(r'^\*\*\* (Starting|Configuring|Adding)', re.M)
+
+UNITS = {'': 1e-6, 'K': 1e-3, 'M': 1.0, 'G': 1e3}
+
+VERSION_PROBE = ('import mn_wifi.net as n; '
+                 'print(getattr(n, "VERSION", ""))')
+
+
+def installed_version(python='python3'):
+    "Versão do Mininet-WiFi instalado (ou ``None``)."
+    try:
+        out = subprocess.run([python, '-c', VERSION_PROBE],
+                             capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() or None if out.returncode == 0 else None
+
+
+def parse_metrics(output):
+    "Métricas impressas pelo Mininet na saída do script."
+    metrics = {}
+    pings = PING_RE.findall(output)
+    if pings:
+        metrics['ping_perda'] = (float(pings[-1][0]), '%')
+        metrics['ping_recebidos'] = (float(pings[-1][1]), 'pacotes')
+    iperf = IPERF_RE.findall(output)
+    if iperf:
+        value, prefix = iperf[-1]
+        metrics['iperf_vazao'] = (float(value) * UNITS[prefix], 'Mbit/s')
+    return metrics
+
+
+def last_exception(output):
+    "Última linha de exceção após um traceback (ou ``None``)."
+    match = None
+    for match in TRACEBACK_RE.finditer(output):
+        pass
+    if not match:
+        return None
+    found = EXCEPTION_RE.findall(output[match.end():])
+    return found[-1] if found else None
+
+
+def cleanup(sudo=True):
+    "Limpa restos de execuções anteriores (``mn -c``)."
+    command = ['mn', '-c']
+    if sudo and os.geteuid() != 0:
+        command = ['sudo', '-n'] + command
+    try:
+        subprocess.run(command, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=120)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        log.warning('*** mn -c falhou: %s', exc)
+
+
+class Runner:
+    "Executa scripts e produz ``RunRecord`` do estágio ``execucao``."
+
+    def __init__(self, timeout=120, python='python3', sudo=True,
+                 stdin='exit\n', artifacts=ARTIFACTS_DIR, clean=True,
+                 version=None, archive=None, sample_interval=None,
+                 limits=None, hooks=True, private_tmp=True,
+                 controllers=None, radio_pool=None, session=None):
+        self.timeout = timeout
+        self.python = python
+        self.sudo = sudo and os.geteuid() != 0
+        self.stdin = stdin
+        self.artifacts = artifacts
+        self.clean = clean
+        self.baseline = None
+        if clean:
+            # Referência salva com o host limpo ou, na falta dela, o
+            # estado do host depois de um ``mn -c``.
+            self.baseline = limpeza.load_baseline()
+            if self.baseline is None:
+                cleanup(self.sudo)
+                self.baseline = limpeza.snapshot()
+        self.version = version or installed_version(python)
+        # Com arquivo, os logs de cada execução são coletados e comprimidos
+        # (execuções paralelas misturariam os logs de /tmp).
+        self.archive = archive
+        # Intervalo (s) do amostrador de recursos por nó; None desliga
+        self.sample_interval = sample_interval
+        # Limites de CPU/memória/processos (cgroup v2) por execução
+        self.limits = limits
+        # Escopo de pkill/killall e registro de processos por nó
+        self.hooks = hooks
+        # /tmp privado por execução (caminhos fixos dos scripts)
+        self.private_tmp = private_tmp
+        if private_tmp:
+            try:
+                isolamento.check(self.sudo)
+            except RuntimeError as exc:
+                log.warning('*** /tmp compartilhado entre execuções: %s', exc)
+                self.private_tmp = False
+        # Pool de controladores (portas por execução); depende dos ganchos
+        self.controllers = controllers if hooks else None
+        # Vagas de rádios hwsim e nomes (execuções simultâneas)
+        self.radio_pool = radio_pool if hooks else None
+        if self.radio_pool:
+            try:
+                self.radio_pool.prepare()
+            except RuntimeError as exc:
+                log.warning('*** rádios sem alocação: %s', exc)
+                self.radio_pool = None
+        # Comandos digitados no CLI(net) por um pseudoterminal
+        self.session = session
+
+    def command(self, script, envelope=None, tmp=None, environment=()):
+        """Linha de comando do script; ``environment`` (``CHAVE=valor``)
+        configura os ganchos."""
+        command = [self.python, '-u', script]
+        if self.hooks:
+            # Por ``env``: o sudo pode descartar PYTHONPATH do ambiente
+            path = os.pathsep.join(
+                p for p in (cenarios.ROOT, os.environ.get('PYTHONPATH')) if p)
+            command = (['env', 'PYTHONPATH=%s' % path,
+                        '%s=1' % processos.SESSION_ENV] + list(environment)
+                       + [self.python, '-u', '-m', 'avaliacao.ganchos',
+                          script])
+        if envelope:
+            command = envelope.wrap(command)
+        if tmp:
+            command = tmp.wrap(command)
+        if self.sudo:
+            command = ['sudo', '-n', '-E'] + command
+        return command
+
+    def run(self, script):
+        record = resultados.RunRecord.for_script(
+            'execucao', script, mnwifi_version=self.version)
+        directory = os.path.join(self.artifacts, record.run_id)
+        os.makedirs(directory, exist_ok=True)
+        radio = None
+        if self.radio_pool:
+            radio = self.radio_pool.lease()
+        tmp = collector = sampler = envelope = lease = None
+        try:
+            if self.clean:
+                self.reap(record, 'limpeza', radio and radio.owner())
+            if self.private_tmp and os.path.realpath(
+                    record.script).startswith('/tmp/'):
+                log.warning('*** %s está em /tmp: /tmp compartilhado',
+                            record.script)
+            elif self.private_tmp:
+                tmp = isolamento.PrivateTmp(os.path.join(directory, 'tmp'))
+                tmp.create()
+            if self.archive:
+                # Com /tmp privado, os logs de /tmp vêm do diretório da
+                # execução
+                collector = arquivo.LogCollector(
+                    [p for p in arquivo.LOG_SOURCES
+                     if not (tmp and p.startswith('/tmp/'))])
+                collector.snapshot()
+            if self.sample_interval:
+                sampler = recursos.ResourceSampler(
+                    self.sample_interval).start()
+            if self.limits:
+                envelope = cgrupos.Envelope(record.run_id,
+                                            self.limits).create()
+            path = os.path.join(directory, 'saida.log')
+            registry = self._output(directory, 'processos.json')
+            audit = self._output(directory, 'parametros.json')
+            environment = ['%s=%s' % (processos.REGISTRY_ENV, registry),
+                           '%s=%s' % (auditoria.CONFIG_ENV, audit)]
+            if self.controllers:
+                lease = self.lease_controller(record)
+                config = lease.config(
+                    self._output(directory, 'controlador.json'))
+                environment.append('%s=%s' % (controladores.CONFIG_ENV,
+                                              config))
+            if radio:
+                config = radio.config(self._output(directory, 'radios.json'))
+                environment.append('%s=%s' % (radios.CONFIG_ENV, config))
+            start = time.time()
+            if self.session:
+                result = self.converse(
+                    record, path, envelope, tmp, environment,
+                    radio and functools.partial(
+                        radio.names, self._output(directory, 'radios.json')))
+            else:
+                result = self.execute(record.script, path, envelope, tmp,
+                                      environment)
+            output, record.returncode, timed_out, session = result
+            record.phase('execucao', start, time.time() - start)
+            if lease:
+                self.controllers.release(lease)
+                controladores.attach(
+                    record, lease, controladores.load_latency(
+                        self._output(directory, 'controlador.json')))
+            if tmp:
+                tmp.attach(record)
+            auditoria.attach(record, auditoria.load(audit))
+            if os.path.exists(registry):
+                record.extra['processos'] = processos.Registry.load(
+                    registry).nodes
+                record.artifacts.append(('processos', registry))
+            if envelope:
+                envelope.attach(record)
+                envelope.remove()
+            if sampler:
+                sampler.stop()
+                sampler.attach(record)
+            if collector:
+                start = time.time()
+                self.archive.add(record.run_id,
+                                 [('saida.log', output)] + collector.collect()
+                                 + (tmp.collect() if tmp else []))
+                record.artifacts.append(('arquivo', self.archive.directory))
+                record.phase('arquivamento', start, time.time() - start)
+            if self.clean:
+                self.reap(record, 'limpeza_final',
+                          radio and radio.owner(session))
+            if radio:
+                radios.attach(record, radio,
+                              self._output(directory, 'radios.json'))
+        finally:
+            # Também numa exceção: vagas, cgroup e amostrador não podem
+            # ficar presos (as chamadas repetidas não fazem nada)
+            if lease:
+                self.controllers.release(lease)
+            if envelope:
+                envelope.remove()
+            if sampler:
+                sampler.stop()
+            if radio:
+                self.radio_pool.release(radio)
+        record.artifacts.append(('saida', path))
+        self.describe(record, output, timed_out)
+        return record
+
+    @staticmethod
+    def _output(directory, name):
+        "Arquivo gravado pelos ganchos no diretório da execução."
+        return os.path.abspath(os.path.join(directory, name))
+
+    def lease_controller(self, record):
+        """Vaga de controlador da execução; o controlador do pool só sobe
+        para scripts com ``RemoteController``."""
+        start = time.time()
+        lease = self.controllers.lease()
+        try:
+            with open(record.script, encoding='utf-8') as f:
+                remote = 'RemoteController' in f.read()
+        except OSError:
+            remote = False
+        if remote:
+            try:
+                self.controllers.ensure(lease)
+            except RuntimeError as exc:
+                # Sem remapear: o script fica com as portas que escolheu
+                log.warning('*** controlador do pool indisponível: %s', exc)
+                lease.error = str(exc)
+            except BaseException:
+                self.controllers.release(lease)
+                raise
+        record.phase('controlador', start, time.time() - start)
+        return lease
+
+    def execute(self, script, path, envelope=None, tmp=None,
+                environment=()):
+        """Executa o script com a saída gravada em ``path``.
+
+        A saída vai para um arquivo, não para um pipe: processos deixados
+        em segundo plano (``iperf -s &``) herdariam o pipe e prenderiam a
+        leitura até o tempo limite. Só o processo principal é esperado;
+        no tempo limite, o grupo de processos inteiro é encerrado. Devolve
+        também a sessão do script (o pid, com ``start_new_session``)."""
+        timed_out = False
+        with open(path, 'w+', encoding='utf-8', errors='replace') as out:
+            proc = subprocess.Popen(
+                self.command(script, envelope, tmp, environment),
+                stdin=subprocess.PIPE,
+                stdout=out, stderr=subprocess.STDOUT, text=True,
+                cwd=os.path.dirname(script), start_new_session=True)
+            try:
+                proc.communicate(self.stdin, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                self.kill_group(proc)
+            out.seek(0)
+            output = out.read()
+        return (output, (None if timed_out else proc.returncode), timed_out,
+                proc.pid)
+
+    def converse(self, record, path, envelope=None, tmp=None,
+                 environment=(), names=None):
+        """Como ``execute``, mas num pseudoterminal, digitando no
+        ``CLI(net)`` os comandos da sessão (``avaliacao.sessao``);
+        ``names()`` traduz os nomes de uma vaga de rádios."""
+        result = self.session.drive(
+            self.command(record.script, envelope, tmp, environment), path,
+            record.script, self.timeout, self.kill_group, names)
+        sessao.attach(record, result)
+        return (result.output, result.returncode, result.timed_out,
+                result.pid)
+
+    def kill_group(self, proc):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except PermissionError:
+            subprocess.run(['sudo', '-n', 'kill', '-9', '--',
+                            '-%d' % proc.pid], stderr=subprocess.DEVNULL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+    def reap(self, record, prefix, owned=None):
+        """Remove o que difere da referência; ``mn -c`` se algo restar.
+
+        Com ``owned`` (vaga de rádios), só o que é da execução sai e não há
+        ``mn -c``, que derrubaria as execuções simultâneas."""
+        teardown = limpeza.reap(self.baseline, owned=owned)
+        limpeza.attach(record, teardown, prefix)
+        if not teardown.clean and owned:
+            log.info('*** vazamentos restantes da vaga: %s',
+                     teardown.remaining.counts())
+        elif not teardown.clean:
+            log.info('*** vazamentos restantes: %s',
+                     teardown.remaining.counts())
+            start = time.time()
+            cleanup(self.sudo)
+            record.phase('%s:mn' % prefix, start, time.time() - start)
+            limpeza.attach(record, limpeza.reap(self.baseline), prefix)
+
+    @staticmethod
+    def describe(record, output, timed_out):
+        "Preenche rodou / funcional / causa a partir da saída."
+        exception = last_exception(output)
+        started = bool(STARTED_RE.search(output))
+        if exception:
+            record.ran = False
+            record.error_cause = exception
+        elif timed_out:
+            # Scripts que não encerram (ex.: laço infinito) contam como
+            # rodando se a topologia chegou a subir.
+            record.ran = started
+            record.error_cause = 'tempo limite excedido'
+        else:
+            record.ran = record.returncode == 0
+            if not record.ran:
+                record.error_cause = 'código de saída %d' % record.returncode
+        record.metrics.update(parse_metrics(output))
+        if 'ping_perda' in record.metrics:
+            record.functional = (record.ran and
+                                 record.metrics['ping_perda'][0] < 100)
+        record.duration = sum(p[2] for p in record.phases)
+        record.extra['tempo_limite'] = timed_out
+        cgroup = record.extra.get('cgroup', {})
+        if not record.ran and cgroup.get('oom_kill'):
+            record.error_class = erros.LOGIC
+            record.error_cause = 'limite de memória excedido (OOM)'
+            record.signature = erros.signature('cgroup', record.error_cause)
+            return
+        if record.ran is False or record.functional is False:
+            loss = record.metrics.get('ping_perda', (None,))[0]
+            found = erros.classify(output, timed_out=timed_out,
+                                   ping_loss=loss)
+            if found:
+                record.error_class = found.error_class
+                record.error_cause = found.cause
+                record.signature = found.signature
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.execucao',
+        description='Executa scripts gerados no Mininet-WiFi.')
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    parser.add_argument('--jsonl', metavar='ARQUIVO',
+                        help='grava registros em JSONL em vez do banco')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--python', default='python3')
+    parser.add_argument('--sem-sudo', action='store_true')
+    parser.add_argument('--sem-limpeza', action='store_true')
+    parser.add_argument('--sem-ganchos', action='store_true',
+                        help='roda o script diretamente, sem restringir '
+                        'pkill/killall à execução')
+    parser.add_argument('--tmp-compartilhado', action='store_true',
+                        help='não monta um /tmp privado por execução')
+    parser.add_argument('--sem-controladores', action='store_true',
+                        help='mantém as portas de controlador dos scripts')
+    parser.add_argument('--radios', action='store_true',
+                        help='aloca rádios hwsim e nomes por execução '
+                        '(padrão com --paralelo > 1)')
+    parser.add_argument('--cli', action='store_true',
+                        help='digita no CLI(net) os comandos do nível do '
+                        'cenário e mede cada resposta')
+    parser.add_argument('--comandos', metavar='ARQUIVO',
+                        help='comandos do CLI, um por linha (implica --cli)')
+    parser.add_argument('--tempo-comando', type=float,
+                        default=sessao.COMMAND_TIMEOUT,
+                        help='tempo limite de cada comando do CLI (s)')
+    parser.add_argument('--paralelo', type=int, default=1)
+    parser.add_argument('--arquivo', nargs='?', const=arquivo.DEFAULT_DIR,
+                        metavar='DIR',
+                        help='arquiva os logs de cada execução (zstd)')
+    parser.add_argument('--recursos', nargs='?', type=float, const=0.5,
+                        metavar='INTERVALO',
+                        help='amostra CPU/RSS/descritores por nó')
+    parser.add_argument('--cpus', type=float,
+                        help='limite de CPU por execução (núcleos)')
+    parser.add_argument('--memoria', type=cgrupos.parse_size,
+                        help='limite de memória por execução (ex.: 2G)')
+    parser.add_argument('--pids', type=int,
+                        help='limite de processos por execução')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    archive = None
+    if args.arquivo:
+        if args.paralelo > 1:
+            parser.error('--arquivo exige --paralelo 1')
+        try:
+            archive = arquivo.LogArchive(args.arquivo)
+        except RuntimeError as exc:
+            parser.error(str(exc))
+    if args.recursos and args.paralelo > 1:
+        # O amostrador atribui processos pelo nome do nó (``sta1``), que as
+        # execuções simultâneas repetem
+        parser.error('--recursos exige --paralelo 1')
+    limits = cgrupos.Limits(args.cpus, args.memoria, args.pids)
+    if limits:
+        try:
+            cgrupos.check(limits)
+        except RuntimeError as exc:
+            parser.error(str(exc))
+    session = None
+    if args.cli or args.comandos:
+        try:
+            session = sessao.Session(
+                sessao.load_commands(args.comandos) if args.comandos
+                else None, args.tempo_comando)
+        except OSError as exc:
+            parser.error(str(exc))
+    runner = Runner(args.timeout, args.python, not args.sem_sudo,
+                    clean=not args.sem_limpeza, archive=archive,
+                    sample_interval=args.recursos, limits=limits or None,
+                    hooks=not args.sem_ganchos,
+                    private_tmp=not args.tmp_compartilhado,
+                    controllers=(None if args.sem_controladores
+                                 else controladores.ControllerPool()),
+                    radio_pool=(radios.RadioPool()
+                                if args.radios or args.paralelo > 1
+                                else None),
+                    session=session)
+    if args.paralelo > 1 and runner.clean and not runner.radio_pool:
+        # Sem vaga de rádios, a limpeza é global (``mn -c``) e derrubaria
+        # as execuções simultâneas
+        parser.error('--paralelo > 1 exige a alocação de rádios (ganchos '
+                     'ativos e hwsim disponível) ou --sem-limpeza')
+    sink = (resultados.JsonlSink(args.jsonl) if args.jsonl
+            else resultados.ResultsStore(args.banco))
+
+    def run(script):
+        record = runner.run(script)
+        log.info('*** %s: %s%s', script,
+                 'rodou' if record.ran else 'não rodou',
+                 ' (%s)' % record.error_cause if record.error_cause else '')
+        return record
+
+    with ThreadPoolExecutor(max(1, args.paralelo)) as pool:
+        for record in pool.map(run, args.scripts):
+            sink.append(record)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
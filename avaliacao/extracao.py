@@ -0,0 +1,124 @@
+"""
+Extração do bloco de código durante o streaming da resposta.
+
+``StreamingExtractor`` recebe os fragmentos de texto à medida que o
+modelo os produz, localiza o bloco Python (cercado por crases ou, na
+falta delas, iniciado por ``import``/``from``/``#!``) e reanalisa o
+bloco a cada linha completa. Cada instrução que se completa passa pelo
+``StatementChecker``; quando surge um erro fatal (import inexistente,
+argumento rejeitado pelo ``Mininet_wifi``) a geração pode ser
+interrompida sem esperar o restante da resposta.
+"""
+
+import ast
+import re
+
+from avaliacao.estatico import StatementChecker, iter_statements, \
+    syntax_issue
+
+_PY_LANGS = ('', 'python', 'python3', 'py')
+_CODE_START = re.compile(r'^(#!|import\s|from\s+[\w.]+\s+import\s|""")')
+
+
+class StreamingExtractor:
+    "Acompanha a resposta fragmento a fragmento."
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+        self.blocks = []
+        self.issues = []
+        self._pending = ''
+        self._mode = 'text'
+        self._lines = []
+        self._checker = None
+        self._checked = set()
+
+    @property
+    def hopeless(self):
+        "Verdadeiro quando já há um erro fatal no código recebido."
+        return any(issue.fatal for issue in self.issues)
+
+    @property
+    def code(self):
+        "Maior bloco de código recebido até agora."
+        candidates = self.blocks + ['\n'.join(self._lines)]
+        best = max(candidates, key=len)
+        return best.rstrip() + '\n' if best.strip() else ''
+
+    def feed(self, fragment):
+        "Processa um fragmento e devolve os problemas novos."
+        start = len(self.issues)
+        self._pending += fragment
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            self._line(line)
+        return self.issues[start:]
+
+    def finish(self):
+        "Processa o restante do texto e faz a verificação final de sintaxe."
+        start = len(self.issues)
+        if self._pending:
+            self._line(self._pending)
+            self._pending = ''
+        if self._mode == 'code':
+            self._close_block()
+        return self.issues[start:]
+
+    def _open_block(self):
+        self._mode = 'code'
+        self._lines = []
+        self._checker = StatementChecker(self.catalog)
+        self._checked = set()
+
+    def _close_block(self):
+        source = '\n'.join(self._lines)
+        self._mode = 'text'
+        if not source.strip():
+            return
+        self.blocks.append(source)
+        self._lines = []
+        try:
+            ast.parse(source)
+        except SyntaxError as exc:
+            self.issues.append(syntax_issue(exc))
+
+    def _line(self, line):
+        stripped = line.strip()
+        if self._mode == 'code':
+            if stripped.startswith('```'):
+                self._close_block()
+                return
+            if stripped.endswith('```'):
+                # Crases coladas à última linha do código
+                self._lines.append(line[:line.rindex('```')])
+                self._check_new_statements()
+                self._close_block()
+                return
+            self._lines.append(line)
+            if stripped and not stripped.startswith('#'):
+                self._check_new_statements()
+        elif self._mode == 'other':
+            if stripped.startswith('```'):
+                self._mode = 'text'
+        elif stripped.startswith('```'):
+            if stripped[3:].strip().lower() in _PY_LANGS:
+                self._open_block()
+            else:
+                self._mode = 'other'
+        elif not self.blocks and _CODE_START.match(stripped):
+            # Resposta sem crases: o código começa direto no texto
+            self._open_block()
+            self._lines.append(line)
+
+    def _check_new_statements(self):
+        try:
+            tree = ast.parse('\n'.join(self._lines))
+        except SyntaxError:
+            # Instrução ainda incompleta; tenta de novo na próxima linha
+            return
+        for stmt in iter_statements(tree):
+            key = (stmt.lineno, stmt.col_offset)
+            if key in self._checked:
+                continue
+            self._checked.add(key)
+            self.issues.extend(self._checker.check(stmt))
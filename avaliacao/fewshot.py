@@ -0,0 +1,267 @@
+"""
+Seleção de exemplos few-shot por relevância léxica (BM25).
+
+Na fase com modelo local o exemplo ``handover.py`` era sempre incluído,
+mesmo no cenário básico. Este módulo indexa scripts de referência --
+exemplos oficiais do Mininet-WiFi e scripts do repositório que passam
+na verificação estática -- por chamadas de API, argumentos nomeados,
+imports e palavras dos comentários. Para cada prompt de cenário
+escolhe os exemplos mais relevantes que cabem em um orçamento de
+tokens, de modo que o tamanho do prompt possa ser trocado por taxa de
+sucesso de forma mensurável.
+
+Exemplo::
+
+    python3 -m avaliacao.fewshot --exemplos ~/mininet-wifi/examples \\
+        --orcamento 3000
+"""
+
+import argparse
+import ast
+import json
+import math
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+from avaliacao import cenarios, estatico
+
+WORD_RE = re.compile(r'[a-z][a-z0-9_]{2,}')
+API_RE = re.compile(r'\b(add[A-Z]\w*|configureWifiNodes|setPropagationModel|'
+                    r'setMobilityModel|startMobility|stopMobility|mobility|'
+                    r'plotGraph|pingAll|iperf|build|start|stop|CLI)\b')
+
+STOPWORDS = frozenset("""
+    the and for with from this that para com uma das dos que por como
+    sem entre cada ser deve devem est mais seu sua seus suas nos nas
+    """.split())
+
+# Termos dos prompts de cenário -> atributos de código correspondentes
+LEXICON = {
+    'estacao': ('call:addStation',),
+    'estacoes': ('call:addStation',),
+    'ponto': ('call:addAccessPoint',),
+    'pontos': ('call:addAccessPoint',),
+    'switch': ('call:addSwitch',),
+    'controlador': ('call:addController',),
+    'remoto': ('name:RemoteController',),
+    'canal': ('kw:channel',),
+    'canais': ('kw:channel',),
+    'alcance': ('kw:range',),
+    'posicao': ('kw:position',),
+    'posicoes': ('kw:position',),
+    'mobilidade': ('call:mobility', 'call:startMobility',
+                   'call:stopMobility'),
+    'movam': ('call:mobility',),
+    'cobertura': ('kw:range',),
+    'automaticos': ('dhcp',),
+    'dhcp': ('dhcp',),
+    'interferencia': ('name:wmediumd', 'name:interference'),
+    'propagacao': ('call:setPropagationModel',),
+    'comunicar': ('call:pingAll',),
+    'comunicacao': ('call:pingAll',),
+    'conectividade': ('call:pingAll',),
+    'desempenho': ('call:iperf',),
+    'handover': ('call:mobility', 'kw:ssid'),
+}
+
+
+def fold(text):
+    "Minúsculas sem acentos, para casar termos em português."
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def words(text):
+    return [w for w in WORD_RE.findall(fold(text)) if w not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    "Estimativa grosseira de tokens (~4 caracteres por token)."
+    return max(1, len(text) // 4)
+
+
+def code_features(source):
+    "Atributos de um script: chamadas, argumentos, imports e palavras."
+    feats = words(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return feats
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Attribute):
+                feats.append('call:' + func.attr)
+            elif isinstance(func, ast.Name):
+                feats.append('call:' + func.id)
+            feats.extend('kw:' + kw.arg for kw in node.keywords if kw.arg)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            feats.extend('name:' + a.name for a in node.names)
+    if 'dhcp' in feats or 'dhclient' in feats or 'dnsmasq' in feats:
+        feats.append('dhcp')
+    return feats
+
+
+def query_features(prompt):
+    "Atributos de um prompt de cenário (palavras, léxico e APIs citadas)."
+    feats = words(prompt)
+    for word in list(feats):
+        feats.extend(LEXICON.get(word, ()))
+    feats.extend('call:' + name for name in API_RE.findall(prompt))
+    return feats
+
+
+@dataclass
+class Example:
+    "Script de referência indexado."
+    id: str
+    path: str
+    tokens: int
+    features: Counter
+
+    def text(self):
+        return cenarios.read_text(self.path)
+
+
+class FewShotIndex:
+    "Índice BM25 sobre os atributos dos scripts de referência."
+
+    def __init__(self, examples, k1=1.2, b=0.75):
+        self.examples = list(examples)
+        self.k1 = k1
+        self.b = b
+        n = len(self.examples)
+        df = Counter()
+        for ex in self.examples:
+            df.update(ex.features.keys())
+        self.idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5))
+                    for t, d in df.items()}
+        lengths = [sum(ex.features.values()) for ex in self.examples]
+        self.avg_len = (sum(lengths) / n) if n else 0.0
+        self._lengths = lengths
+
+    def score(self, query):
+        "Pontuação BM25 de cada exemplo para os atributos da consulta."
+        terms = Counter(query)
+        scores = []
+        for ex, length in zip(self.examples, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len)
+            total = 0.0
+            for term, qtf in terms.items():
+                tf = ex.features.get(term)
+                if tf:
+                    total += (self.idf[term] * qtf * tf * (self.k1 + 1)
+                              / (tf + norm))
+            scores.append(total)
+        return scores
+
+    def select(self, prompt, budget, max_examples=3, exclude=None):
+        """Exemplos mais relevantes cuja soma de tokens cabe em ``budget``.
+
+        ``exclude`` recebe um ``Example`` e devolve verdadeiro para
+        descartá-lo (ex.: scripts do mesmo cenário)."""
+        ranked = sorted(zip(self.score(query_features(prompt)),
+                            self.examples),
+                        key=lambda item: (-item[0], item[1].tokens))
+        chosen, used = [], 0
+        for score, ex in ranked:
+            if len(chosen) >= max_examples or score <= 0:
+                break
+            if exclude and exclude(ex):
+                continue
+            if used + ex.tokens > budget:
+                continue
+            chosen.append((score, ex))
+            used += ex.tokens
+        return chosen
+
+    def save(self, path):
+        data = [{'id': ex.id, 'path': ex.path, 'tokens': ex.tokens,
+                 'features': ex.features} for ex in self.examples]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(Example(d['id'], d['path'], d['tokens'],
+                           Counter(d['features'])) for d in data)
+
+
+def collect_examples(dirs=(), include_scripts=True, validate=True):
+    """Scripts de referência: arquivos ``.py`` de ``dirs`` (exemplos
+    oficiais) e, opcionalmente, os scripts gerados sem erros fatais na
+    verificação estática."""
+    paths = []
+    for folder in dirs:
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.py'):
+                paths.append(os.path.join(folder, name))
+    if include_scripts:
+        for path in cenarios.generated_scripts():
+            if validate and any(i.fatal for i in estatico.check_file(path)):
+                continue
+            paths.append(path)
+    examples = []
+    for path in paths:
+        source = cenarios.read_text(path)
+        rel = os.path.relpath(path, cenarios.ROOT)
+        ex_id = rel if not rel.startswith('..') else os.path.basename(path)
+        examples.append(Example(ex_id, path, estimate_tokens(source),
+                                Counter(code_features(source))))
+    return examples
+
+
+def same_level(level):
+    "Filtro que descarta scripts gerados para o mesmo nível de cenário."
+    def exclude(ex):
+        parsed = cenarios.parse_script_path(ex.path)
+        return parsed is not None and parsed[0] == level
+    return exclude
+
+
+def render(chosen):
+    "Texto few-shot anexado à contextualização."
+    if not chosen:
+        return ''
+    parts = ['A seguir, exemplos de scripts Mininet-WiFi funcionais para '
+             'referência:']
+    for _, ex in chosen:
+        parts.append('Exemplo (%s):\n```python\n%s```'
+                     % (os.path.basename(ex.path), ex.text().rstrip() + '\n'))
+    return '\n\n'.join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.fewshot',
+        description='Mostra os exemplos few-shot escolhidos por cenário.')
+    parser.add_argument('--exemplos', action='append', default=[],
+                        metavar='DIR', help='exemplos oficiais (.py)')
+    parser.add_argument('--orcamento', type=int, default=3000,
+                        help='tokens disponíveis para os exemplos')
+    parser.add_argument('--max', type=int, default=3)
+    parser.add_argument('--sem-scripts', action='store_true')
+    args = parser.parse_args(argv)
+    index = FewShotIndex(collect_examples(args.exemplos,
+                                          not args.sem_scripts))
+    for level in cenarios.LEVELS:
+        for prompt_type in cenarios.PROMPT_TYPES:
+            prompt = cenarios.read_text(
+                cenarios.prompt_path(level, prompt_type))
+            chosen = index.select(prompt, args.orcamento, args.max,
+                                  same_level(level))
+            used = sum(ex.tokens for _, ex in chosen)
+            print('%s/%s: %d tokens' % (level, prompt_type, used))
+            for score, ex in chosen:
+                print('  %6.2f %5d %s' % (score, ex.tokens, ex.id))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Inicialização dos scripts executados pelo avaliador.
+
+``avaliacao.execucao`` roda cada script como
+``python3 -m avaliacao.ganchos script.py``: os ganchos são instalados
+e o script roda sem alterações como ``__main__``. Ganchos instalados:
+
+* ``pkill``/``killall`` em ``Node.cmd``, ``os.system`` e
+  ``subprocess`` são desviados para ``avaliacao.processos``, que só
+  atinge processos da própria execução;
+* comandos em segundo plano (``node.cmd('iperf -s &')``) têm o pid
+  registrado por nó no arquivo indicado por ``AVALIACAO_PROCESSOS``;
+* controladores recebem as portas da vaga da execução
+  (``avaliacao.controladores``): ``RemoteController`` local aponta para
+  o controlador do pool e ``Controller``/``OVSController`` usam o bloco
+  de portas da vaga, com a latência de conexão dos switches medida;
+* rádios hwsim e nomes de APs/switches seguem a vaga de rádios da
+  execução (``avaliacao.radios``), com os nomes originais do script
+  traduzidos em ``net.get`` e nos comandos;
+* os parâmetros nomeados das chamadas ``add*`` são auditados
+  (``avaliacao.auditoria``): chaves que a biblioteca nunca lê são
+  relatadas no arquivo indicado por ``AVALIACAO_PARAMETROS``.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import runpy
+import subprocess
+import sys
+
+from avaliacao import auditoria, cenarios, controladores, processos, radios
+
+log = logging.getLogger(__name__)
+
+# Reescritas aplicadas aos comandos de shell do script, em ordem
+REWRITERS = [processos.rewrite]
+
+
+def rewrite(command):
+    for rewriter in REWRITERS:
+        command = rewriter(command)
+    return command
+
+
+def install_process_hooks(registry):
+    "Instala os ganchos de processos (Mininet, ``os`` e ``subprocess``)."
+    system = os.system
+    popen_init = subprocess.Popen.__init__
+
+    def hooked_system(command):
+        return system(rewrite(command))
+
+    def hooked_popen_init(self, args, *rest, **kwargs):
+        args = (rewrite(args) if isinstance(args, str)
+                else processos.rewrite_args(args))
+        popen_init(self, args, *rest, **kwargs)
+
+    os.system = hooked_system
+    subprocess.Popen.__init__ = hooked_popen_init
+    try:
+        from mininet.node import Node
+    except ImportError:
+        return
+    send_cmd = Node.sendCmd
+    cmd = Node.cmd
+
+    def hooked_send_cmd(self, *args, **kwargs):
+        # Mesma normalização do Mininet: lista ou vários argumentos
+        if len(args) == 1 and isinstance(args[0], list):
+            args = args[0]
+        command = args[0] if len(args) == 1 else args
+        if not isinstance(command, str):
+            command = ' '.join(str(c) for c in command)
+        registry.add_node(self.name, getattr(self, 'pid', None))
+        return send_cmd(self, rewrite(command), **kwargs)
+
+    def hooked_cmd(self, *args, **kwargs):
+        result = cmd(self, *args, **kwargs)
+        if (self.lastCmd or '').rstrip().endswith('&') and self.lastPid:
+            registry.track(self.name, self.lastPid)
+        return result
+
+    Node.sendCmd = hooked_send_cmd
+    Node.cmd = hooked_cmd
+
+
+def install_controller_hooks(config):
+    "Remapeia as portas dos controladores para a vaga da execução."
+    try:
+        from mininet.node import Controller, RemoteController
+    except ImportError:
+        return
+    init = Controller.__init__
+    ports = iter(config['locais'])
+    assigned = {}
+    # Sem ``remoto``, o controlador do pool não subiu: os
+    # ``RemoteController`` ficam com as portas do script
+    monitor = controladores.ConnectionMonitor(
+        [p for p in [config['remoto']] + config['locais'] if p],
+        config['saida'])
+
+    @functools.wraps(init)
+    def hooked_init(self, name, *args, **kwargs):
+        original = kwargs.get('port')
+        if isinstance(self, RemoteController):
+            if (config['remoto'] and kwargs.get('ip', '127.0.0.1')
+                    in controladores.LOOPBACK):
+                kwargs['port'] = config['remoto']
+        elif not args:
+            if name not in assigned:
+                assigned[name] = next(ports, None)
+            if assigned[name] is None:
+                log.warning('*** %s: sem porta livre na vaga', name)
+            else:
+                kwargs['port'] = assigned[name]
+        if kwargs.get('port') != original:
+            log.debug('*** %s: porta %s -> %s', name, original,
+                      kwargs['port'])
+        if monitor.ident is None:
+            monitor.start()
+        init(self, name, *args, **kwargs)
+
+    Controller.__init__ = hooked_init
+
+
+def install_radio_hooks(config):
+    """Rádios com o prefixo da vaga, sem carregar/descarregar o módulo, e
+    APs/switches com o prefixo de nomes."""
+    try:
+        from mininet.net import Mininet
+        from mn_wifi.module import Mac80211Hwsim
+        from mn_wifi.net import Mininet_wifi
+    except ImportError:
+        return
+    names = radios.NameMap(config['nomes'])
+    REWRITERS.append(names.rewrite)
+    created = []
+
+    def create_devices(self, n_radios, **params):
+        self.prefix = config['phy']
+        for i in range(n_radios):
+            out = subprocess.run(
+                ['hwsim_mgmt', '-c', '-n', '%s%02d' % (self.prefix, i)],
+                capture_output=True, text=True)
+            match = re.search(r'ID (\d+)', out.stdout)
+            if out.returncode != 0 or not match:
+                raise RuntimeError('hwsim_mgmt falhou: %s'
+                                   % (out.stderr or out.stdout).strip())
+            self.hwsim_ids.append(match.group(1))
+            created.append('%s%02d' % (self.prefix, i))
+        save()
+
+    def save():
+        with open(config['saida'], 'w', encoding='utf-8') as f:
+            json.dump({'radios': created, 'nomes': names.names}, f)
+
+    # O pool carrega o módulo; a execução só cria e remove os seus rádios
+    Mac80211Hwsim.externally_managed = True
+    Mac80211Hwsim._Mac80211Hwsim__create_hwsim_mgmt_devices = create_devices
+
+    def renaming(add):
+        @functools.wraps(add)
+        def hooked_add(self, name, *args, **params):
+            renamed = names.add(name)
+            if renamed != name:
+                params.setdefault('dpid', radios.default_dpid(name))
+                save()
+            return add(self, renamed, *args, **params)
+        return hooked_add
+
+    def translating(lookup):
+        @functools.wraps(lookup)
+        def hooked_lookup(self, *args):
+            return lookup(self, *(names.node(a) if isinstance(a, str) else a
+                                  for a in args))
+        return hooked_lookup
+
+    for cls in (Mininet, Mininet_wifi):
+        for method in ('addSwitch', 'addAccessPoint'):
+            if method in cls.__dict__:
+                setattr(cls, method, renaming(cls.__dict__[method]))
+        for method in ('get', 'getNodeByName', '__getitem__',
+                       '__contains__'):
+            if method in cls.__dict__:
+                setattr(cls, method, translating(cls.__dict__[method]))
+
+
+def install_audit_hooks(audit):
+    """Audita os ``**params`` das chamadas ``add*`` (por último: os
+    parâmetros acrescentados pelos outros ganchos não são do script)."""
+    try:
+        from mininet.link import Intf
+        from mininet.net import Mininet
+        from mininet.node import Node
+    except ImportError:
+        return
+    classes = [Node, Intf]
+    networks = [Mininet]
+    try:
+        from mn_wifi.link import IntfWireless
+        from mn_wifi.net import Mininet_wifi
+    except ImportError:
+        pass
+    else:
+        classes.append(IntfWireless)
+        networks.append(Mininet_wifi)
+    for cls in classes:
+        cls.params = auditoria.ParamsAttribute(audit)
+    for cls in networks:
+        for method in auditoria.METHODS:
+            if method in cls.__dict__:
+                setattr(cls, method, audit.wrap(cls.__dict__[method]))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print('uso: python3 -m avaliacao.ganchos SCRIPT [ARGS...]',
+              file=sys.stderr)
+        return 2
+    script = argv[0]
+    os.environ[processos.ROOT_ENV] = str(os.getpid())
+    if os.environ.get(processos.SESSION_ENV) == '1':
+        # Sessão aberta pelo avaliador só para este script
+        os.environ[processos.SESSION_ENV] = str(os.getsid(0))
+    # Os shells dos nós precisam importar avaliacao.processos
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        p for p in (cenarios.ROOT, os.environ.get('PYTHONPATH')) if p)
+    install_process_hooks(
+        processos.Registry(os.environ.get(processos.REGISTRY_ENV)))
+    if os.environ.get(controladores.CONFIG_ENV):
+        install_controller_hooks(
+            json.loads(os.environ[controladores.CONFIG_ENV]))
+    if os.environ.get(radios.CONFIG_ENV):
+        install_radio_hooks(json.loads(os.environ[radios.CONFIG_ENV]))
+    audit = None
+    if os.environ.get(auditoria.CONFIG_ENV):
+        audit = auditoria.Audit(script)
+        install_audit_hooks(audit)
+    sys.argv = list(argv)
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    try:
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        if audit:
+            audit.save(os.environ[auditoria.CONFIG_ENV])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
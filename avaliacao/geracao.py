@@ -0,0 +1,503 @@
+"""
+Geração em lote dos scripts via API HTTP do Ollama.
+
+Cada tarefa (nível, tipo de prompt, modelo, amostra) monta a mesma
+conversa usada no artigo -- contextualização seguida do prompt de
+cenário -- e grava o bloco de código da resposta em
+``scripts/<nivel>/<s|d>_<modelo>.py``. As tarefas são executadas com
+concorrência limitada, a resposta é recebida em streaming e falhas
+por timeout são repetidas com espera exponencial.
+
+Exemplo::
+
+    python3 -m avaliacao.geracao --modelo gpt-oss:20b --amostras 3
+
+As respostas ficam em cache (``avaliacao.cache``); ``--nova-amostra``
+ignora o cache para obter amostras novas. Com
+``--rejeicao-antecipada`` o código é verificado durante o streaming e
+gerações sem salvação (imports inexistentes, argumentos inventados)
+são interrompidas antes do fim. Para testes sem o modelo real, ver
+``avaliacao.replay``.
+"""
+
+import argparse
+import hashlib
+import http.client
+import json
+import logging
+import os
+import re
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from avaliacao import cenarios, fewshot, parametrico
+from avaliacao.cache import DEFAULT_PATH, GenerationCache, cache_key
+from avaliacao.extracao import StreamingExtractor
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = 'http://localhost:11434'
+
+FENCE_RE = re.compile(r'```[ \t]*(?:python3?|py)?[ \t]*\n(.*?)(?:```|\Z)',
+                      re.DOTALL | re.IGNORECASE)
+
+
+class GenerationError(Exception):
+    "Falha definitiva ao obter uma resposta do servidor."
+
+
+class GenerationAborted(Exception):
+    """Geração interrompida pelo consumidor do streaming.
+
+    Levantada por ``on_token``; ``issues`` explica o motivo."""
+
+    def __init__(self, issues, partial='', tokens=0):
+        super().__init__('; '.join(str(i) for i in issues))
+        self.issues = issues
+        self.partial = partial
+        self.tokens = tokens
+
+
+def extract_code(text):
+    """Retorna o maior bloco de código da resposta.
+
+    Sem blocos cercados por crases, a resposta inteira é considerada
+    código (alguns modelos locais respondem apenas com o script)."""
+    blocks = FENCE_RE.findall(text)
+    if not blocks:
+        return text.strip() + '\n'
+    return max(blocks, key=len).rstrip() + '\n'
+
+
+def build_messages(level, prompt_type, fewshot='', prompt_file=None):
+    """Mensagens da conversa: contextualização (+ exemplos) e cenário.
+
+    ``prompt_file`` substitui o prompt do nível (cenários paramétricos)."""
+    context = cenarios.read_text(cenarios.CONTEXT_FILE).strip()
+    if fewshot:
+        context += '\n\n' + fewshot.strip()
+    scenario = cenarios.read_text(
+        prompt_file or cenarios.prompt_path(level, prompt_type)).strip()
+    return [{'role': 'user', 'content': context},
+            {'role': 'user', 'content': scenario}]
+
+
+def messages_key(model, messages):
+    "Chave estável de uma conversa, usada para gravar e reproduzir respostas."
+    payload = json.dumps([model, messages], sort_keys=True,
+                         ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class Completion:
+    "Resposta completa de uma chamada ao modelo."
+    text: str
+    prompt_tokens: int = 0
+    eval_tokens: int = 0
+    duration: float = 0.0
+    attempts: int = 1
+    cached: bool = False
+
+    def to_dict(self):
+        return {'text': self.text, 'prompt_tokens': self.prompt_tokens,
+                'eval_tokens': self.eval_tokens, 'duration': self.duration}
+
+
+@dataclass
+class Job:
+    "Uma geração: nível, tipo de prompt, modelo e índice da amostra."
+    level: str
+    prompt_type: str
+    model: str
+    sample: int = None
+    slug: str = None
+    options: dict = field(default_factory=dict)
+    fewshot: str = ''
+    fewshot_ids: tuple = ()
+    prompt_file: str = None
+
+    def messages(self):
+        return build_messages(self.level, self.prompt_type, self.fewshot,
+                              self.prompt_file)
+
+    def path(self, root=cenarios.SCRIPTS_DIR):
+        slug = self.slug or cenarios.model_slug(self.model)
+        return cenarios.script_path(self.level, self.prompt_type, slug,
+                                    self.sample, root)
+
+
+@dataclass
+class Result:
+    "Resultado de uma tarefa do lote."
+    job: Job
+    path: str
+    completion: Completion = None
+    skipped: bool = False
+    error: str = None
+    issues: list = field(default_factory=list)
+
+
+def _is_transient(exc):
+    "Erros que justificam nova tentativa (timeouts e conexões perdidas)."
+    if isinstance(exc, (socket.timeout, TimeoutError, ConnectionError,
+                        http.client.IncompleteRead,
+                        http.client.RemoteDisconnected)):
+        return True
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code >= 500
+    if isinstance(exc, urllib.error.URLError):
+        return isinstance(exc.reason, (socket.timeout, TimeoutError,
+                                       ConnectionError, OSError))
+    return False
+
+
+class OllamaClient:
+    """Cliente mínimo do endpoint ``/api/chat`` do Ollama.
+
+    ``timeout`` vale para cada leitura do streaming, não para a geração
+    inteira: um modelo lento em CPU continua válido enquanto envia
+    tokens."""
+
+    def __init__(self, host=DEFAULT_HOST, timeout=300.0, retries=3,
+                 backoff=2.0):
+        self.host = host.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._digests = None
+        self._digest_lock = threading.Lock()
+
+    def model_digest(self, model):
+        """Digest dos pesos do modelo segundo ``/api/tags`` (ou ``''``)."""
+        with self._digest_lock:
+            if self._digests is None:
+                try:
+                    with urllib.request.urlopen(self.host + '/api/tags',
+                                                timeout=self.timeout) as resp:
+                        models = json.load(resp).get('models', [])
+                except (OSError, ValueError):
+                    return ''
+                self._digests = {m.get('name'): m.get('digest', '')
+                                 for m in models}
+            return self._digests.get(model, '')
+
+    def _post(self, path, payload):
+        data = json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(
+            self.host + path, data=data,
+            headers={'Content-Type': 'application/json'})
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def _stream_chat(self, model, messages, options, on_token):
+        start = time.monotonic()
+        payload = {'model': model, 'messages': messages, 'stream': True}
+        if options:
+            payload['options'] = options
+        parts = []
+        final = {}
+        with self._post('/api/chat', payload) as resp:
+            for line in resp:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise GenerationError(chunk['error'])
+                token = chunk.get('message', {}).get('content', '')
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get('done'):
+                    final = chunk
+                    break
+        if not final:
+            raise ConnectionError('streaming encerrado antes do fim')
+        return Completion(text=''.join(parts),
+                          prompt_tokens=final.get('prompt_eval_count', 0),
+                          eval_tokens=final.get('eval_count', 0),
+                          duration=time.monotonic() - start)
+
+    def chat(self, model, messages, options=None, watcher=None):
+        """Envia a conversa e devolve a resposta completa.
+
+        ``watcher()`` cria, a cada tentativa, o callback chamado a cada
+        fragmento recebido, que pode interromper a geração levantando
+        ``GenerationAborted``; uma tentativa nova recomeça a resposta do
+        zero. Timeouts e erros de conexão são repetidos até ``retries``
+        vezes."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                completion = self._stream_chat(
+                    model, messages, options, watcher and watcher())
+                completion.attempts = attempt
+                return completion
+            except GenerationAborted:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                if not _is_transient(exc) or attempt > self.retries:
+                    raise GenerationError('%s: %s' % (model, exc)) from exc
+                delay = self.backoff ** (attempt - 1)
+                log.warning('*** %s: %s; nova tentativa em %.1fs',
+                            model, exc, delay)
+                time.sleep(delay)
+
+
+def write_atomic(path, text):
+    "Grava o arquivo via renomeação, sem deixar scripts pela metade."
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class BatchGenerator:
+    """Executa uma fila de tarefas com no máximo ``concurrency`` gerações
+    simultâneas.
+
+    Scripts já existentes não são sobrescritos, a menos que
+    ``overwrite`` seja verdadeiro, para preservar os artefatos do
+    artigo. Com ``record`` as respostas brutas são anexadas a um JSONL
+    reproduzível por ``avaliacao.replay``. Com ``cache``, requisições
+    idênticas são atendidas pelo cache; ``fresh`` força amostras novas
+    (que substituem a entrada armazenada). Com ``early_reject`` a
+    resposta é verificada durante o streaming e abandonada no primeiro
+    erro fatal."""
+
+    def __init__(self, client, out_root=cenarios.SCRIPTS_DIR, concurrency=2,
+                 overwrite=False, record=None, cache=None, fresh=False,
+                 early_reject=False, catalog=None):
+        self.client = client
+        self.out_root = out_root
+        self.concurrency = concurrency
+        self.overwrite = overwrite
+        self.record = record
+        self.cache = cache
+        self.fresh = fresh
+        self.early_reject = early_reject
+        self.catalog = catalog
+
+    def _watcher(self):
+        "Callback de streaming que aborta gerações sem salvação."
+        extractor = StreamingExtractor(self.catalog)
+        received = []
+
+        def on_token(token):
+            received.append(token)
+            extractor.feed(token)
+            if extractor.hopeless:
+                fatal = [i for i in extractor.issues if i.fatal]
+                raise GenerationAborted(fatal, ''.join(received),
+                                        len(received))
+        return on_token
+
+    def complete(self, job, messages):
+        """Resposta do cache ou do modelo para a conversa da tarefa."""
+        key = None
+        if self.cache is not None:
+            key = cache_key(job.model, self.client.model_digest(job.model),
+                            messages, job.options, job.fewshot_ids,
+                            job.sample)
+            if not self.fresh:
+                hit = self.cache.get(key)
+                if hit is not None:
+                    return Completion(attempts=0, cached=True, **hit)
+        watcher = self._watcher if self.early_reject else None
+        completion = self.client.chat(job.model, messages, job.options,
+                                      watcher)
+        if key is not None:
+            self.cache.put(key, job.model, completion.to_dict())
+        return completion
+
+    def _record(self, job, messages, completion):
+        if not self.record:
+            return
+        entry = {'model': job.model,
+                 'key': messages_key(job.model, messages),
+                 'level': job.level, 'prompt_type': job.prompt_type,
+                 'fewshot': list(job.fewshot_ids),
+                 'prompt_tokens': completion.prompt_tokens,
+                 'eval_tokens': completion.eval_tokens,
+                 'response': completion.text}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        # Uma única escrita em modo append mantém as linhas inteiras
+        with open(self.record, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def generate(self, job):
+        path = job.path(self.out_root)
+        if os.path.exists(path) and not self.overwrite:
+            return Result(job, path, skipped=True)
+        messages = job.messages()
+        try:
+            completion = self.complete(job, messages)
+        except GenerationError as exc:
+            log.error('*** %s: %s', path, exc)
+            return Result(job, path, error=str(exc))
+        except GenerationAborted as exc:
+            log.warning('*** %s: rejeitado após %d tokens: %s', path,
+                        exc.tokens, exc)
+            return Result(job, path, error='rejeitado: %s' % exc,
+                          issues=exc.issues)
+        write_atomic(path, extract_code(completion.text))
+        if not completion.cached:
+            self._record(job, messages, completion)
+        log.info('*** %s (%.1fs, %d tokens%s)', path, completion.duration,
+                 completion.eval_tokens,
+                 ', cache' if completion.cached else '')
+        return Result(job, path, completion)
+
+    def run(self, jobs):
+        "Executa todas as tarefas e devolve os resultados na ordem de entrada."
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(self.generate, jobs))
+
+
+def select_fewshot(index, level, prompt_type, budget, max_examples=3):
+    """Exemplos few-shot do cenário: ``(texto, ids)``.
+
+    Scripts gerados para o mesmo nível são descartados, para não
+    entregar ao modelo a resposta do próprio cenário."""
+    prompt = cenarios.read_text(cenarios.prompt_path(level, prompt_type))
+    chosen = index.select(prompt, budget, max_examples,
+                          fewshot.same_level(level))
+    return fewshot.render(chosen), tuple(ex.id for _, ex in chosen)
+
+
+def make_jobs(models, levels=tuple(cenarios.LEVELS),
+              prompt_types=tuple(cenarios.PROMPT_TYPES), samples=1,
+              options=None, fewshot_index=None, fewshot_budget=0,
+              fewshot_max=3):
+    """Produto cartesiano modelo × nível × tipo × amostra.
+
+    Com ``fewshot_index`` e orçamento positivo, cada cenário recebe os
+    exemplos mais relevantes que cabem em ``fewshot_budget`` tokens."""
+    jobs = []
+    for level in levels:
+        for prompt_type in prompt_types:
+            text, ids = '', ()
+            if fewshot_index is not None and fewshot_budget > 0:
+                text, ids = select_fewshot(fewshot_index, level,
+                                           prompt_type, fewshot_budget,
+                                           fewshot_max)
+            for model in models:
+                for i in range(samples):
+                    jobs.append(Job(level, prompt_type, model,
+                                    sample=i + 1 if samples > 1 else None,
+                                    options=dict(options or {}),
+                                    fewshot=text, fewshot_ids=ids))
+    jobs.sort(key=lambda job: job.model)
+    return jobs
+
+
+def make_parametric_jobs(models, directory,
+                         prompt_types=tuple(cenarios.PROMPT_TYPES),
+                         samples=1, options=None):
+    """Tarefas para os cenários gravados por ``avaliacao.parametrico``; o
+    slug do cenário ocupa o lugar do nível no caminho do script."""
+    jobs = []
+    for slug in parametrico.discover(directory):
+        for prompt_type in prompt_types:
+            prompt_file = os.path.join(directory, 'p-%s_%s.txt' % (
+                slug, cenarios.PROMPT_TYPES[prompt_type]))
+            for model in models:
+                for i in range(samples):
+                    jobs.append(Job(slug, prompt_type, model,
+                                    sample=i + 1 if samples > 1 else None,
+                                    options=dict(options or {}),
+                                    prompt_file=prompt_file))
+    return jobs
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.geracao',
+        description='Gera scripts Mininet-WiFi em lote via Ollama.')
+    parser.add_argument('--modelo', action='append', required=True,
+                        help='modelo do Ollama (pode repetir)')
+    parser.add_argument('--niveis', nargs='+', choices=list(cenarios.LEVELS),
+                        default=list(cenarios.LEVELS))
+    parser.add_argument('--tipos', nargs='+',
+                        choices=list(cenarios.PROMPT_TYPES),
+                        default=list(cenarios.PROMPT_TYPES))
+    parser.add_argument('--parametrico', metavar='DIR',
+                        help='usa os cenários gerados por '
+                             'avaliacao.parametrico em vez dos níveis')
+    parser.add_argument('--amostras', type=int, default=1)
+    parser.add_argument('--concorrencia', type=int, default=2)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--tentativas', type=int, default=3)
+    parser.add_argument('--temperatura', type=float)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--saida', default=cenarios.SCRIPTS_DIR)
+    parser.add_argument('--sobrescrever', action='store_true')
+    parser.add_argument('--gravar', metavar='JSONL',
+                        help='anexa as respostas brutas para reprodução')
+    parser.add_argument('--cache', default=DEFAULT_PATH)
+    parser.add_argument('--cache-max-mb', type=float, default=256)
+    parser.add_argument('--sem-cache', action='store_true')
+    parser.add_argument('--nova-amostra', action='store_true',
+                        help='ignora respostas em cache (mais variância)')
+    parser.add_argument('--fewshot-orcamento', type=int, default=0,
+                        metavar='TOKENS',
+                        help='inclui exemplos relevantes até este limite')
+    parser.add_argument('--fewshot-max', type=int, default=3)
+    parser.add_argument('--exemplos', action='append', default=[],
+                        metavar='DIR', help='exemplos oficiais do Mininet-WiFi')
+    parser.add_argument('--rejeicao-antecipada', action='store_true',
+                        help='interrompe gerações com erros fatais')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args = parse_args(argv)
+    options = {}
+    if args.temperatura is not None:
+        options['temperature'] = args.temperatura
+    if args.seed is not None:
+        options['seed'] = args.seed
+    client = OllamaClient(args.host, timeout=args.timeout,
+                          retries=args.tentativas)
+    cache = None
+    if not args.sem_cache:
+        cache = GenerationCache(args.cache,
+                                int(args.cache_max_mb * 1024 * 1024))
+    generator = BatchGenerator(client, args.saida, args.concorrencia,
+                               args.sobrescrever, args.gravar, cache,
+                               args.nova_amostra, args.rejeicao_antecipada)
+    index = None
+    if args.fewshot_orcamento > 0:
+        index = fewshot.FewShotIndex(
+            fewshot.collect_examples(args.exemplos))
+    if args.parametrico:
+        jobs = make_parametric_jobs(args.modelo, args.parametrico,
+                                    args.tipos, args.amostras, options)
+    else:
+        jobs = make_jobs(args.modelo, args.niveis, args.tipos, args.amostras,
+                         options, index, args.fewshot_orcamento,
+                         args.fewshot_max)
+    start = time.monotonic()
+    results = generator.run(jobs)
+    failed = [r for r in results if r.error]
+    done = [r for r in results if r.completion]
+    cached = [r for r in done if r.completion.cached]
+    log.info('*** %d geradas (%d do cache), %d ignoradas, %d falhas em '
+             '%.1fs', len(done), len(cached),
+             len(results) - len(done) - len(failed), len(failed),
+             time.monotonic() - start)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Custo do modo de interferência do wmediumd.
+
+Vários scripts gerados usam ``link=wmediumd,
+wmediumd_mode=interference`` e outros não; este benchmark mede o que o
+realismo custa. A mesma topologia (um AP e N estações em linha) é
+gerada sem wmediumd e com o modo de interferência para cada combinação
+de ``noise_th`` e ``fading_cof`` e executada no Mininet-WiFi pelo
+executor real (``avaliacao.execucao``). O próprio script mede e imprime
+numa linha ``@@metricas``: o tempo de CPU do host e do processo
+wmediumd, a latência de associação das estações, o RTT médio do
+``pingFull`` e a vazão do ``iperf``.
+
+Os scripts do deepseek chamam esses parâmetros de ``noise_threshold`` e
+``fading_coefficient``, nomes que o ``Mininet_wifi`` não aceita; aqui
+são usados os nomes reais. Os scripts gerados ficam em
+``.resultados/interferencia`` (fora de ``/tmp``, que o executor isola por
+execução) e continuam disponíveis para os registros gravados.
+
+Exemplo::
+
+    sudo python3 -m avaliacao.interferencia --estacoes 2 4 8 16 \\
+        --ruido -91 -86 --desvanecimento 0 5 --repeticoes 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+from dataclasses import dataclass
+
+from avaliacao import execucao, resultados
+
+log = logging.getLogger(__name__)
+
+# Scripts gerados pelo benchmark, referenciados pelos registros
+DEFAULT_DIR = os.path.join(resultados.DEFAULT_DIR, 'interferencia')
+
+METRICS_RE = re.compile(r'^@@metricas (\{.*\})$', re.M)
+
+# Unidade de cada métrica impressa pelo script de benchmark
+UNITS = {
+    'cpu_host': 's', 'cpu_wmediumd': 's', 'associacao_media': 's',
+    'associacao_max': 's', 'associadas': 'estacoes', 'rtt_medio': 'ms',
+    'ping_perda': '%', 'iperf_vazao': 'Mbit/s', 'duracao': 's',
+}
+
+TEMPLATE = '''#!/usr/bin/env python3
+"Benchmark gerado por avaliacao.interferencia: %(label)s"
+import json
+import os
+import re
+import time
+
+from mininet.log import setLogLevel, info
+from mn_wifi.net import Mininet_wifi
+from mn_wifi.link import wmediumd
+from mn_wifi.wmediumdConnector import interference
+
+STATIONS = %(stations)d
+WMEDIUMD = %(wmediumd)r
+HZ = os.sysconf('SC_CLK_TCK')
+
+
+def cpu_busy():
+    with open('/proc/stat') as f:
+        fields = [int(x) for x in f.readline().split()[1:]]
+    return (sum(fields) - fields[3] - fields[4]) / HZ
+
+
+def process_cpu(name):
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open('/proc/%%s/comm' %% pid) as f:
+                if f.read().strip() != name:
+                    continue
+            with open('/proc/%%s/stat' %% pid) as f:
+                parts = f.read().rsplit(')', 1)[1].split()
+            total += int(parts[11]) + int(parts[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / HZ
+
+
+def wait_associated(stations, timeout=30):
+    start = time.time()
+    pending = {sta: sta.wintfs[0].name for sta in stations}
+    latencies = []
+    while pending and time.time() - start < timeout:
+        for sta, intf in list(pending.items()):
+            if 'Connected to' in sta.cmd('iw dev %%s link' %% intf):
+                latencies.append(time.time() - start)
+                del pending[sta]
+        time.sleep(0.1)
+    return latencies
+
+
+def topology():
+    if WMEDIUMD:
+        net = Mininet_wifi(link=wmediumd, wmediumd_mode=interference,
+                           noise_th=%(noise_th)r, fading_cof=%(fading_cof)r)
+    else:
+        net = Mininet_wifi()
+    ap1 = net.addAccessPoint('ap1', ssid='bench', mode='g', channel='1',
+                             position='50,50,0', range=%(range)d)
+    stations = [net.addStation('sta%%d' %% (i + 1),
+                               ip='10.0.0.%%d/8' %% (i + 1),
+                               position='%%d,40,0' %% (30 + 40 * i
+                                                     // max(1, STATIONS)))
+                for i in range(STATIONS)]
+    c0 = net.addController('c0')
+    net.setPropagationModel(model='logDistance', exp=3)
+    net.configureWifiNodes()
+
+    start, cpu = time.time(), cpu_busy()
+    net.build()
+    c0.start()
+    ap1.start([c0])
+    latencies = wait_associated(stations)
+    results = net.pingFull(stations)
+    rtts = [r[2][3] for r in results if r[2][1]]
+    sent = sum(r[2][0] for r in results)
+    received = sum(r[2][1] for r in results)
+    iperf = net.iperf((stations[0], stations[-1]), seconds=5) \\
+        if STATIONS > 1 else []
+    match = re.match(r'([\\d.]+) ([KMG]?)bits', iperf[-1]) if iperf else None
+    metrics = {
+        'cpu_host': cpu_busy() - cpu,
+        'cpu_wmediumd': process_cpu('wmediumd'),
+        'associadas': len(latencies),
+        'associacao_media': (sum(latencies) / len(latencies)
+                             if latencies else None),
+        'associacao_max': max(latencies) if latencies else None,
+        'rtt_medio': sum(rtts) / len(rtts) if rtts else None,
+        'ping_perda': 100.0 * (sent - received) / sent if sent else None,
+        'iperf_vazao': (float(match.group(1)) * {'': 1e-6, 'K': 1e-3,
+                                                'M': 1.0, 'G': 1e3}
+                        [match.group(2)] if match else None),
+        'duracao': time.time() - start,
+    }
+    print('@@metricas ' + json.dumps(metrics), flush=True)
+    net.stop()
+
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    topology()
+'''
+
+
+@dataclass(frozen=True)
+class Config:
+    "Uma configuração do benchmark."
+    stations: int
+    wmediumd: bool
+    noise_th: int = -91
+    fading_cof: int = 0
+
+    @property
+    def label(self):
+        if not self.wmediumd:
+            return 'n%d-sem-wmediumd' % self.stations
+        return 'n%d-interf-ruido%d-desv%d' % (self.stations, self.noise_th,
+                                              self.fading_cof)
+
+    def script(self):
+        return TEMPLATE % {'label': self.label, 'stations': self.stations,
+                           'wmediumd': self.wmediumd,
+                           'noise_th': self.noise_th,
+                           'fading_cof': self.fading_cof, 'range': 100}
+
+
+def configs(stations, noises, fadings):
+    "Topologia sem wmediumd e com interferência em cada (ruído, fading)."
+    found = []
+    for n in stations:
+        found.append(Config(n, False))
+        for noise in noises:
+            for fading in fadings:
+                found.append(Config(n, True, noise, fading))
+    return found
+
+
+def parse_output(output):
+    "Métricas da linha ``@@metricas`` (dicionário vazio se não houver)."
+    matches = METRICS_RE.findall(output)
+    if not matches:
+        return {}
+    return {name: (value, UNITS.get(name, ''))
+            for name, value in json.loads(matches[-1]).items()
+            if value is not None}
+
+
+def run_config(runner, config, directory):
+    "Executa uma configuração e devolve o ``RunRecord``."
+    path = os.path.join(directory, 'bench_%s.py' % config.label.replace(
+        '-', '_'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(config.script())
+    record = runner.run(path)
+    with open(dict(record.artifacts)['saida'], encoding='utf-8') as f:
+        record.metrics.update(parse_output(f.read()))
+    record.stage = 'benchmark'
+    record.extra.update({'benchmark': 'interferencia',
+                         'configuracao': config.label,
+                         'estacoes': config.stations,
+                         'wmediumd': config.wmediumd,
+                         'noise_th': config.noise_th,
+                         'fading_cof': config.fading_cof})
+    return record
+
+
+def summarize(records):
+    "Mediana de cada métrica por configuração."
+    groups = {}
+    for record in records:
+        groups.setdefault(record.extra['configuracao'], []).append(record)
+    names = [n for n in UNITS if n != 'associadas']
+    rows = []
+    for label, group in groups.items():
+        row = [label, len(group)]
+        for name in names:
+            values = [r.metrics[name][0] for r in group if name in r.metrics]
+            row.append(statistics.median(values) if values else None)
+        rows.append(row)
+    return ['configuracao', 'n'] + names, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.interferencia',
+        description='Custo do modo de interferência do wmediumd.')
+    parser.add_argument('--estacoes', type=int, nargs='+',
+                        default=[2, 4, 8, 16])
+    parser.add_argument('--ruido', type=int, nargs='+', default=[-91],
+                        help='valores de noise_th (dBm)')
+    parser.add_argument('--desvanecimento', type=int, nargs='+',
+                        default=[0], help='valores de fading_cof')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--banco', default=resultados.DEFAULT_PATH)
+    parser.add_argument('--diretorio', default=DEFAULT_DIR,
+                        help='onde gravar os scripts gerados')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    runner = execucao.Runner(args.timeout)
+    store = resultados.ResultsStore(args.banco)
+    records = []
+    os.makedirs(args.diretorio, exist_ok=True)
+    for config in configs(args.estacoes, args.ruido, args.desvanecimento):
+        for i in range(args.repeticoes):
+            log.info('*** %s (%d/%d)', config.label, i + 1, args.repeticoes)
+            record = run_config(runner, config, args.diretorio)
+            store.append(record)
+            records.append(record)
+    store.close()
+    header, rows = summarize(records)
+    print('\t'.join(header))
+    for row in rows:
+        print('\t'.join('-' if v is None else
+                        ('%.3f' % v if isinstance(v, float) else str(v))
+                        for v in row))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
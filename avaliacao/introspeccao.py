@@ -0,0 +1,583 @@
+"""
+Construção do catálogo de APIs por introspecção da biblioteca instalada.
+
+A semente ``catalogos/mn_wifi-2.6.json`` foi curada à mão; as demais
+versões são geradas importando o ``mininet``/``mn_wifi`` instalados e
+percorrendo módulos, classes e métodos. Para cada nome, o catálogo
+guarda o tipo; para funções e classes, a assinatura (parâmetros
+nomeados e se aceita ``**params``) e, quando aceita, as chaves de
+``**params`` encontradas no código-fonte: leituras do dicionário
+(``params['x']``, ``params.get('x')``, ``'x' in params``), leituras de
+``self.params`` nas classes e chaves repassadas por ``**params`` a
+outras funções e construtores (``cls(name, **defaults)``, com ``cls``
+resolvido pelo valor padrão e suas subclasses). Classes reexportadas
+apontam para a entrada do módulo que as define (``ref``).
+
+O catálogo gerado é carregado por ``avaliacao.catalogo`` sem importar a
+biblioteca. Com ``--python``, a introspecção roda no interpretador
+indicado (outra instalação do Mininet-WiFi).
+
+Exemplo::
+
+    python3 -m avaliacao.introspeccao
+    python3 -m avaliacao.introspeccao --python /opt/mn_wifi-2.7/bin/python3
+"""
+
+import argparse
+import ast
+import builtins
+import functools
+import gzip
+import importlib
+import inspect
+import json
+import logging
+import os
+import pkgutil
+import subprocess
+import sys
+import textwrap
+import types
+
+from avaliacao import catalogo, cenarios
+
+log = logging.getLogger(__name__)
+
+FORMAT = 1
+
+# Subpacotes não importados (executam cenários ao importar)
+SKIP = ('examples',)
+
+# Métodos de ``dict`` que leem uma chave
+READ_METHODS = ('get', 'pop', 'setdefault')
+
+
+def _function(obj):
+    "Função Python por trás de ``obj`` (método, staticmethod...) ou ``None``."
+    obj = getattr(obj, '__func__', obj)
+    try:
+        obj = inspect.unwrap(obj)
+    except ValueError:
+        return None
+    return obj if inspect.isfunction(obj) else None
+
+
+@functools.lru_cache(maxsize=None)
+def _tree(func):
+    "Nó ``FunctionDef`` do código-fonte de ``func`` (ou ``None``)."
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+        module = ast.parse(source)
+    except (OSError, TypeError, SyntaxError, IndentationError):
+        return None
+    for node in module.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return node
+    return None
+
+
+def _first_arg(tree):
+    args = tree.args.posonlyargs + tree.args.args
+    return args[0].arg if args else None
+
+
+def _signature(func, bound):
+    "``(parâmetros nomeados, aceita **params)``; ``bound`` descarta o 1º."
+    try:
+        parameters = list(inspect.signature(func).parameters.values())
+    except (TypeError, ValueError):
+        return None
+    if bound and parameters and parameters[0].kind in (
+            parameters[0].POSITIONAL_ONLY,
+            parameters[0].POSITIONAL_OR_KEYWORD):
+        parameters = parameters[1:]
+    names = [p.name for p in parameters
+             if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+    return names, any(p.kind == p.VAR_KEYWORD for p in parameters)
+
+
+def _is_str(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+def _reads(tree, is_container):
+    "Chaves literais lidas de dicionários reconhecidos por ``is_container``."
+    keys = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Subscript) and is_container(node.value)
+                and _is_str(node.slice)):
+            keys.add(node.slice.value)
+        elif (isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in READ_METHODS
+                and is_container(node.func.value)
+                and node.args and _is_str(node.args[0])):
+            keys.add(node.args[0].value)
+        elif (isinstance(node, ast.Compare) and _is_str(node.left)
+                and len(node.ops) == 1
+                and isinstance(node.ops[0], (ast.In, ast.NotIn))
+                and is_container(node.comparators[0])):
+            keys.add(node.left.value)
+    return keys
+
+
+def _aliases(tree, name):
+    "Nomes locais que recebem o conteúdo de ``**name``."
+    aliases = {name}
+
+    def alias(expr):
+        if isinstance(expr, ast.Name):
+            return expr.id in aliases
+        if isinstance(expr, ast.Call):
+            func = expr.func
+            if (isinstance(func, ast.Name) and func.id == 'dict'
+                    and expr.args):
+                return alias(expr.args[0])
+            if isinstance(func, ast.Attribute) and func.attr == 'copy':
+                return alias(func.value)
+        return False
+
+    size = 0
+    while size != len(aliases):
+        size = len(aliases)
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and alias(node.value)):
+                aliases.add(node.targets[0].id)
+            elif (isinstance(node, ast.Call)
+                    and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == 'update'
+                    and isinstance(node.func.value, ast.Name)
+                    and any(alias(a) for a in node.args)):
+                aliases.add(node.func.value.id)
+    return aliases
+
+
+class Scanner:
+    "Chaves de ``**params`` aceitas por funções e classes das bibliotecas."
+
+    def __init__(self, packages=catalogo.TRACKED_PACKAGES):
+        self.packages = packages
+        self._functions = {}
+        self._classes = {}
+
+    def tracked(self, obj):
+        module = getattr(obj, '__module__', None) or ''
+        return module.split('.')[0] in self.packages
+
+    def subclasses(self, cls):
+        found, pending = [], [cls]
+        while pending:
+            for sub in pending.pop().__subclasses__():
+                if sub not in found and self.tracked(sub):
+                    found.append(sub)
+                    pending.append(sub)
+        return found
+
+    def class_keys(self, cls):
+        "Chaves aceitas pelo construtor de ``cls`` (e pelo ``config``)."
+        if cls in self._classes:
+            return self._classes[cls]
+        self._classes[cls] = keys = set()
+        for base in cls.__mro__:
+            if base is object or not self.tracked(base):
+                continue
+            for name in ('__init__', 'config'):
+                func = _function(base.__dict__.get(name))
+                if func:
+                    keys |= set((_signature(func, True) or ((), 0))[0])
+                    keys |= self.function_keys(func, cls, base)
+            for value in base.__dict__.values():
+                func = _function(value)
+                tree = func and _tree(func)
+                if tree:
+                    keys |= _reads(tree, self._self_params(tree))
+        return keys
+
+    @staticmethod
+    def _self_params(tree):
+        first = _first_arg(tree)
+
+        def is_container(node):
+            return (isinstance(node, ast.Attribute) and node.attr == 'params'
+                    and isinstance(node.value, ast.Name)
+                    and node.value.id == first)
+        return is_container
+
+    def function_keys(self, func, owner=None, base=None):
+        "Chaves de ``**params`` lidas ou repassadas por ``func``."
+        func = _function(func)
+        if func is None:
+            return set()
+        memo = (func, owner)
+        if memo not in self._functions:
+            self._functions[memo] = set()
+            self._functions[memo] = self._scan(func, owner, base)
+        return self._functions[memo]
+
+    def _scan(self, func, owner, base):
+        tree = _tree(func)
+        if tree is None or tree.args.kwarg is None:
+            return set()
+        aliases = _aliases(tree, tree.args.kwarg.arg)
+        keys = _reads(tree, lambda n: isinstance(n, ast.Name)
+                      and n.id in aliases)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call):
+                continue
+            if not any(kw.arg is None and isinstance(kw.value, ast.Name)
+                       and kw.value.id in aliases for kw in node.keywords):
+                continue
+            for target, target_owner in self._targets(
+                    node.func, func, tree, owner, base):
+                keys |= self.callable_keys(target, target_owner)
+        return keys
+
+    def callable_keys(self, target, owner=None):
+        if inspect.isclass(target):
+            return self.class_keys(target) if self.tracked(target) else set()
+        func = _function(target)
+        if func is None or not self.tracked(func):
+            return set()
+        signature = _signature(func, owner is not None)
+        return (set(signature[0]) if signature else set()) | \
+            self.function_keys(func, owner)
+
+    def _targets(self, expr, func, tree, owner, base, seen=()):
+        "``[(objeto, dono)]`` que uma expressão de chamada pode designar."
+        first = _first_arg(tree)
+        if isinstance(expr, ast.IfExp):
+            return (self._targets(expr.body, func, tree, owner, base, seen)
+                    + self._targets(expr.orelse, func, tree, owner, base,
+                                    seen))
+        if isinstance(expr, ast.BoolOp):
+            return [t for value in expr.values
+                    for t in self._targets(value, func, tree, owner, base,
+                                           seen)]
+        if isinstance(expr, ast.Call):
+            # Fábrica (``controller = findController(controllers)``): o
+            # que as funções da biblioteca devolvem
+            targets = []
+            for callee, _ in self._targets(expr.func, func, tree, owner,
+                                           base, seen):
+                callee = _function(callee)
+                callee_tree = callee and _tree(callee)
+                if (not callee_tree or callee in seen
+                        or not self.tracked(callee)):
+                    continue
+                for node in ast.walk(callee_tree):
+                    if isinstance(node, ast.Return) and node.value:
+                        targets += self._targets(
+                            node.value, callee, callee_tree, None, None,
+                            seen + (callee,))
+            return targets
+        if isinstance(expr, ast.Name):
+            if (func, expr.id) in seen:
+                return []
+            values = self._local_values(expr.id, func, tree)
+            if values is None:
+                value = func.__globals__.get(
+                    expr.id, getattr(builtins, expr.id, None))
+                return [(value, None)] if value is not None else []
+            targets = []
+            for value, element in values:
+                if isinstance(value, ast.AST):
+                    found = self._targets(value, func, tree, owner, base,
+                                          seen + ((func, expr.id),))
+                else:
+                    found = [(value, None)]
+                if element:
+                    # Variável de laço: os itens da sequência
+                    found = [(item, None) for value, _ in found
+                             if isinstance(value, (tuple, list))
+                             for item in value]
+                targets += found
+            return self._expand(targets)
+        if not isinstance(expr, ast.Attribute):
+            return []
+        value = expr.value
+        if (isinstance(value, ast.Call) and isinstance(value.func, ast.Name)
+                and value.func.id == 'super' and owner):
+            mro = owner.__mro__
+            start = mro.index(base) + 1 if base in mro else 1
+            for cls in mro[start:]:
+                if expr.attr in cls.__dict__:
+                    return [(cls.__dict__[expr.attr], owner)]
+            return []
+        if isinstance(value, ast.Name) and value.id == first and owner:
+            attr = inspect.getattr_static(owner, expr.attr, None)
+            if _function(attr):
+                return [(attr, owner)]
+            # Atributo configurável no construtor (``self.host = host``)
+            return self._expand([(v, None) for v in
+                                 self._configured(owner, expr.attr)])
+        if isinstance(value, ast.Name):
+            container = func.__globals__.get(value.id)
+            attr = getattr(container, expr.attr, None)
+            if attr is not None:
+                return [(attr, container if inspect.isclass(container)
+                         else None)]
+        return []
+
+    def _expand(self, targets):
+        "Classes vindas de variáveis: a padrão e suas subclasses."
+        expanded = []
+        for target, owner in targets:
+            expanded.append((target, owner))
+            if inspect.isclass(target) and self.tracked(target):
+                expanded += [(sub, None) for sub in self.subclasses(target)]
+        return expanded
+
+    @staticmethod
+    def _local_values(name, func, tree):
+        """``[(valor, item_de_laço)]`` do parâmetro e das atribuições locais
+        (``None`` se o nome é global)."""
+        values = []
+        local = False
+        try:
+            parameter = inspect.signature(func).parameters.get(name)
+        except (TypeError, ValueError):
+            parameter = None
+        if parameter is not None:
+            local = True
+            if parameter.default not in (parameter.empty, None):
+                values.append((parameter.default, False))
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and node.targets[0].id == name):
+                local = True
+                values.append((node.value, False))
+            elif (isinstance(node, ast.For)
+                    and isinstance(node.target, ast.Name)
+                    and node.target.id == name):
+                local = True
+                values.append((node.iter, True))
+        return values if local else None
+
+    @staticmethod
+    def _configured(owner, attr):
+        "Padrões dos parâmetros atribuídos a ``self.attr`` nos construtores."
+        values = []
+        for cls in owner.__mro__:
+            init = _function(cls.__dict__.get('__init__'))
+            tree = init and _tree(init)
+            if not tree:
+                continue
+            first = _first_arg(tree)
+            parameters = inspect.signature(init).parameters
+            for node in ast.walk(tree):
+                if (isinstance(node, ast.Assign)
+                        and any(isinstance(t, ast.Attribute)
+                                and t.attr == attr
+                                and isinstance(t.value, ast.Name)
+                                and t.value.id == first
+                                for t in node.targets)
+                        and isinstance(node.value, ast.Name)
+                        and node.value.id in parameters):
+                    default = parameters[node.value.id].default
+                    if default not in (inspect.Parameter.empty, None):
+                        values.append(default)
+        return values
+
+
+def instance_attributes(cls):
+    "Atributos atribuídos a ``self`` nos métodos das classes da MRO."
+    names = set()
+    for base in cls.__mro__:
+        for value in base.__dict__.values():
+            func = _function(value)
+            tree = func and _tree(func)
+            if not tree:
+                continue
+            first = _first_arg(tree)
+            for node in ast.walk(tree):
+                if (isinstance(node, ast.Attribute)
+                        and isinstance(node.ctx, ast.Store)
+                        and isinstance(node.value, ast.Name)
+                        and node.value.id == first):
+                    names.add(node.attr)
+    return names
+
+
+class Builder:
+    "Catálogo das bibliotecas importadas no interpretador atual."
+
+    def __init__(self, packages=catalogo.TRACKED_PACKAGES):
+        self.scanner = Scanner(packages)
+        self.packages = packages
+
+    def function_entry(self, func, bound=False, owner=None):
+        entry = {'kind': 'function'}
+        func = _function(func)
+        signature = func and _signature(func, bound)
+        if signature is None:
+            return entry
+        entry['params'], entry['varkw'] = signature
+        if entry['varkw']:
+            keys = self.scanner.function_keys(func, owner, owner)
+            if keys:
+                entry['keys'] = sorted(keys)
+        return entry
+
+    def class_entry(self, cls):
+        entry = {'kind': 'class'}
+        init = next((_function(c.__dict__['__init__']) for c in cls.__mro__
+                     if '__init__' in c.__dict__), None)
+        signature = init and _signature(init, True)
+        if signature:
+            entry['params'], entry['varkw'] = signature
+            if entry['varkw']:
+                entry['keys'] = sorted(self.scanner.class_keys(cls))
+        methods = {}
+        for name in dir(cls):
+            if name.startswith('__'):
+                continue
+            raw = inspect.getattr_static(cls, name)
+            if isinstance(raw, staticmethod):
+                methods[name] = self.function_entry(raw.__func__)
+            elif isinstance(raw, classmethod):
+                methods[name] = self.function_entry(raw.__func__, True)
+            elif _function(raw):
+                methods[name] = self.function_entry(raw, True, cls)
+            else:
+                methods[name] = {'kind': 'value'}
+        for name in instance_attributes(cls):
+            methods.setdefault(name, {'kind': 'value'})
+        entry['methods'] = methods
+        return entry
+
+    def module_entry(self, module):
+        names = {}
+        for name, value in sorted(vars(module).items()):
+            if name.startswith('__') or isinstance(value, types.ModuleType):
+                continue
+            defined = getattr(value, '__module__', None) == module.__name__
+            if name.startswith('_') and not defined:
+                continue
+            if inspect.isclass(value):
+                if defined and self.scanner.tracked(value):
+                    names[name] = self.class_entry(value)
+                elif self.scanner.tracked(value):
+                    names[name] = {'kind': 'class', 'ref': '%s.%s' % (
+                        value.__module__, value.__qualname__)}
+                else:
+                    names[name] = {'kind': 'class'}
+            elif callable(value):
+                names[name] = (self.function_entry(value)
+                               if _function(value) else {'kind': 'function'})
+            else:
+                names[name] = {'kind': 'value'}
+        return {'exhaustive': True, 'names': names}
+
+    def modules(self):
+        "Módulos dos pacotes (os que falham ao importar ficam vazios)."
+        found = {}
+        for package in self.packages:
+            try:
+                root = importlib.import_module(package)
+            except Exception as exc:
+                log.warning('*** %s não importado: %s', package, exc)
+                continue
+            found[package] = root
+            for info in pkgutil.walk_packages(
+                    getattr(root, '__path__', []), package + '.',
+                    onerror=lambda name: None):
+                if set(info.name.split('.')) & set(SKIP):
+                    continue
+                try:
+                    found[info.name] = importlib.import_module(info.name)
+                except Exception as exc:
+                    log.warning('*** %s não importado: %s', info.name, exc)
+                    found[info.name] = None
+        return found
+
+    def build(self, version=None):
+        loaded = self.modules()
+        if not loaded:
+            raise RuntimeError('nenhum pacote de %s instalado'
+                               % ', '.join(self.packages))
+        modules = {}
+        # Todos importados antes: as subclasses precisam estar carregadas
+        for name, module in sorted(loaded.items()):
+            modules[name] = ({'exhaustive': False, 'names': {}}
+                             if module is None else self.module_entry(module))
+        version = version or installed_version()
+        if not version:
+            raise RuntimeError('versão do mn_wifi desconhecida (--versao)')
+        return {'format': FORMAT, 'modules': modules,
+                'source': 'introspecção de %s' % ', '.join(
+                    '%s (%s)' % (p, os.path.dirname(loaded[p].__file__))
+                    for p in self.packages if loaded.get(p)),
+                'version': version}
+
+
+def installed_version():
+    try:
+        from mn_wifi import net
+    except Exception:
+        return None
+    return getattr(net, 'VERSION', None)
+
+
+def write_catalog(data, path):
+    "Grava o catálogo (compacto e comprimido se ``path`` termina em .gz)."
+    tmp = '%s.tmp' % path
+    if path.endswith('.gz'):
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, sort_keys=True, separators=(',', ':'))
+    else:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+            f.write('\n')
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.introspeccao',
+        description='Gera o catálogo de APIs do Mininet-WiFi instalado.')
+    parser.add_argument('--python',
+                        help='interpretador com a instalação a catalogar')
+    parser.add_argument('--versao',
+                        help='versão do catálogo (padrão: mn_wifi.net.VERSION)')
+    parser.add_argument('--saida', metavar='ARQUIVO',
+                        help='padrão: catalogos/mn_wifi-<versão>.json')
+    parser.add_argument('--gzip', action='store_true',
+                        help='grava JSON compacto comprimido (.json.gz)')
+    parser.add_argument('--substituir', action='store_true',
+                        help='sobrescreve um catálogo existente')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.python:
+        # Reexecuta no interpretador da instalação indicada
+        command = [args.python, '-m', 'avaliacao.introspeccao']
+        for flag, value in (('--versao', args.versao),
+                            ('--saida', args.saida)):
+            if value:
+                command += [flag, value]
+        command += [flag for flag, on in (('--gzip', args.gzip),
+                                          ('--substituir', args.substituir))
+                    if on]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            p for p in (cenarios.ROOT, os.environ.get('PYTHONPATH')) if p))
+        return subprocess.run(command, env=env).returncode
+
+    try:
+        data = Builder().build(args.versao)
+    except RuntimeError as exc:
+        parser.error(str(exc))
+    path = args.saida or catalogo.catalog_path(data['version'])
+    if args.gzip and not path.endswith('.gz'):
+        path += '.gz'
+    if os.path.exists(path) and not args.substituir:
+        parser.error('%s já existe (--substituir)' % path)
+    write_catalog(data, path)
+    print('%s: %d módulos' % (path, len(data['modules'])))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+``/tmp`` privado para cada execução.
+
+Os scripts gerados gravam em caminhos fixos (``/tmp/iperf_sta1.log``,
+``/tmp/ping_test.txt``, ``/tmp/iperf_server.log``); dois trabalhadores
+rodando os scripts do deepseek ao mesmo tempo sobrescrevem os
+resultados um do outro. Cada execução roda num namespace de montagem
+próprio (``unshare --mount``), com o diretório da execução
+(``artefatos/<execução>/tmp``) montado sobre ``/tmp``. Os shells dos
+nós, o hostapd e o wpa_supplicant herdam o namespace e também gravam
+ali; ao final, os arquivos já estão entre os artefatos da execução e
+vão para o arquivo de logs (``avaliacao.arquivo``).
+
+Requer ``unshare`` e ``mount`` (util-linux) e privilégios de root.
+"""
+
+import logging
+import os
+import subprocess
+
+log = logging.getLogger(__name__)
+
+# Montagem no namespace novo; "$0" é o diretório, "$@" o comando
+MOUNT_SCRIPT = 'mount --bind "$0" /tmp && exec "$@"'
+
+
+def check(sudo=False):
+    "``RuntimeError`` se não é possível criar namespaces de montagem."
+    command = ['unshare', '--mount', '--propagation', 'private', 'true']
+    if sudo:
+        command = ['sudo', '-n'] + command
+    try:
+        out = subprocess.run(command, capture_output=True, text=True,
+                             timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise RuntimeError('unshare indisponível: %s' % exc)
+    if out.returncode != 0:
+        raise RuntimeError('unshare --mount falhou: %s'
+                           % (out.stderr.strip() or out.returncode))
+
+
+class PrivateTmp:
+    "Diretório de uma execução montado sobre ``/tmp``."
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+    def create(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Mesmas permissões do /tmp (processos sem privilégio gravam ali)
+        os.chmod(self.directory, 0o1777)
+        return self
+
+    def wrap(self, command):
+        "Comando executado com o ``/tmp`` privado."
+        return (['unshare', '--mount', '--propagation', 'private',
+                 'sh', '-c', MOUNT_SCRIPT, self.directory] + list(command))
+
+    def files(self):
+        "Arquivos gravados em ``/tmp`` pela execução (caminho, nome)."
+        found = []
+        for base, dirs, names in os.walk(self.directory):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(base, name)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    found.append((path, '/tmp/' + os.path.relpath(
+                        path, self.directory)))
+        return found
+
+    def collect(self):
+        "``[(nome, bytes)]`` dos arquivos, para ``LogArchive.add``."
+        logs = []
+        for path, name in self.files():
+            try:
+                with open(path, 'rb') as f:
+                    logs.append((name, f.read()))
+            except OSError as exc:
+                log.warning('*** %s não coletado: %s', name, exc)
+        return logs
+
+    def attach(self, record):
+        "Lista os arquivos no registro e o diretório nos artefatos."
+        files = self.files()
+        record.extra['tmp'] = [
+            {'nome': name, 'tamanho': os.path.getsize(path)}
+            for path, name in files]
+        if files:
+            record.artifacts.append(('tmp', self.directory))
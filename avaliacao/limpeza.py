@@ -0,0 +1,464 @@
+"""
+Desmontagem rápida e coleta de vazamentos entre execuções.
+
+Os scripts deixam restos: o ``dnsmasq`` iniciado nos APs, servidores
+``iperf -s &``, e scripts que quebram antes de ``net.stop()`` deixam
+interfaces, namespaces, bridges do OVS e rádios hwsim para a execução
+seguinte. ``snapshot()`` inventaria o host (interfaces, namespaces
+nomeados, bridges e datapaths do OVS, qdiscs, processos da emulação,
+rádios hwsim e arquivos temporários do Mininet-WiFi); ``reap()``
+compara com o inventário de referência (host limpo), remove o que
+sobrou — processos primeiro, depois os demais recursos em paralelo e
+por último o módulo hwsim — e verifica se o host voltou à referência.
+
+Estar fora da referência não basta: só sai o que pode ser atribuído à
+emulação (``emulation``) — interfaces, bridges e namespaces com nomes
+de nós do Mininet (``s1``, ``ap1-wlan1``, ``mn3_ap1``), rádios
+``mn<NN>s<N>`` e processos dentro dos nós, citando interfaces dos nós
+ou exclusivos da emulação. O ``dhclient`` do host com pid novo, veths
+do docker e namespaces de outras ferramentas ficam, e o módulo hwsim só
+é descarregado se não estava na referência e todos os rádios presentes
+são da emulação.
+Cada etapa é cronometrada e vai para as fases do registro da execução.
+
+Exemplo::
+
+    sudo python3 -m avaliacao.limpeza referencia
+    sudo python3 -m avaliacao.limpeza limpar
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from avaliacao import controladores, resultados
+
+BASELINE_PATH = os.path.join(resultados.DEFAULT_DIR, 'referencia.json')
+
+# Processos iniciados pela emulação ou pelos scripts
+PROCESS_NAMES = ('hostapd', 'wpa_supplicant', 'dnsmasq', 'wmediumd',
+                 'iperf', 'iperf3', 'ping', 'ovs-testcontroller',
+                 'controller', 'tcpdump', 'udhcpd', 'dhclient', 'olsrd',
+                 'babeld', 'batmand')
+NODE_SHELL_RE = re.compile(r'mininet:[\w.-]+')
+TMP_PATTERNS = ('/tmp/mn*.apconf', '/tmp/mn*.staconf', '/tmp/*.apconf',
+                '/tmp/*.staconf', '/tmp/vconn-unix.*', '/tmp/vlogs.*')
+# Nomes de nós do Mininet(-WiFi), com o prefixo de uma vaga de rádios ou
+# não, e de suas interfaces (``s1``, ``ap1-wlan1``, ``mn3_ap1-wlan1``)
+NODE_NAME_RE = re.compile(
+    r'^(?:mn\d+_)?(?:sta|ap|car|h|s|r|nat|mesh|sensor|apsensor|modem)\d+'
+    r'(?:[-.][\w.-]+)?$')
+NODE_INTERFACE_RE = re.compile(
+    r'(?<![\w-])(?:mn\d+_)?(?:sta|ap|car|h|s|r|nat|mesh|sensor|apsensor|'
+    r'modem)\d+-(?:wlan|eth|mp|mon)\d+')
+# Rádios criados pelo Mininet-WiFi e pelas vagas (``mn00s0``, ``mn50s3``)
+RADIO_RE = re.compile(r'^mn\d+s\d+$')
+# Processos que só a emulação inicia (os demais precisam de outro vínculo)
+EMULATION_PROCESSES = ('wmediumd', 'ovs-testcontroller', 'controller')
+QDISC_RE = re.compile(r'^qdisc (\w+) \w+: dev (\S+) root', re.M)
+DEFAULT_QDISCS = ('noqueue', 'pfifo_fast', 'fq_codel', 'mq', 'fq')
+TERM_GRACE = 1.0
+
+
+@dataclass
+class Inventory:
+    "Recursos de rede e processos presentes no host."
+    interfaces: list = field(default_factory=list)
+    namespaces: list = field(default_factory=list)
+    bridges: list = field(default_factory=list)
+    datapaths: list = field(default_factory=list)
+    qdiscs: list = field(default_factory=list)
+    processes: list = field(default_factory=list)
+    radios: list = field(default_factory=list)
+    hwsim_loaded: bool = False
+    files: list = field(default_factory=list)
+
+    def minus(self, baseline):
+        "O que existe aqui e não existia na referência."
+        leaks = Inventory()
+        for name in ('interfaces', 'namespaces', 'bridges', 'datapaths',
+                     'qdiscs', 'radios', 'files'):
+            old = set(map(str, getattr(baseline, name)))
+            setattr(leaks, name, [x for x in getattr(self, name)
+                                  if str(x) not in old])
+        old_pids = {p[0] for p in baseline.processes}
+        leaks.processes = [p for p in self.processes if p[0] not in old_pids]
+        leaks.hwsim_loaded = self.hwsim_loaded and not baseline.hwsim_loaded
+        return leaks
+
+    def select(self, owned):
+        "Só o que ``owned(tipo, item)`` atribui à execução."
+        selected = Inventory()
+        for name in ('interfaces', 'namespaces', 'bridges', 'datapaths',
+                     'qdiscs', 'processes', 'radios', 'files'):
+            setattr(selected, name, [x for x in getattr(self, name)
+                                     if owned(name, x)])
+        return selected
+
+    def empty(self):
+        return not any(v for v in asdict(self).values())
+
+    def counts(self):
+        return {k: (len(v) if isinstance(v, list) else int(v))
+                for k, v in asdict(self).items() if v}
+
+
+def _privileged(command):
+    if os.geteuid() != 0:
+        return ['sudo', '-n'] + command
+    return command
+
+
+def _output(command):
+    "Saída do comando (vazia se o comando não existir ou falhar)."
+    try:
+        return subprocess.run(_privileged(command), capture_output=True,
+                              text=True, timeout=30).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+
+
+def _run(command, stdin=None):
+    try:
+        subprocess.run(_privileged(command), input=stdin, text=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def _ancestors():
+    "Pids deste processo e dos seus ancestrais (nunca são coletados)."
+    pids, pid = set(), os.getpid()
+    while pid > 1 and pid not in pids:
+        pids.add(pid)
+        try:
+            with open('/proc/%d/stat' % pid) as f:
+                pid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            break
+    return pids
+
+
+def _processes():
+    "``[(pid, nome, linha de comando)]`` dos processos da emulação."
+    found = []
+    # Nem o próprio avaliador nem os controladores do pool, que ficam
+    # no ar entre execuções
+    own = _ancestors() | controladores.pool_pids()
+    for name in os.listdir('/proc'):
+        if not name.isdigit() or int(name) in own:
+            continue
+        try:
+            with open('/proc/%s/comm' % name) as f:
+                comm = f.read().strip()
+            with open('/proc/%s/cmdline' % name, 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(
+                    errors='replace').strip()
+        except OSError:
+            continue
+        if comm in PROCESS_NAMES or NODE_SHELL_RE.search(cmdline):
+            found.append((int(name), comm, cmdline[:200]))
+    return found
+
+
+def _netns(pid):
+    try:
+        return os.readlink('/proc/%d/ns/net' % pid)
+    except OSError:
+        return None
+
+
+def _hwsim_interface(name):
+    "Interface (``wlan0``...) de um rádio da emulação."
+    try:
+        with open('/sys/class/net/%s/phy80211/name' % name) as f:
+            return bool(RADIO_RE.match(f.read().strip()))
+    except OSError:
+        return False
+
+
+def emulation(kind, item):
+    """Critério ``owned(tipo, item)`` padrão de ``reap``: o que pode ser
+    atribuído à emulação, não só o que falta na referência."""
+    if kind == 'processes':
+        pid, comm, cmdline = item
+        if (comm in EMULATION_PROCESSES or NODE_SHELL_RE.search(cmdline)
+                or NODE_INTERFACE_RE.search(cmdline)
+                or '.apconf' in cmdline or '.staconf' in cmdline):
+            return True
+        # Dentro de um nó (namespace de rede que não é o do host)
+        netns = _netns(pid)
+        return netns is not None and netns != _netns(1)
+    if kind == 'interfaces':
+        return bool(NODE_NAME_RE.match(item)) or _hwsim_interface(item)
+    if kind in ('namespaces', 'bridges'):
+        return bool(NODE_NAME_RE.match(item))
+    if kind == 'datapaths':
+        return bool(NODE_NAME_RE.match(item.rpartition('@')[2]))
+    if kind == 'qdiscs':
+        return bool(NODE_NAME_RE.match(item.split(':', 1)[0]))
+    if kind == 'radios':
+        return bool(RADIO_RE.match(item))
+    # Arquivos: ``TMP_PATTERNS`` já são os do Mininet-WiFi
+    return kind == 'files'
+
+
+def _radios():
+    radios = []
+    for phy in glob.glob('/sys/class/ieee80211/*'):
+        driver = os.path.realpath(os.path.join(phy, 'device', 'driver'))
+        if 'hwsim' in driver or os.path.exists(
+                os.path.join(phy, 'hwsim')):
+            radios.append(os.path.basename(phy))
+    return sorted(radios)
+
+
+def snapshot():
+    "Inventário atual do host."
+    files = sorted({p for pattern in TMP_PATTERNS
+                    for p in glob.glob(pattern)})
+    return Inventory(
+        interfaces=sorted(os.listdir('/sys/class/net')),
+        namespaces=sorted(line.split()[0] for line in
+                          _output(['ip', 'netns', 'list']).splitlines()
+                          if line.strip()),
+        bridges=sorted(_output(['ovs-vsctl', '--timeout=5',
+                                'list-br']).split()),
+        datapaths=sorted(line.strip().rstrip(':') for line in
+                         _output(['ovs-dpctl', 'dump-dps']).splitlines()
+                         if line.strip()),
+        qdiscs=sorted('%s:%s' % (dev, kind) for kind, dev in
+                      QDISC_RE.findall(_output(['tc', 'qdisc', 'show']))
+                      if kind not in DEFAULT_QDISCS),
+        processes=_processes(),
+        radios=_radios(),
+        hwsim_loaded=os.path.isdir('/sys/module/mac80211_hwsim'),
+        files=files,
+    )
+
+
+def save_baseline(path=BASELINE_PATH):
+    inventory = snapshot()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(asdict(inventory), f, indent=1)
+    return inventory
+
+
+def load_baseline(path=BASELINE_PATH):
+    "Inventário de referência salvo (ou ``None``)."
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data['processes'] = [tuple(p) for p in data['processes']]
+    return Inventory(**data)
+
+
+def _alive(pid):
+    "Se o processo existe e não é zumbi."
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return False
+
+
+def kill_processes(processes, grace=TERM_GRACE):
+    "SIGTERM em todos, espera ``grace`` segundos e SIGKILL nos restantes."
+    pids = [p[0] for p in processes]
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        alive = []
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+                alive.append(pid)
+            except ProcessLookupError:
+                continue
+            except PermissionError:
+                _run(['kill', '-%d' % sig, str(pid)])
+                alive.append(pid)
+        if sig == signal.SIGKILL or not alive:
+            break
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            alive = [pid for pid in alive if _alive(pid)]
+            if not alive:
+                break
+            time.sleep(0.05)
+        pids = alive
+
+
+def delete_bridges(bridges):
+    "Remove as bridges numa única transação do ovs-vsctl."
+    command = ['ovs-vsctl', '--timeout=10']
+    for bridge in bridges:
+        command += ['--', '--if-exists', 'del-br', bridge]
+    _run(command)
+
+
+def delete_datapaths(datapaths):
+    for dp in datapaths:
+        _run(['ovs-dpctl', 'del-dp', dp])
+
+
+def delete_interfaces(interfaces):
+    "Remove as interfaces num único ``ip -batch`` (continua em erros)."
+    _run(['ip', '-force', '-batch', '-'],
+         ''.join('link del dev %s\n' % i.split('@')[0] for i in interfaces))
+
+
+def delete_namespaces(namespaces):
+    _run(['ip', '-force', '-batch', '-'],
+         ''.join('netns del %s\n' % ns for ns in namespaces))
+
+
+def delete_qdiscs(qdiscs):
+    for entry in qdiscs:
+        _run(['tc', 'qdisc', 'del', 'dev', entry.split(':')[0], 'root'])
+
+
+def delete_files(files):
+    for path in files:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            _run(['rm', '-f', path])
+
+
+def unload_hwsim():
+    _run(['rmmod', 'mac80211_hwsim'])
+
+
+def delete_radios(radios):
+    "Remove rádios hwsim pelo nome, sem descarregar o módulo."
+    for radio in radios:
+        _run(['hwsim_mgmt', '-x', radio])
+
+
+# Etapas independentes (executadas em paralelo depois dos processos)
+PARALLEL_STEPS = (
+    ('bridges', delete_bridges),
+    ('datapaths', delete_datapaths),
+    ('interfaces', delete_interfaces),
+    ('namespaces', delete_namespaces),
+    ('qdiscs', delete_qdiscs),
+    ('files', delete_files),
+)
+
+
+@dataclass
+class Teardown:
+    "Resultado de uma coleta: o que vazou, tempos e o que restou."
+    leaks: Inventory
+    timings: dict
+    remaining: Inventory
+    duration: float
+
+    @property
+    def clean(self):
+        return self.remaining.empty()
+
+
+def reap(baseline, workers=6, owned=None):
+    """Remove o que não está na referência e é da emulação (``owned``,
+    por padrão ``emulation``) e verifica o resultado.
+
+    Com ``owned(tipo, item)`` de uma execução, só o que pertence a ela é
+    removido (execuções simultâneas; o módulo hwsim fica carregado)."""
+    start = time.time()
+    timings = {}
+    found = snapshot()
+    leaks = found.minus(baseline).select(owned or emulation)
+    # O módulo só sai se a emulação o carregou e todos os rádios são dela
+    unload = (not owned and found.hwsim_loaded and not baseline.hwsim_loaded
+              and all(RADIO_RE.match(r) for r in found.radios))
+    if leaks.processes:
+        t = time.time()
+        kill_processes(leaks.processes)
+        timings['processes'] = time.time() - t
+
+    def timed(step):
+        name, function = step
+        t = time.time()
+        function(getattr(leaks, name))
+        return name, time.time() - t
+
+    steps = [s for s in PARALLEL_STEPS if getattr(leaks, s[0])]
+    if steps:
+        with ThreadPoolExecutor(min(workers, len(steps))) as pool:
+            timings.update(pool.map(timed, steps))
+    if unload:
+        # Os rádios somem com o módulo, depois que as interfaces saem
+        t = time.time()
+        unload_hwsim()
+        timings['radios'] = time.time() - t
+    elif leaks.radios:
+        # Módulo compartilhado ou com rádios de outros: só os da emulação
+        t = time.time()
+        delete_radios(leaks.radios)
+        timings['radios'] = time.time() - t
+    t = time.time()
+    remaining = snapshot().minus(baseline).select(owned or emulation)
+    timings['verificacao'] = time.time() - t
+    return Teardown(leaks, timings, remaining, time.time() - start)
+
+
+def attach(record, teardown, prefix='limpeza'):
+    "Fases e resumo da coleta no ``RunRecord``."
+    for name, seconds in teardown.timings.items():
+        record.phase('%s:%s' % (prefix, name), None, seconds)
+    record.extra.setdefault(prefix, []).append({
+        'vazamentos': teardown.leaks.counts(),
+        'restantes': teardown.remaining.counts(),
+        'limpo': teardown.clean,
+        'duracao': teardown.duration,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.limpeza',
+        description='Inventário, desmontagem e coleta de vazamentos.')
+    parser.add_argument('--referencia', default=BASELINE_PATH)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('referencia', help='salva o inventário do host limpo')
+    sub.add_parser('inventario', help='mostra o que a emulação deixou')
+    sub.add_parser('limpar', help='remove o que a emulação deixou')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'referencia':
+        inventory = save_baseline(args.referencia)
+        print(json.dumps(inventory.counts()))
+        return 0
+    baseline = load_baseline(args.referencia)
+    if baseline is None:
+        parser.error('referência ausente: rode "referencia" com o host limpo')
+    if args.comando == 'inventario':
+        print(json.dumps(asdict(snapshot().minus(baseline).select(
+            emulation)), indent=1))
+        return 0
+    teardown = reap(baseline)
+    for name, seconds in teardown.timings.items():
+        print('%-12s %.3fs' % (name, seconds))
+    print('vazamentos: %s' % json.dumps(teardown.leaks.counts()))
+    if not teardown.clean:
+        print('restantes: %s' % json.dumps(asdict(teardown.remaining)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
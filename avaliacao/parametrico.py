@@ -0,0 +1,426 @@
+"""
+Gerador paramétrico de cenários além dos três níveis fixos.
+
+Produz prompts no estilo de ``prompts/p-*_{simples,especifico}.txt`` a
+partir de parâmetros (número de estações, APs e switches, canais,
+alcance, mobilidade, DHCP, tipo de controlador) e o conjunto de
+requisitos correspondente em JSON. Com ``check_requirements`` um
+script gerado pode ser conferido contra esses requisitos, o que
+permite medir a qualidade da geração ao longo de um eixo contínuo de
+complexidade.
+
+Exemplo::
+
+    python3 -m avaliacao.parametrico --estacoes 2 4 8 16 --aps 1 2 4 \\
+        --saida prompts/gerados
+    python3 -m avaliacao.geracao --modelo gpt-oss:20b \\
+        --parametrico prompts/gerados --saida /tmp/param
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+
+from avaliacao import cenarios
+
+_MASC = ('zero', 'um', 'dois', 'três', 'quatro', 'cinco', 'seis', 'sete',
+         'oito', 'nove', 'dez', 'onze', 'doze', 'treze', 'catorze',
+         'quinze', 'dezesseis', 'dezessete', 'dezoito', 'dezenove', 'vinte')
+
+DEFAULT_CHANNELS = (1, 6, 11)
+
+
+def number(n, feminine=False):
+    "Numeral por extenso (até vinte), concordando em gênero."
+    if feminine and n in (1, 2):
+        return ('uma', 'duas')[n - 1]
+    return _MASC[n] if n < len(_MASC) else str(n)
+
+
+def plural(n, singular, many):
+    return singular if n == 1 else many
+
+
+def names_text(prefix, n):
+    "``sta1``, ``sta1 e sta2`` ou ``sta1 a sta6``."
+    if n == 1:
+        return '%s1' % prefix
+    if n == 2:
+        return '%s1 e %s2' % (prefix, prefix)
+    return '%s1 a %s%d' % (prefix, prefix, n)
+
+
+def enumerate_text(items):
+    items = [str(i) for i in items]
+    if len(items) <= 1:
+        return ''.join(items)
+    return ', '.join(items[:-1]) + ' e ' + items[-1]
+
+
+@dataclass
+class Scenario:
+    "Parâmetros de um cenário."
+    stations: int = 2
+    aps: int = 1
+    switches: int = 0
+    channels: tuple = DEFAULT_CHANNELS
+    range: int = 30
+    mobility: bool = False
+    dhcp: bool = False
+    remote_controller: bool = False
+
+    def __post_init__(self):
+        if self.stations < 1 or self.aps < 1 or self.switches < 0:
+            raise ValueError('cenário inválido: %r' % (self,))
+        self.channels = tuple(self.channels)
+
+    @property
+    def slug(self):
+        parts = ['n%d' % self.stations, 'm%d' % self.aps,
+                 's%d' % self.switches]
+        if self.mobility:
+            parts.append('mob')
+        if self.dhcp:
+            parts.append('dhcp')
+        if self.remote_controller:
+            parts.append('rc')
+        return '-'.join(parts)
+
+    def ap_channels(self):
+        cycle = itertools.cycle(self.channels)
+        return {'ap%d' % (i + 1): next(cycle) for i in range(self.aps)}
+
+    def association(self):
+        "Distribuição equilibrada: estação -> AP inicial."
+        return {'sta%d' % (i + 1): 'ap%d' % (i * self.aps // self.stations
+                                            + 1)
+                for i in range(self.stations)}
+
+    def ap_switch(self):
+        "AP -> switch ao qual está ligado (alternando entre os switches)."
+        if not self.switches:
+            return {}
+        return {'ap%d' % (i + 1): 's%d' % (i % self.switches + 1)
+                for i in range(self.aps)}
+
+    def complexity(self):
+        "Escalar simples de complexidade: nós + recursos habilitados."
+        return (self.stations + self.aps + self.switches
+                + 3 * self.mobility + 2 * self.dhcp
+                + self.remote_controller)
+
+
+# Os três níveis do artigo expressos como parâmetros
+LEVEL_SCENARIOS = {
+    'basico': Scenario(2, 1, 0, (1,), 30),
+    'intermed': Scenario(4, 2, 1, (1, 6), 30),
+    'avancado': Scenario(6, 2, 1, (1, 11), 40, mobility=True, dhcp=True,
+                         remote_controller=True),
+}
+
+
+def simple_switches(sc):
+    """Switches citados no prompt simples: como em ``p-avanc_simples.txt``,
+    com mobilidade o prompt descreve o roaming e não o backbone cabeado."""
+    return 0 if sc.mobility else sc.switches
+
+
+def simple_prompt(sc):
+    """Prompt generalista, no estilo de ``p-*_simples.txt``; como neles,
+    DHCP, canais, alcance e tipo de controlador ficam de fora."""
+    switches = simple_switches(sc)
+    text = ('Crie um script em Python para o Mininet-WiFi que simule uma '
+            'rede com %s %s, %s %s e um controlador.'
+            % (number(sc.aps), plural(sc.aps, 'ponto de acesso Wi-Fi',
+                                      'pontos de acesso Wi-Fi'),
+               number(sc.stations, True),
+               plural(sc.stations, 'estação sem fio', 'estações sem fio')))
+    if switches:
+        text = text[:-len(' e um controlador.')] + (
+            ', %s %s e um controlador.'
+            % (number(switches), plural(switches, 'switch', 'switches')))
+    if sc.aps > 1:
+        text += (' As estações devem estar distribuídas entre os pontos de '
+                 'acesso')
+        text += ', que devem estar interligados por ' + (
+            'um switch central.' if switches == 1
+            else 'switches.') if switches else '.'
+    if sc.mobility:
+        text += (' As estações devem poder se mover entre as áreas de '
+                 'cobertura, mantendo a comunicação.')
+    if sc.aps == 1 or not sc.mobility:
+        text += (' As estações devem estar conectadas via Wi-Fi e '
+                 'conseguir se comunicar entre si.')
+    return text
+
+
+def detailed_prompt(sc):
+    "Prompt detalhado, no estilo de ``p-*_especifico.txt``."
+    aps = '%s %s (%s)' % (number(sc.aps), plural(
+        sc.aps, 'ponto de acesso Wi-Fi', 'pontos de acesso Wi-Fi'),
+        names_text('ap', sc.aps))
+    stas = '%s %s (%s)' % (number(sc.stations, True), plural(
+        sc.stations, 'estação sem fio', 'estações sem fio'),
+        names_text('sta', sc.stations))
+    parts = [aps, stas]
+    if sc.switches:
+        parts.append('%s %s (%s)' % (number(sc.switches), plural(
+            sc.switches, 'switch', 'switches'), names_text('s', sc.switches)))
+    parts.append('um controlador SDN %s (c0)'
+                 % ('remoto' if sc.remote_controller else 'padrão'))
+    text = ('Gere um código completo em Python para o Mininet-WiFi que '
+            'construa uma topologia composta por %s.' % enumerate_text(parts))
+    if sc.switches == 1:
+        text += (' Cada ponto de acesso deve estar conectado ao switch '
+                 'central (s1).')
+    elif sc.switches > 1:
+        groups = {}
+        for ap, sw in sc.ap_switch().items():
+            groups.setdefault(sw, []).append(ap)
+        text += ' Conecte %s, e interligue os switches em sequência.' % \
+            enumerate_text('%s ao switch %s' % (enumerate_text(a), sw)
+                           for sw, a in groups.items())
+    if sc.aps > 1:
+        served = {}
+        for sta, ap in sc.association().items():
+            served.setdefault(ap, []).append(sta)
+        text += (' As estações devem ser associadas de forma equilibrada: '
+                 '%s.' % enumerate_text(
+                     '%s atende %s' % (ap, enumerate_text(s))
+                     for ap, s in served.items()))
+    channels = sc.ap_channels()
+    if sc.aps == 1:
+        text += (' O ponto de acesso deve operar no canal %d, com alcance '
+                 'de %d metros.' % (channels['ap1'], sc.range))
+    else:
+        text += (' Configure os APs nos canais %s, respectivamente, e '
+                 'defina alcance de %d metros.'
+                 % (enumerate_text(channels.values()), sc.range))
+    if sc.dhcp:
+        text += ' As estações devem receber endereços IP automáticos.'
+    if sc.mobility:
+        text += (' A rede deve suportar mobilidade, utilizando o recurso '
+                 'net.mobility() para definir posições iniciais e finais '
+                 'com tempos distintos de início e parada.')
+    calls = ['addStation', 'addAccessPoint']
+    if sc.switches:
+        calls.append('addSwitch')
+    calls.append('addController')
+    text += (' Inclua todas as importações necessárias, a configuração dos '
+             'nós (%s), a chamada net.configureWifiNodes() para aplicar as '
+             'configurações sem fio e a interligação entre todos os '
+             'componentes.' % ', '.join(calls))
+    return text
+
+
+def requirements(sc, prompt_type='d'):
+    """Requisitos verificáveis do cenário.
+
+    O prompt simples não cita canais, alcance, DHCP nem o tipo de
+    controlador (nem os switches, com mobilidade), e a mobilidade pode
+    ser feita por qualquer mecanismo; esses itens só são exigidos para o
+    prompt detalhado (``'d'``)."""
+    detailed = prompt_type == 'd'
+    switches = sc.switches if detailed else simple_switches(sc)
+    req = {
+        'cenario': asdict(sc),
+        'slug': sc.slug,
+        'complexidade': sc.complexity(),
+        'estacoes': ['sta%d' % (i + 1) for i in range(sc.stations)],
+        'aps': ['ap%d' % (i + 1) for i in range(sc.aps)],
+        'switches': ['s%d' % (i + 1) for i in range(switches)],
+        'tipo': prompt_type,
+        'controlador': ('RemoteController'
+                        if sc.remote_controller and detailed else None),
+        'canais': sc.ap_channels() if detailed else {},
+        'alcance': sc.range if detailed else None,
+        'associacao': sc.association(),
+        'links_ap_switch': sc.ap_switch() if switches else {},
+        'mobilidade': sc.mobility,
+        'dhcp': sc.dhcp and detailed,
+        'chamadas': ['configureWifiNodes', 'addController'],
+    }
+    req['cenario']['channels'] = list(sc.channels)
+    if sc.mobility:
+        req['chamadas'].append(
+            'mobility' if detailed
+            else 'mobility|setMobilityModel|startMobility')
+    return req
+
+
+@dataclass
+class _Facts:
+    nodes: dict = field(default_factory=dict)
+    calls: set = field(default_factory=set)
+    links: set = field(default_factory=set)
+    names: set = field(default_factory=set)
+    looped: set = field(default_factory=set)
+    text: str = ''
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def _facts(source):
+    tree = ast.parse(source)
+    facts = _Facts(text=source)
+    var_names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            facts.names.add(node.id)
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        attr = func.attr if isinstance(func, ast.Attribute) else \
+            getattr(func, 'id', None)
+        if attr is None:
+            continue
+        facts.calls.add(attr)
+        if attr.startswith('add') and node.args and attr != 'addLink':
+            name = _literal(node.args[0])
+            if isinstance(name, str):
+                kwargs = {kw.arg: _literal(kw.value) for kw in node.keywords
+                          if kw.arg}
+                facts.nodes[name] = (attr, kwargs)
+    # Nós criados dentro de laços não têm nomes literais verificáveis
+    for loop in ast.walk(tree):
+        if isinstance(loop, (ast.For, ast.While, ast.comprehension)):
+            for node in ast.walk(loop):
+                if (isinstance(node, ast.Call)
+                        and isinstance(node.func, ast.Attribute)):
+                    facts.looped.add(node.func.attr)
+    # Variáveis atribuídas a partir de add*('nome') -> nome
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Call) and node.value.args):
+            name = _literal(node.value.args[0])
+            if isinstance(name, str):
+                var_names[node.targets[0].id] = name
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == 'addLink' and len(node.args) >= 2):
+            ends = [var_names.get(getattr(a, 'id', None)) for a in
+                    node.args[:2]]
+            if all(ends):
+                facts.links.add(frozenset(ends))
+    return facts
+
+
+def check_requirements(source, req):
+    """Requisitos não atendidos pelo script (lista de mensagens).
+
+    A verificação é estática e conservadora: posições e associações
+    definidas em laços não são reconhecidas como faltantes."""
+    try:
+        facts = _facts(source)
+    except SyntaxError as exc:
+        return ['script não compila: %s' % exc.msg]
+    missing = []
+    for kind, call in (('estacoes', 'addStation'), ('aps', 'addAccessPoint'),
+                       ('switches', 'addSwitch')):
+        if call in facts.looped:
+            continue
+        for name in req[kind]:
+            if name not in facts.nodes:
+                missing.append('nó ausente: %s' % name)
+    for ap, channel in req['canais'].items():
+        kwargs = facts.nodes.get(ap, (None, {}))[1]
+        if 'channel' in kwargs and str(kwargs['channel']) != str(channel):
+            missing.append('%s no canal %s (esperado %s)'
+                           % (ap, kwargs['channel'], channel))
+    for ap, sw in req['links_ap_switch'].items():
+        if frozenset((ap, sw)) not in facts.links and facts.links:
+            missing.append('link ausente: %s-%s' % (ap, sw))
+    for alternatives in req['chamadas']:
+        if not facts.calls.intersection(alternatives.split('|')):
+            missing.append('chamada ausente: %s()' % alternatives)
+    if req['controlador'] and req['controlador'] not in facts.names:
+        missing.append('controlador %s não utilizado' % req['controlador'])
+    if req['dhcp'] and not re.search(r'dhclient|dhcp|dnsmasq', facts.text,
+                                     re.IGNORECASE):
+        missing.append('configuração de IP automático ausente')
+    return missing
+
+
+def write_scenario(sc, directory):
+    """Grava ``p-<slug>_<tipo>.txt`` e os requisitos ``r-<slug>_<tipo>.json``
+    de cada tipo de prompt; devolve os caminhos."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for prompt_type, builder in (('s', simple_prompt), ('d', detailed_prompt)):
+        name = '%s_%s' % (sc.slug, cenarios.PROMPT_TYPES[prompt_type])
+        path = os.path.join(directory, 'p-%s.txt' % name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(builder(sc))
+        req_path = os.path.join(directory, 'r-%s.json' % name)
+        with open(req_path, 'w', encoding='utf-8') as f:
+            json.dump(requirements(sc, prompt_type), f, indent=2,
+                      ensure_ascii=False)
+        paths.extend((path, req_path))
+    return paths
+
+
+def discover(directory):
+    "Slugs dos cenários gravados em ``directory``."
+    found = []
+    for name in sorted(os.listdir(directory)):
+        m = re.match(r'^r-(.+)_especifico\.json$', name)
+        if m:
+            found.append(m.group(1))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.parametrico',
+        description='Gera prompts e requisitos de cenários paramétricos.')
+    parser.add_argument('--estacoes', type=int, nargs='+', default=[2])
+    parser.add_argument('--aps', type=int, nargs='+', default=[1])
+    parser.add_argument('--switches', type=int, nargs='+', default=[0])
+    parser.add_argument('--canais', type=int, nargs='+',
+                        default=list(DEFAULT_CHANNELS))
+    parser.add_argument('--alcance', type=int, default=30)
+    parser.add_argument('--mobilidade', choices=('nao', 'sim', 'ambos'),
+                        default='nao')
+    parser.add_argument('--dhcp', choices=('nao', 'sim', 'ambos'),
+                        default='nao')
+    parser.add_argument('--remoto', action='store_true',
+                        help='controlador SDN remoto')
+    parser.add_argument('--saida', default='.')
+    parser.add_argument('--verificar', nargs=2, metavar=('SCRIPT', 'JSON'),
+                        help='confere um script contra os requisitos '
+                             '(r-<slug>_<tipo>.json)')
+    args = parser.parse_args(argv)
+    if args.verificar:
+        script, req_path = args.verificar
+        with open(req_path, encoding='utf-8') as f:
+            missing = check_requirements(cenarios.read_text(script),
+                                         json.load(f))
+        for item in missing:
+            print(item)
+        return 1 if missing else 0
+    flags = {'nao': (False,), 'sim': (True,), 'ambos': (False, True)}
+    for n, m, s, mob, dhcp in itertools.product(
+            args.estacoes, args.aps, args.switches, flags[args.mobilidade],
+            flags[args.dhcp]):
+        if m > n:
+            continue
+        sc = Scenario(n, m, s, args.canais, args.alcance, mob, dhcp,
+                      args.remoto)
+        write_scenario(sc, args.saida)
+        print('%s (complexidade %d)' % (sc.slug, sc.complexity()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
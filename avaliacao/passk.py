@@ -0,0 +1,238 @@
+"""
+Amostragem múltipla por célula com estimativa de pass@k.
+
+Com uma única amostra por (modelo, nível, tipo de prompt) não é
+possível distinguir um modelo com sorte de um consistentemente bom.
+Aqui cada célula recebe até ``n_max`` gerações, validadas pela
+verificação estática e pela execução simulada. O pass@k usa o
+estimador não enviesado de Chen et al. (2021) e o intervalo de
+confiança vem do intervalo de Wilson da taxa de acerto por amostra.
+
+A amostragem é feita em lotes e para assim que o intervalo de pass@1
+fica mais estreito que ``width``: células decisivas (quase sempre
+acertam ou quase sempre erram) encerram cedo, e o custo cai na mesma
+proporção.
+
+Falhas de infraestrutura (servidor fora do ar, tempo limite) não são
+amostras: ficam fora de ``n`` e ``c``, são contadas à parte e a geração
+é repetida; depois de ``n_max`` delas a célula é interrompida sem
+estimativa, em vez de parecer decidida com pass@k = 0.
+
+Exemplo::
+
+    python3 -m avaliacao.passk --modelo gpt-oss:20b --k 1 5 --max 20
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from statistics import NormalDist
+
+from avaliacao import catalogo, cenarios
+from avaliacao.geracao import (DEFAULT_HOST, BatchGenerator, GenerationError,
+                               Job, OllamaClient, extract_code, write_atomic)
+from avaliacao.reparo import validate
+
+log = logging.getLogger(__name__)
+
+
+def pass_at_k(n, c, k):
+    """Estimador não enviesado ``1 - C(n-c, k) / C(n, k)``.
+
+    Calculado como produto para evitar coeficientes binomiais enormes."""
+    if k > n:
+        raise ValueError('k (%d) maior que n (%d)' % (k, n))
+    if n - c < k:
+        return 1.0
+    prod = 1.0
+    for i in range(n - c + 1, n + 1):
+        prod *= 1.0 - k / i
+    return 1.0 - prod
+
+
+def wilson(c, n, confidence=0.95):
+    "Intervalo de Wilson para a proporção ``c / n``."
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = c / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def pass_at_k_interval(c, n, k, confidence=0.95):
+    """Intervalo de pass@k a partir do intervalo de Wilson de pass@1.
+
+    ``1 - (1 - p)^k`` é monótona em ``p``, então os limites são
+    transformados diretamente."""
+    low, high = wilson(c, n, confidence)
+    return 1 - (1 - low) ** k, 1 - (1 - high) ** k
+
+
+@dataclass
+class Cell:
+    "Estado da amostragem de uma célula."
+    model: str
+    level: str
+    prompt_type: str
+    outcomes: list = field(default_factory=list)
+    stopped_early: bool = False
+    # Gerações que falharam por infraestrutura (fora de ``n`` e ``c``)
+    errors: int = 0
+    aborted: bool = False
+
+    @property
+    def n(self):
+        return len(self.outcomes)
+
+    @property
+    def c(self):
+        return sum(o == 'ok' for o in self.outcomes)
+
+    def estimates(self, ks, confidence=0.95):
+        result = {}
+        for k in ks:
+            if k > self.n:
+                continue
+            low, high = pass_at_k_interval(self.c, self.n, k, confidence)
+            result['pass@%d' % k] = {
+                'estimativa': pass_at_k(self.n, self.c, k),
+                'ic': [low, high],
+            }
+        return result
+
+
+class PassAtKSampler:
+    """Amostra as células em lotes até o intervalo ficar estreito.
+
+    As gerações de todas as células compartilham o limite de
+    concorrência do ``BatchGenerator``."""
+
+    def __init__(self, generator, n_min=3, n_max=20, batch=2, width=0.3,
+                 confidence=0.95, version=catalogo.DEFAULT_VERSION):
+        self.generator = generator
+        self.n_min = n_min
+        self.n_max = n_max
+        self.batch = batch
+        self.width = width
+        self.confidence = confidence
+        self.version = version
+        self._pool = None
+
+    def _sample(self, cell, index, options):
+        job = Job(cell.level, cell.prompt_type, cell.model, sample=index,
+                  options=dict(options))
+        try:
+            completion = self.generator.complete(job, job.messages())
+        except GenerationError as exc:
+            log.error('*** %s: %s', job.path(self.generator.out_root), exc)
+            return None
+        code = extract_code(completion.text)
+        write_atomic(job.path(self.generator.out_root), code)
+        outcome, _ = validate(code, self.version)
+        return outcome
+
+    def tight(self, cell):
+        "Critério de parada: intervalo de pass@1 mais estreito que ``width``."
+        low, high = wilson(cell.c, cell.n, self.confidence)
+        return cell.n >= self.n_min and high - low <= self.width
+
+    def run_cell(self, cell, options=None):
+        while cell.n < self.n_max:
+            if cell.errors >= self.n_max:
+                cell.aborted = True
+                break
+            size = min(self.batch, self.n_max - cell.n)
+            if cell.n < self.n_min:
+                size = max(size, self.n_min - cell.n)
+            # Índices novos: os de gerações com erro não são reutilizados
+            start = cell.n + cell.errors + 1
+            futures = [self._pool.submit(self._sample, cell, start + i,
+                                         options or {})
+                       for i in range(size)]
+            for future in futures:
+                outcome = future.result()
+                if outcome is None:
+                    cell.errors += 1
+                else:
+                    cell.outcomes.append(outcome)
+            if self.tight(cell):
+                cell.stopped_early = cell.n < self.n_max
+                break
+        log.info('*** %s %s/%s: %d/%d ok%s', cell.model, cell.level,
+                 cell.prompt_type, cell.c, cell.n,
+                 ' (%d erros de geração%s)' % (
+                     cell.errors, ', interrompida' if cell.aborted else '')
+                 if cell.errors else '')
+        return cell
+
+    def run(self, cells, options=None):
+        with ThreadPoolExecutor(
+                max_workers=self.generator.concurrency) as self._pool:
+            with ThreadPoolExecutor(max_workers=len(cells) or 1) as outer:
+                return list(outer.map(
+                    lambda cell: self.run_cell(cell, options), cells))
+
+
+def report(cells, ks, confidence=0.95, n_max=None):
+    "Resumo serializável das células e da economia de amostras."
+    rows = []
+    for cell in cells:
+        row = {k: v for k, v in asdict(cell).items() if k != 'outcomes'}
+        row.update(n=cell.n, c=cell.c, resultados=cell.outcomes,
+                   **cell.estimates(ks, confidence))
+        rows.append(row)
+    total = sum(cell.n for cell in cells)
+    # Células interrompidas por falhas de infraestrutura não economizam
+    budget = (n_max or 0) * sum(not cell.aborted for cell in cells)
+    return {'celulas': rows, 'amostras': total,
+            'economia': 1 - total / budget if budget else 0.0}
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.passk',
+        description='Estima pass@k por célula com parada antecipada.')
+    parser.add_argument('--modelo', action='append', required=True)
+    parser.add_argument('--niveis', nargs='+', choices=list(cenarios.LEVELS),
+                        default=list(cenarios.LEVELS))
+    parser.add_argument('--tipos', nargs='+',
+                        choices=list(cenarios.PROMPT_TYPES),
+                        default=list(cenarios.PROMPT_TYPES))
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--min', type=int, default=3)
+    parser.add_argument('--max', type=int, default=20)
+    parser.add_argument('--lote', type=int, default=2)
+    parser.add_argument('--largura', type=float, default=0.3,
+                        help='largura máxima do intervalo de pass@1')
+    parser.add_argument('--confianca', type=float, default=0.95)
+    parser.add_argument('--temperatura', type=float, default=0.8)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--concorrencia', type=int, default=2)
+    parser.add_argument('--versao', default=catalogo.DEFAULT_VERSION)
+    parser.add_argument('--saida', required=True,
+                        help='diretório das amostras geradas')
+    args = parser.parse_args(argv)
+    generator = BatchGenerator(OllamaClient(args.host, timeout=args.timeout),
+                               args.saida, args.concorrencia, overwrite=True)
+    sampler = PassAtKSampler(generator, args.min, args.max, args.lote,
+                             args.largura, args.confianca, args.versao)
+    cells = [Cell(model, level, prompt_type)
+             for model in args.modelo for level in args.niveis
+             for prompt_type in args.tipos]
+    sampler.run(cells, {'temperature': args.temperatura})
+    print(json.dumps(report(cells, args.k, args.confianca, args.max),
+                     indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Gerência de processos restrita a uma execução.
+
+Os scripts do deepseek rodam ``sta1.cmd('pkill -f iperf')``, que mata
+todos os iperf do host, inclusive os de outros scripts executando em
+paralelo. Com os ganchos de ``avaliacao.ganchos``, ``pkill`` e
+``killall`` chamados por ``node.cmd``, ``os.system`` ou ``subprocess``
+são desviados para este módulo, que aplica a mesma semântica apenas aos
+processos da execução:
+
+* descendentes do processo do script (shells dos nós, comandos com
+  ``&``);
+* processos registrados por ``node.cmd(... &)`` e seus descendentes
+  (também os que se desligam do pai, como ``hostapd -B``);
+* processos nos namespaces de rede próprios dos nós da execução;
+* processos da sessão do script, quando ela é exclusiva da execução
+  (``avaliacao.execucao`` abre uma sessão por script), o que inclui
+  processos órfãos de ``os.system('cmd &')``.
+
+O registro (nós, pid do shell, namespace e pids em segundo plano) é um
+JSON indicado por ``AVALIACAO_PROCESSOS``; o pid do script fica em
+``AVALIACAO_RAIZ`` e a sessão exclusiva em ``AVALIACAO_SESSAO``.
+"""
+
+import json
+import os
+import re
+import shlex
+import signal
+import sys
+
+ROOT_ENV = 'AVALIACAO_RAIZ'
+REGISTRY_ENV = 'AVALIACAO_PROCESSOS'
+SESSION_ENV = 'AVALIACAO_SESSAO'
+
+KILL_COMMANDS = ('pkill', 'killall')
+COMMAND_RE = re.compile(
+    r'(?<![\w/.-])(?:/usr/bin/|/bin/|/usr/sbin/|/sbin/)?(pkill|killall)'
+    r'(?=\s|$)')
+
+
+class Registry:
+    "Nós e processos em segundo plano de uma execução."
+
+    def __init__(self, path=None):
+        self.path = path
+        self.nodes = {}
+
+    def add_node(self, name, pid):
+        if name in self.nodes or not pid:
+            return
+        self.nodes[name] = {'pid': pid, 'ns': _netns(pid), 'processos': []}
+        self.save()
+
+    def track(self, name, pid):
+        node = self.nodes.get(name)
+        if node is not None and pid not in node['processos']:
+            node['processos'].append(pid)
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.nodes, f)
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path):
+        registry = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                registry.nodes = json.load(f)
+        except (OSError, ValueError, TypeError):
+            pass
+        return registry
+
+
+def helper(name):
+    """Argumentos que substituem ``pkill``/``killall``; o ambiente vai
+    explícito porque ``sudo`` dentro do script o descartaria."""
+    environment = ['%s=%s' % (key, os.environ[key])
+                   for key in ('PYTHONPATH', ROOT_ENV, REGISTRY_ENV,
+                               SESSION_ENV) if os.environ.get(key)]
+    return (['env'] + environment +
+            [sys.executable, '-m', 'avaliacao.processos', name])
+
+
+def rewrite(command):
+    "Desvia ``pkill``/``killall`` de um comando de shell."
+    return COMMAND_RE.sub(
+        lambda m: ' '.join(shlex.quote(a) for a in helper(m.group(1))),
+        command)
+
+
+def rewrite_args(args):
+    "Desvia ``pkill``/``killall`` em argumentos de ``subprocess``."
+    if isinstance(args, (str, bytes)):
+        return rewrite(args) if isinstance(args, str) else args
+    args = list(args)
+    if args and os.path.basename(str(args[0])) in KILL_COMMANDS:
+        return helper(os.path.basename(str(args[0]))) + args[1:]
+    return args
+
+
+def _netns(pid):
+    try:
+        return os.readlink('/proc/%d/ns/net' % pid)
+    except OSError:
+        return None
+
+
+def _process_table():
+    "``{pid: (ppid, comm, cmdline, sessao)}`` de todos os processos."
+    table = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        try:
+            with open('/proc/%d/stat' % pid) as f:
+                stat = f.read()
+            with open('/proc/%d/cmdline' % pid, 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(
+                    errors='replace').strip()
+        except OSError:
+            continue
+        comm = stat[stat.index('(') + 1:stat.rindex(')')]
+        fields = stat[stat.rindex(')') + 2:].split()
+        table[pid] = (int(fields[1]), comm, cmdline, int(fields[3]))
+    return table
+
+
+class Scope:
+    "Processos que pertencem à execução."
+
+    def __init__(self, root, registry, table, session=0):
+        self.table = table
+        self.session = session
+        self.roots = {root} if root else set()
+        self.namespaces = set()
+        # Nós no namespace do próprio script (APs, switches) não têm
+        # namespace próprio
+        host_ns = _netns(root or os.getpid())
+        for node in registry.nodes.values():
+            self.roots.add(node['pid'])
+            self.roots.update(node['processos'])
+            if node['ns'] and node['ns'] != host_ns:
+                self.namespaces.add(node['ns'])
+        # O próprio auxiliar e seus ancestrais nunca são alvos
+        self.excluded = set()
+        pid = os.getpid()
+        while pid in table and pid not in self.excluded:
+            self.excluded.add(pid)
+            pid = table[pid][0]
+
+    @classmethod
+    def from_environment(cls):
+        root = int(os.environ.get(ROOT_ENV, '0') or 0)
+        registry = Registry.load(os.environ.get(REGISTRY_ENV, ''))
+        session = int(os.environ.get(SESSION_ENV, '0') or 0)
+        return cls(root, registry, _process_table(),
+                   session if session > 1 else 0)
+
+    def __contains__(self, pid):
+        if pid in self.excluded or pid not in self.table:
+            return False
+        if self.session and self.table[pid][3] == self.session:
+            return True
+        current, seen = pid, 0
+        while current > 1 and seen < 256:
+            if current in self.roots:
+                return True
+            current = self.table.get(current, (0,))[0]
+            seen += 1
+        return bool(self.namespaces) and _netns(pid) in self.namespaces
+
+
+def _signal(name):
+    name = name.upper()
+    if name.isdigit():
+        return int(name)
+    if not name.startswith('SIG'):
+        name = 'SIG' + name
+    return getattr(signal, name)
+
+
+def _signal_flag(flag):
+    "Sinal de uma opção ``-9``/``-KILL``/``-SIGKILL`` (ou ``None``)."
+    try:
+        return _signal(flag)
+    except AttributeError:
+        return None
+
+
+def parse_pkill(argv):
+    """``(sinal, padrao, linha_completa, exato)`` a partir dos argumentos
+    do ``pkill`` (opções sem efeito no escopo são ignoradas)."""
+    sig, full, exact, pattern = signal.SIGTERM, False, False, None
+    args = iter(argv)
+    for arg in args:
+        if arg in ('-f', '--full'):
+            full = True
+        elif arg in ('-x', '--exact'):
+            exact = True
+        elif arg == '--signal':
+            sig = _signal(next(args))
+        elif arg.startswith('--signal='):
+            sig = _signal(arg.split('=', 1)[1])
+        elif arg in ('-u', '-U', '-g', '-G', '-P', '-s', '-t', '--ns',
+                     '--nslist'):
+            next(args, None)
+        elif arg.startswith('-') and len(arg) > 1 and arg != '--':
+            flag = _signal_flag(arg[1:])
+            if flag is not None:
+                sig = flag
+            else:
+                full = full or 'f' in arg
+                exact = exact or 'x' in arg
+        else:
+            pattern = arg
+    return sig, pattern, full, exact
+
+
+def parse_killall(argv):
+    "``(sinal, nomes, silencioso)`` a partir dos argumentos do ``killall``."
+    sig, names, quiet = signal.SIGTERM, [], False
+    args = iter(argv)
+    for arg in args:
+        if arg in ('-s', '--signal'):
+            sig = _signal(next(args))
+        elif arg in ('-q', '--quiet'):
+            quiet = True
+        elif arg.startswith('-') and len(arg) > 1:
+            flag = _signal_flag(arg[1:])
+            if flag is not None:
+                sig = flag
+        else:
+            names.append(arg)
+    return sig, names, quiet
+
+
+def select(scope, matcher):
+    return [pid for pid, (_, comm, cmdline, _) in scope.table.items()
+            if matcher(comm, cmdline) and pid in scope]
+
+
+def kill(pids, sig):
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def pkill(argv, scope):
+    sig, pattern, full, exact = parse_pkill(argv)
+    if pattern is None:
+        print('pkill: nenhum padrão informado', file=sys.stderr)
+        return 2
+    regex = re.compile(pattern)
+
+    def matcher(comm, cmdline):
+        text = cmdline if full and cmdline else comm
+        return (regex.fullmatch(text) if exact else regex.search(text))
+
+    pids = select(scope, matcher)
+    kill(pids, sig)
+    return 0 if pids else 1
+
+
+def killall(argv, scope):
+    sig, names, quiet = parse_killall(argv)
+    status = 0
+    for name in names:
+        pids = select(scope, lambda comm, cmdline: comm == name[:15])
+        kill(pids, sig)
+        if not pids:
+            status = 1
+            if not quiet:
+                print('%s: nenhum processo encontrado' % name,
+                      file=sys.stderr)
+    return status
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in KILL_COMMANDS:
+        print('uso: python3 -m avaliacao.processos pkill|killall ARGS',
+              file=sys.stderr)
+        return 2
+    scope = Scope.from_environment()
+    return (pkill if argv[0] == 'pkill' else killall)(argv[1:], scope)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
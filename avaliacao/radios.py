@@ -0,0 +1,193 @@
+"""
+Alocação de rádios mac80211_hwsim entre execuções simultâneas.
+
+Os rádios do mac80211_hwsim e os nomes do nó raiz (bridges ``ap1``,
+``s1``, interfaces ``ap1-wlan1``, ``s1-eth1``) são globais no host: duas
+execuções ao mesmo tempo disputam os mesmos nomes, o Mininet-WiFi
+escolhe o prefixo dos rádios varrendo os existentes (condição de
+corrida) e, ao terminar, descarrega o módulo sob as demais. Cada
+execução recebe uma vaga com:
+
+* prefixo próprio de rádios (``mn<NN>s``), criados um a um com
+  ``hwsim_mgmt`` sobre o módulo carregado uma só vez pelo pool;
+* prefixo de nomes (``mn<vaga>_``) para APs e switches, que vivem no
+  namespace raiz; estações ficam em namespaces próprios e mantêm os
+  nomes.
+
+Os ganchos (``avaliacao.ganchos``) aplicam a vaga sem alterar o script
+e traduzem de volta os nomes que ele usa: ``net.get('ap1')`` e
+``ap1.cmd('iw dev ap1-wlan1 link')`` chegam a ``mn3_ap1``. A limpeza da
+execução fica restrita ao que é dela (prefixos e sessão do script).
+"""
+
+import fcntl
+import json
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass
+
+from avaliacao import resultados
+
+POOL_DIR = os.path.join(resultados.DEFAULT_DIR, 'radios')
+SLOTS = 16
+# Prefixos altos não colidem com os escolhidos pelo próprio Mininet-WiFi
+PHY_BASE = 50
+
+CONFIG_ENV = 'AVALIACAO_RADIOS'
+
+# Interfaces de nós no namespace raiz (``ap1-wlan1``, ``s1-eth2``)
+INTERFACE_SUFFIX = r'-(?:wlan|eth|mp)\d+'
+ROOT_NODE_RE = re.compile(r'^(?:ap|s)\d+$')
+
+
+def _privileged(command):
+    if os.geteuid() != 0:
+        return ['sudo', '-n'] + command
+    return command
+
+
+def _session(pid):
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            return int(f.read().rsplit(')', 1)[1].split()[4])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+@dataclass
+class Lease:
+    "Vaga de rádios e nomes reservada para uma execução."
+    slot: int
+    phy_prefix: str
+    name_prefix: str
+    lock: object = None
+
+    def config(self, output):
+        "Configuração dos ganchos (``AVALIACAO_RADIOS``)."
+        return json.dumps({'phy': self.phy_prefix, 'nomes': self.name_prefix,
+                           'saida': output})
+
+    def names(self, output):
+        "Nomes traduzidos até agora pelos ganchos (``NameMap`` de ``output``)."
+        names = NameMap(self.name_prefix)
+        try:
+            with open(output, encoding='utf-8') as f:
+                names.names.update(json.load(f).get('nomes', {}))
+        except (OSError, ValueError):
+            pass
+        return names
+
+    def owns_name(self, name):
+        return bool(re.search(r'(?<![a-z0-9])%s' % re.escape(
+            self.name_prefix), name)) or name.startswith(self.phy_prefix)
+
+    def owner(self, session=None):
+        """Critério ``owned(tipo, item)`` de ``limpeza.reap``: nomes com os
+        prefixos da vaga e processos da sessão do script."""
+        def owned(kind, item):
+            if kind == 'processes':
+                return ((session and _session(item[0]) == session)
+                        or self.owns_name(item[2]))
+            if kind == 'qdiscs':
+                return self.owns_name(item.split(':', 1)[0])
+            if kind in ('interfaces', 'bridges', 'datapaths', 'radios'):
+                return self.owns_name(item.rpartition('@')[2])
+            return False
+        return owned
+
+
+class RadioPool:
+    "Vagas de rádios hwsim com o módulo carregado uma só vez."
+
+    def __init__(self, directory=POOL_DIR, slots=SLOTS):
+        self.directory = directory
+        self.slots = slots
+        os.makedirs(directory, exist_ok=True)
+
+    def prepare(self):
+        """Carrega o mac80211_hwsim sem rádios; as execuções criam os seus
+        e nenhuma descarrega o módulo."""
+        if os.path.isdir('/sys/module/mac80211_hwsim'):
+            return
+        try:
+            out = subprocess.run(
+                _privileged(['modprobe', 'mac80211_hwsim', 'radios=0']),
+                capture_output=True, text=True)
+        except OSError as exc:
+            raise RuntimeError('modprobe indisponível: %s' % exc)
+        if out.returncode != 0:
+            raise RuntimeError('modprobe mac80211_hwsim falhou: %s'
+                               % out.stderr.strip())
+
+    def lease(self):
+        "Reserva uma vaga livre (trava de arquivo, válida entre processos)."
+        while True:
+            for slot in range(self.slots):
+                lock = open(os.path.join(self.directory,
+                                         'vaga-%02d.trava' % slot), 'w')
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock.close()
+                    continue
+                return Lease(slot, 'mn%02ds' % (PHY_BASE + slot),
+                             'mn%d_' % slot, lock)
+            time.sleep(0.2)
+
+    def release(self, lease):
+        if lease.lock:
+            lease.lock.close()
+            lease.lock = None
+
+
+def attach(record, lease, output):
+    "Vaga, rádios criados e nomes traduzidos no ``RunRecord``."
+    try:
+        with open(output, encoding='utf-8') as f:
+            created = json.load(f)
+    except (OSError, ValueError):
+        created = {}
+    record.extra['radios'] = {
+        'vaga': lease.slot, 'prefixo_phy': lease.phy_prefix,
+        'prefixo_nomes': lease.name_prefix,
+        'radios': created.get('radios', []),
+        'nomes': created.get('nomes', {})}
+
+
+class NameMap:
+    "Nomes do script -> nomes com o prefixo da vaga."
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.names = {}
+        self._pattern = None
+
+    def add(self, name):
+        if not ROOT_NODE_RE.match(name):
+            return name
+        self.names[name] = self.prefix + name
+        self._pattern = None
+        return self.names[name]
+
+    def node(self, name):
+        return self.names.get(name, name)
+
+    def rewrite(self, command):
+        "Troca nomes e interfaces de nós renomeados num comando."
+        if not self.names:
+            return command
+        if self._pattern is None:
+            names = sorted(self.names, key=len, reverse=True)
+            self._pattern = re.compile(
+                r'(?<![\w./-])(%s)(?=(?:%s)?(?![\w./-]))'
+                % ('|'.join(map(re.escape, names)), INTERFACE_SUFFIX))
+        return self._pattern.sub(lambda m: self.names[m.group(1)], command)
+
+
+def default_dpid(name):
+    """DPID que o Mininet derivaria do nome original (o primeiro número do
+    nome prefixado seria o da vaga)."""
+    digits = re.findall(r'\d+', name)
+    return '%016x' % int(digits[0]) if digits else None
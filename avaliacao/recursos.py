@@ -0,0 +1,277 @@
+"""
+Consumo de recursos por nó durante as execuções.
+
+Uma thread amostra o ``/proc`` a intervalos fixos e atribui cada
+processo ao nó do Mininet-WiFi (ou ao serviço) dono dele:
+
+1. pelos ancestrais: o shell de cada nó é ``bash ... mininet:<nó>``;
+2. pela linha de comando: o hostapd e o wpa_supplicant citam a
+   interface do nó (``ap1-wlan1``, ``sta2-wlan0``);
+3. pelo namespace de rede (inode de ``/proc/<pid>/ns/net``) de um nó;
+4. pelo nome do serviço (``ovs-vswitchd``, ``wmediumd``, ``dnsmasq``...).
+
+Para cada nó, cada amostra guarda CPU (s), RSS (bytes), trocas de
+contexto, descritores abertos e número de processos num buffer circular
+compacto (``array``). O resumo por nó vai para o registro da execução
+(``avaliacao.execucao --recursos``).
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+
+PROC = '/proc'
+HZ = os.sysconf('SC_CLK_TCK')
+PAGE = os.sysconf('SC_PAGE_SIZE')
+
+FIELDS = ('cpu', 'rss', 'trocas', 'fds', 'processos')
+
+NODE_SHELL_RE = re.compile(r'mininet:([\w.-]+)')
+INTERFACE_RE = re.compile(
+    r'(?<![a-z0-9])((?:sta|ap|car|h|s|r)\d+)-(?:wlan|eth|mp)\d+')
+
+# Serviços da emulação sem nó próprio
+SERVICES = ('ovs-vswitchd', 'ovsdb-server', 'wmediumd', 'hostapd',
+            'wpa_supplicant', 'dnsmasq', 'ovs-testcontroller', 'controller')
+
+
+class RingBuffer:
+    "Buffer circular de amostras com ``len(FIELDS)`` valores cada."
+
+    def __init__(self, capacity, width=len(FIELDS)):
+        self.capacity = capacity
+        self.width = width
+        self.data = array('d', bytes(8 * capacity * width))
+        self.count = 0
+
+    def append(self, values):
+        start = (self.count % self.capacity) * self.width
+        self.data[start:start + self.width] = array('d', values)
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def rows(self):
+        "Amostras da mais antiga para a mais recente."
+        n = len(self)
+        first = self.count - n
+        for i in range(first, self.count):
+            start = (i % self.capacity) * self.width
+            yield self.data[start:start + self.width]
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode(errors='replace')
+    except OSError:
+        return None
+
+
+def _stat(pid):
+    "``(comm, ppid, cpu_s, rss_bytes)`` de ``/proc/<pid>/stat``."
+    text = _read('%s/%d/stat' % (PROC, pid))
+    if not text:
+        return None
+    comm = text[text.index('(') + 1:text.rindex(')')]
+    parts = text[text.rindex(')') + 2:].split()
+    return (comm, int(parts[1]), (int(parts[11]) + int(parts[12])) / HZ,
+            int(parts[21]) * PAGE)
+
+
+def _switches(pid):
+    "Trocas de contexto voluntárias + involuntárias."
+    text = _read('%s/%d/status' % (PROC, pid)) or ''
+    return sum(int(line.split()[1]) for line in text.splitlines()
+               if line.startswith(('voluntary_ctxt_switches',
+                                   'nonvoluntary_ctxt_switches')))
+
+
+def _fds(pid):
+    try:
+        return len(os.listdir('%s/%d/fd' % (PROC, pid)))
+    except OSError:
+        return 0
+
+
+def _netns(pid):
+    try:
+        return os.readlink('%s/%d/ns/net' % (PROC, pid))
+    except OSError:
+        return None
+
+
+class ResourceSampler:
+    "Amostrador em segundo plano (use como gerenciador de contexto)."
+
+    def __init__(self, interval=0.5, capacity=7200):
+        self.interval = interval
+        self.capacity = capacity
+        self.buffers = {}
+        self.owners = {}
+        # Últimos contadores acumulados de cada pid: (cpu, trocas)
+        self.last = {}
+        self.namespaces = {}
+        self.root_ns = _netns(1)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.samples = 0
+        self.overhead = 0.0
+
+    def _owner(self, pid, stats):
+        "Nó ou serviço dono do processo (``None`` se não é da emulação)."
+        if pid in self.owners:
+            return self.owners[pid]
+        owner = None
+        cmdline = (_read('%s/%d/cmdline' % (PROC, pid)) or '').replace(
+            '\0', ' ')
+        match = NODE_SHELL_RE.search(cmdline)
+        if match:
+            owner = match.group(1)
+        if owner is None:
+            # Ancestral mais próximo que seja shell de nó
+            parent, seen = stats[pid][1], 0
+            while parent > 1 and parent in stats and seen < 64:
+                found = self.owners.get(parent)
+                if found is None:
+                    text = (_read('%s/%d/cmdline' % (PROC, parent)) or '')
+                    m = NODE_SHELL_RE.search(text.replace('\0', ' '))
+                    found = m.group(1) if m else None
+                if found and not found.startswith('servico:'):
+                    owner = found
+                    break
+                parent, seen = stats[parent][1], seen + 1
+        if owner is None:
+            match = INTERFACE_RE.search(cmdline)
+            if match:
+                owner = match.group(1)
+        if owner is None:
+            ns = _netns(pid)
+            if ns and ns != self.root_ns:
+                owner = self.namespaces.get(ns)
+        if owner is None and stats[pid][0] in SERVICES:
+            owner = 'servico:' + stats[pid][0]
+        self.owners[pid] = owner
+        return owner
+
+    def sample(self):
+        "Uma amostra de todos os processos da emulação."
+        start = time.perf_counter()
+        stats = {}
+        for name in os.listdir(PROC):
+            if name.isdigit():
+                found = _stat(int(name))
+                if found:
+                    stats[int(name)] = found
+        # Namespaces dos shells de nó (para processos sem ancestral)
+        self.namespaces = {}
+        for pid, owner in list(self.owners.items()):
+            if pid in stats and owner and not owner.startswith('servico:'):
+                ns = _netns(pid)
+                if ns and ns != self.root_ns:
+                    self.namespaces.setdefault(ns, owner)
+        totals = {}
+        for pid in stats:
+            owner = self._owner(pid, stats)
+            if owner is None:
+                continue
+            _, _, cpu, rss = stats[pid]
+            switches = _switches(pid)
+            # Processos já existentes na primeira amostra só fixam a base;
+            # os que surgem depois contam desde o início
+            previous = self.last.get(
+                pid, (0.0, 0) if self.samples else (cpu, switches))
+            self.last[pid] = (cpu, switches)
+            row = totals.setdefault(owner, [0.0, 0, 0, 0, 0])
+            row[0] += cpu - previous[0]
+            row[1] += rss
+            row[2] += switches - previous[1]
+            row[3] += _fds(pid)
+            row[4] += 1
+        for pid in set(self.owners) - set(stats):
+            del self.owners[pid]
+            self.last.pop(pid, None)
+        for owner, row in totals.items():
+            buffer = self.buffers.get(owner)
+            if buffer is None:
+                buffer = self.buffers[owner] = RingBuffer(self.capacity)
+            buffer.append(row)
+        self.samples += 1
+        self.overhead += time.perf_counter() - start
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            self.sample()
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def summary(self):
+        """Resumo por nó: CPU total e média (%), pico de RSS (MB),
+        trocas de contexto, pico de descritores e de processos."""
+        result = {}
+        for owner, buffer in sorted(self.buffers.items()):
+            rows = list(buffer.rows())
+            cpu = sum(r[0] for r in rows)
+            result[owner] = {
+                'cpu_s': round(cpu, 3),
+                'cpu_pct': round(100.0 * cpu / max(
+                    self.interval * len(rows), 1e-9), 1),
+                'rss_max_mb': round(max(r[1] for r in rows) / 2 ** 20, 1),
+                'trocas': int(sum(r[2] for r in rows)),
+                'fds_max': int(max(r[3] for r in rows)),
+                'processos_max': int(max(r[4] for r in rows)),
+                'amostras': len(rows),
+            }
+        return result
+
+    def attach(self, record):
+        "Anexa o resumo ao ``RunRecord`` (extra e métricas por nó)."
+        summary = self.summary()
+        record.extra['recursos'] = summary
+        record.extra['amostrador'] = {
+            'amostras': self.samples, 'intervalo': self.interval,
+            'custo_medio_ms': round(1000 * self.overhead
+                                    / max(self.samples, 1), 2)}
+        for owner, values in summary.items():
+            record.metrics['cpu:%s' % owner] = (values['cpu_s'], 's')
+            record.metrics['rss_max:%s' % owner] = (values['rss_max_mb'],
+                                                    'MB')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.recursos',
+        description='Amostra o consumo de recursos por nó do Mininet-WiFi.')
+    parser.add_argument('--intervalo', type=float, default=0.5)
+    parser.add_argument('--duracao', type=float, default=10)
+    args = parser.parse_args(argv)
+    with ResourceSampler(args.intervalo) as sampler:
+        time.sleep(args.duracao)
+    for owner, values in sampler.summary().items():
+        print('%-24s %s' % (owner, ' '.join('%s=%s' % kv
+                                            for kv in values.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
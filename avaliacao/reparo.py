@@ -0,0 +1,228 @@
+"""
+Ciclo gerar-validar-reparar com o modelo local.
+
+No artigo qualquer ajuste necessário conta como falha e os scripts são
+corrigidos à mão. Aqui, cada script gerado passa pela verificação
+estática e pela execução simulada; os erros encontrados voltam ao
+modelo como um novo turno da conversa, até um número máximo de
+rodadas. Cada rodada registra latência, tokens e resultado, o que
+permite comparar o custo de uma rodada de reparo com o de uma geração
+nova. Os turnos ficam no cache de gerações (``avaliacao.cache``), e uma
+nova execução do ciclo só consulta o modelo nos turnos que mudaram.
+
+Exemplo::
+
+    python3 -m avaliacao.reparo --modelo gpt-oss:20b --rodadas 3 \\
+        --relatorio reparo.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from avaliacao import catalogo, cenarios, estatico, simulacao
+from avaliacao.cache import DEFAULT_PATH, GenerationCache
+from avaliacao.geracao import (DEFAULT_HOST, BatchGenerator, GenerationError,
+                               OllamaClient, extract_code, make_jobs,
+                               write_atomic)
+
+log = logging.getLogger(__name__)
+
+REPAIR_PROMPT = (
+    'O script gerado apresentou os seguintes problemas ao ser validado '
+    'no Mininet-WiFi %s:\n\n%s\n\nCorrija todos os problemas e gere '
+    'novamente o script completo, em um único bloco de código Python, '
+    'pronto para execução.')
+
+
+@dataclass
+class Iteration:
+    "Uma rodada do ciclo (0 = geração inicial)."
+    index: int
+    latency: float
+    prompt_tokens: int
+    eval_tokens: int
+    outcome: str
+    problems: list = field(default_factory=list)
+    cached: bool = False
+
+
+@dataclass
+class RepairReport:
+    "Histórico completo de uma tarefa."
+    level: str
+    prompt_type: str
+    model: str
+    path: str
+    iterations: list = field(default_factory=list)
+    error: str = None
+
+    @property
+    def outcome(self):
+        if self.error:
+            return 'erro'
+        return self.iterations[-1].outcome if self.iterations else 'erro'
+
+    def to_dict(self):
+        data = asdict(self)
+        data['outcome'] = self.outcome
+        return data
+
+
+def validate(code, version=catalogo.DEFAULT_VERSION,
+             timeout=simulacao.DEFAULT_TIMEOUT):
+    """Problemas do script: ``(resultado, [mensagens])``.
+
+    ``resultado`` é ``ok``, ``estatico`` (erros fatais do catálogo) ou
+    ``execucao`` (falha na execução simulada)."""
+    issues = [i for i in estatico.check_source(code, catalogo.load(version))
+              if i.fatal]
+    problems = ['linha %d: %s' % (i.line, i.message) for i in issues]
+    fd, path = tempfile.mkstemp(suffix='.py')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(code)
+    try:
+        run = simulacao.dry_run(path, version, timeout)
+    finally:
+        os.unlink(path)
+    if not run.ok:
+        problems.append('execução: %s' % run.summary())
+    if issues:
+        return 'estatico', problems
+    if not run.ok:
+        return 'execucao', problems
+    return 'ok', problems
+
+
+class RepairLoop:
+    """Executa o ciclo para cada tarefa usando o ``BatchGenerator``
+    (com seu cache) para todos os turnos da conversa."""
+
+    def __init__(self, generator, max_rounds=3,
+                 version=catalogo.DEFAULT_VERSION,
+                 timeout=simulacao.DEFAULT_TIMEOUT):
+        self.generator = generator
+        self.max_rounds = max_rounds
+        self.version = version
+        self.timeout = timeout
+
+    def run(self, job):
+        path = job.path(self.generator.out_root)
+        report = RepairReport(job.level, job.prompt_type, job.model, path)
+        messages = job.messages()
+        code = None
+        for index in range(self.max_rounds + 1):
+            start = time.monotonic()
+            try:
+                completion = self.generator.complete(job, messages)
+            except GenerationError as exc:
+                report.error = str(exc)
+                break
+            latency = time.monotonic() - start
+            code = extract_code(completion.text)
+            outcome, problems = validate(code, self.version, self.timeout)
+            report.iterations.append(Iteration(
+                index, latency, completion.prompt_tokens,
+                completion.eval_tokens, outcome, problems,
+                completion.cached))
+            log.info('*** %s rodada %d: %s', path, index, outcome)
+            if outcome == 'ok':
+                break
+            messages = messages + [
+                {'role': 'assistant', 'content': completion.text},
+                {'role': 'user', 'content': REPAIR_PROMPT % (
+                    self.version, '\n'.join('- ' + p for p in problems))},
+            ]
+        if code is not None:
+            write_atomic(path, code)
+        return report
+
+    def run_all(self, jobs):
+        with ThreadPoolExecutor(
+                max_workers=self.generator.concurrency) as pool:
+            return list(pool.map(self.run, jobs))
+
+
+def summarize(reports):
+    """Custo médio da geração inicial e das rodadas de reparo.
+
+    ``equivalencia`` é quantas rodadas de reparo custam o mesmo que uma
+    geração nova, em latência e em tokens gerados."""
+    first = [r.iterations[0] for r in reports if r.iterations]
+    repairs = [it for r in reports for it in r.iterations[1:]]
+
+    def mean(values):
+        values = list(values)
+        return sum(values) / len(values) if values else 0.0
+
+    summary = {
+        'tarefas': len(reports),
+        'ok_inicial': sum(it.outcome == 'ok' for it in first),
+        'ok_final': sum(r.outcome == 'ok' for r in reports),
+        'rodadas_reparo': len(repairs),
+        'latencia_inicial': mean(it.latency for it in first),
+        'latencia_reparo': mean(it.latency for it in repairs),
+        'tokens_inicial': mean(it.eval_tokens for it in first),
+        'tokens_reparo': mean(it.eval_tokens for it in repairs),
+    }
+    equivalence = {}
+    for key in ('latencia', 'tokens'):
+        repair = summary[key + '_reparo']
+        equivalence[key] = summary[key + '_inicial'] / repair if repair \
+            else None
+    summary['equivalencia'] = equivalence
+    return summary
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.reparo',
+        description='Gera scripts e os repara com base nos erros de '
+                    'validação.')
+    parser.add_argument('--modelo', action='append', required=True)
+    parser.add_argument('--niveis', nargs='+', choices=list(cenarios.LEVELS),
+                        default=list(cenarios.LEVELS))
+    parser.add_argument('--tipos', nargs='+',
+                        choices=list(cenarios.PROMPT_TYPES),
+                        default=list(cenarios.PROMPT_TYPES))
+    parser.add_argument('--rodadas', type=int, default=3,
+                        help='máximo de rodadas de reparo')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--concorrencia', type=int, default=1)
+    parser.add_argument('--versao', default=catalogo.DEFAULT_VERSION)
+    parser.add_argument('--saida', required=True,
+                        help='diretório dos scripts finais')
+    parser.add_argument('--relatorio', metavar='JSONL',
+                        help='grava o histórico de cada tarefa')
+    parser.add_argument('--cache', default=DEFAULT_PATH)
+    parser.add_argument('--cache-max-mb', type=float, default=256)
+    parser.add_argument('--sem-cache', action='store_true')
+    args = parser.parse_args(argv)
+    cache = None
+    if not args.sem_cache:
+        cache = GenerationCache(args.cache,
+                                int(args.cache_max_mb * 1024 * 1024))
+    generator = BatchGenerator(OllamaClient(args.host, timeout=args.timeout),
+                               args.saida, args.concorrencia,
+                               overwrite=True, cache=cache)
+    loop = RepairLoop(generator, args.rodadas, args.versao)
+    reports = loop.run_all(make_jobs(args.modelo, args.niveis, args.tipos))
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as f:
+            for report in reports:
+                f.write(json.dumps(report.to_dict(), ensure_ascii=False)
+                        + '\n')
+    print(json.dumps(summarize(reports), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
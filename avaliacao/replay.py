@@ -0,0 +1,219 @@
+"""
+Servidor HTTP substituto do Ollama que reproduz respostas gravadas.
+
+Permite exercitar ``avaliacao.geracao`` (e medir o lote) sem o modelo
+real. As respostas vêm de um JSONL gravado com ``--gravar`` ou dos
+próprios scripts do repositório, enviadas em streaming no mesmo
+formato de ``/api/chat``. Um atraso por token e falhas nas primeiras
+requisições podem ser simulados para testar timeouts e repetições.
+
+Exemplo::
+
+    python3 -m avaliacao.replay --scripts scripts --porta 11435 &
+    python3 -m avaliacao.geracao --host http://localhost:11435 \\
+        --modelo claud --saida /tmp/saida
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from avaliacao import cenarios
+from avaliacao.geracao import build_messages, messages_key
+
+TOKEN_RE = re.compile(r'\s*\S+|\s+')
+
+
+def load_recording(path):
+    "Lê as entradas de um JSONL gravado por ``avaliacao.geracao``."
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+def entries_from_scripts(root=cenarios.SCRIPTS_DIR):
+    """Transforma os scripts existentes em respostas gravadas.
+
+    A chave ignora o modelo, de modo que qualquer nome de modelo recebe
+    o script correspondente ao nível e tipo do prompt."""
+    entries = []
+    for path in cenarios.generated_scripts(root):
+        level, prompt_type, slug, _ = cenarios.parse_script_path(path)
+        code = cenarios.read_text(path)
+        entries.append({
+            'model': slug, 'level': level, 'prompt_type': prompt_type,
+            'key': messages_key('', build_messages(level, prompt_type)),
+            'response': '```python\n%s```\n' % code,
+        })
+    return entries
+
+
+class Replayer:
+    "Escolhe a resposta para cada conversa recebida."
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        if not self.entries:
+            raise ValueError('nenhuma resposta gravada')
+        self.by_key = {}
+        for entry in self.entries:
+            self.by_key.setdefault(entry['key'], []).append(entry)
+        self._cycle = itertools.cycle(self.entries)
+        self._lock = threading.Lock()
+        self._seen = {}
+
+    def pick(self, model, messages):
+        """Resposta gravada para a conversa; na falta dela, a próxima da
+        fila, para que qualquer prompt receba um script plausível."""
+        for key in (messages_key(model, messages), messages_key('', messages)):
+            candidates = self.by_key.get(key)
+            if candidates:
+                with self._lock:
+                    n = self._seen.get(key, 0)
+                    self._seen[key] = n + 1
+                return candidates[n % len(candidates)]['response']
+        with self._lock:
+            return next(self._cycle)['response']
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, fmt, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path == '/api/tags':
+            models = sorted({e['model'] for e in self.server.replayer.entries})
+            self._json({'models': [
+                {'name': m, 'model': m,
+                 'digest': hashlib.sha256(m.encode('utf-8')).hexdigest()}
+                for m in models]})
+        else:
+            self._json({'error': 'not found'}, 404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        if self.path != '/api/chat':
+            self._json({'error': 'not found'}, 404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        with server.counter_lock:
+            server.requests += 1
+            fail = server.requests <= server.failures
+        model = payload.get('model', '')
+        messages = payload.get('messages', [])
+        text = server.replayer.pick(model, messages)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            self._stream(model, messages, text, fail)
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu da geração, como o Ollama ao cancelar
+            pass
+
+    def _stream(self, model, messages, text, fail):
+        server = self.server
+        tokens = TOKEN_RE.findall(text)
+        start = time.monotonic()
+        for i, token in enumerate(tokens):
+            if fail and i >= len(tokens) // 2:
+                # Encerra a conexão no meio da resposta
+                return
+            if server.delay:
+                time.sleep(server.delay)
+            chunk = {'model': model, 'done': False,
+                     'message': {'role': 'assistant', 'content': token}}
+            self.wfile.write(json.dumps(chunk).encode('utf-8') + b'\n')
+        prompt_chars = sum(len(m.get('content', '')) for m in messages)
+        final = {'model': model, 'done': True, 'done_reason': 'stop',
+                 'message': {'role': 'assistant', 'content': ''},
+                 'prompt_eval_count': prompt_chars // 4,
+                 'eval_count': len(tokens),
+                 'total_duration': int((time.monotonic() - start) * 1e9)}
+        self.wfile.write(json.dumps(final).encode('utf-8') + b'\n')
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Servidor de reprodução; use como gerenciador de contexto para
+    executá-lo em segundo plano durante testes e medições."""
+
+    daemon_threads = True
+
+    def __init__(self, entries, host='127.0.0.1', port=0, delay=0.0,
+                 failures=0):
+        super().__init__((host, port), _Handler)
+        self.replayer = Replayer(entries)
+        self.delay = delay
+        self.failures = failures
+        self.requests = 0
+        self.counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.replay',
+        description='Servidor substituto do Ollama com respostas gravadas.')
+    parser.add_argument('--gravacao', action='append', default=[],
+                        metavar='JSONL')
+    parser.add_argument('--scripts', metavar='DIR',
+                        help='usa os scripts existentes como respostas')
+    parser.add_argument('--porta', type=int, default=11435)
+    parser.add_argument('--atraso', type=float, default=0.0,
+                        help='segundos por token')
+    parser.add_argument('--falhas', type=int, default=0,
+                        help='interrompe as N primeiras respostas')
+    args = parser.parse_args(argv)
+    entries = []
+    for path in args.gravacao:
+        entries.extend(load_recording(path))
+    if args.scripts:
+        entries.extend(entries_from_scripts(os.path.abspath(args.scripts)))
+    server = ReplayServer(entries, port=args.porta, delay=args.atraso,
+                          failures=args.falhas)
+    print('*** Reproduzindo %d respostas em %s' % (len(entries), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
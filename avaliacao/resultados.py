@@ -0,0 +1,361 @@
+"""
+Repositório indexado dos resultados das execuções.
+
+Substitui as planilhas: cada execução (estática, simulada ou real)
+vira um registro com o resultado (rodou / funcional / precisa de
+ajuste / classe de erro), as durações de cada fase, as métricas
+medidas (perda no ``pingAll``, vazão do ``iperf``, ...) e os caminhos
+dos artefatos. O armazenamento é SQLite em modo WAL, com índices por
+modelo, nível, tipo de prompt, versão do Mininet-WiFi e hash do
+script, de modo que tabelas cruzadas sobre milhares de execuções
+respondam em milissegundos. Processos paralelos podem inserir ao
+mesmo tempo, ou gravar JSONL para ingestão posterior.
+
+Exemplo::
+
+    python3 -m avaliacao.resultados validar scripts/*/*.py
+    python3 -m avaliacao.resultados resumo --por model level
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from avaliacao import catalogo, cenarios
+
+DEFAULT_DIR = os.path.join(cenarios.ROOT, '.resultados')
+DEFAULT_PATH = os.path.join(DEFAULT_DIR, 'resultados.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    stage TEXT NOT NULL,
+    model TEXT,
+    level TEXT,
+    prompt_type TEXT,
+    sample INTEGER,
+    script TEXT,
+    script_hash TEXT,
+    mnwifi_version TEXT,
+    ran INTEGER,
+    functional INTEGER,
+    needs_adjustment INTEGER,
+    adjustment TEXT,
+    error_class TEXT,
+    error_cause TEXT,
+    signature TEXT,
+    returncode INTEGER,
+    duration REAL,
+    host TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs(model);
+CREATE INDEX IF NOT EXISTS runs_cell ON runs(model, level, prompt_type);
+CREATE INDEX IF NOT EXISTS runs_level ON runs(level, prompt_type);
+CREATE INDEX IF NOT EXISTS runs_version ON runs(mnwifi_version);
+CREATE INDEX IF NOT EXISTS runs_hash ON runs(script_hash);
+CREATE INDEX IF NOT EXISTS runs_error ON runs(error_class);
+CREATE INDEX IF NOT EXISTS runs_signature ON runs(signature);
+CREATE TABLE IF NOT EXISTS phases (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    start REAL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phases_run ON phases(run);
+CREATE TABLE IF NOT EXISTS metrics (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    value REAL,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run);
+CREATE INDEX IF NOT EXISTS metrics_name ON metrics(name);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run);
+"""
+
+# Colunas de ``runs`` preenchidas a partir do ``RunRecord``
+RUN_COLUMNS = ('run_id', 'created', 'stage', 'model', 'level', 'prompt_type',
+               'sample', 'script', 'script_hash', 'mnwifi_version', 'ran',
+               'functional', 'needs_adjustment', 'adjustment', 'error_class',
+               'error_cause', 'signature', 'returncode', 'duration', 'host',
+               'extra')
+
+# Colunas acrescentadas depois da primeira versão do esquema
+ADDED_COLUMNS = {'signature': 'TEXT'}
+
+# Colunas aceitas em agrupamentos e filtros
+GROUP_COLUMNS = ('stage', 'model', 'level', 'prompt_type', 'mnwifi_version',
+                 'error_class', 'error_cause', 'signature', 'adjustment',
+                 'script_hash', 'host')
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@dataclass
+class RunRecord:
+    """Uma execução de um script em algum estágio da validação.
+
+    ``phases`` é uma lista de ``(nome, inicio, duracao)``, ``metrics`` um
+    dicionário ``nome -> (valor, unidade)`` e ``artifacts`` uma lista de
+    ``(tipo, caminho)``."""
+    stage: str
+    script: str = None
+    model: str = None
+    level: str = None
+    prompt_type: str = None
+    sample: int = None
+    script_hash: str = None
+    mnwifi_version: str = None
+    ran: bool = None
+    functional: bool = None
+    needs_adjustment: bool = None
+    adjustment: str = None
+    error_class: str = None
+    error_cause: str = None
+    signature: str = None
+    returncode: int = None
+    duration: float = None
+    host: str = field(default_factory=socket.gethostname)
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created: float = field(default_factory=time.time)
+    phases: list = field(default_factory=list)
+    metrics: dict = field(default_factory=dict)
+    artifacts: list = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def for_script(cls, stage, path, **kwargs):
+        "Registro com modelo, nível, tipo, amostra e hash do caminho."
+        parsed = cenarios.parse_script_path(path)
+        if parsed:
+            kwargs.setdefault('level', parsed[0])
+            kwargs.setdefault('prompt_type', parsed[1])
+            kwargs.setdefault('model', parsed[2])
+            kwargs.setdefault('sample', parsed[3])
+        return cls(stage, script=os.path.abspath(path),
+                   script_hash=file_hash(path), **kwargs)
+
+    def phase(self, name, start, duration):
+        self.phases.append((name, start, duration))
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class ResultsStore:
+    "Acesso ao banco de resultados; uma instância por processo/thread."
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self.db.executescript(SCHEMA)
+
+    def _migrate(self):
+        "Acrescenta a bancos antigos as colunas novas de ``runs``."
+        columns = {row[1] for row in
+                   self.db.execute('PRAGMA table_info(runs)')}
+        if not columns:
+            return
+        with self.db:
+            for name, kind in ADDED_COLUMNS.items():
+                if name not in columns:
+                    self.db.execute('ALTER TABLE runs ADD COLUMN %s %s'
+                                    % (name, kind))
+
+    def append(self, record):
+        "Insere um registro (e suas fases, métricas e artefatos)."
+        return self.append_many([record])[0]
+
+    def append_many(self, records):
+        "Insere vários registros em uma única transação."
+        ids = []
+        placeholders = ', '.join('?' * len(RUN_COLUMNS))
+        with self.db:
+            for record in records:
+                if isinstance(record, dict):
+                    record = RunRecord(**record)
+                values = [getattr(record, c) for c in RUN_COLUMNS]
+                values[RUN_COLUMNS.index('extra')] = json.dumps(
+                    record.extra, ensure_ascii=False)
+                cur = self.db.execute(
+                    'INSERT OR IGNORE INTO runs (%s) VALUES (%s)'
+                    % (', '.join(RUN_COLUMNS), placeholders), values)
+                if not cur.rowcount:
+                    # Já ingerido (ex.: JSONL reprocessado)
+                    continue
+                run = cur.lastrowid
+                self.db.executemany(
+                    'INSERT INTO phases VALUES (?, ?, ?, ?)',
+                    [(run, n, s, d) for n, s, d in record.phases])
+                self.db.executemany(
+                    'INSERT INTO metrics VALUES (?, ?, ?, ?)',
+                    [(run, n, v, u) for n, (v, u) in record.metrics.items()])
+                self.db.executemany(
+                    'INSERT INTO artifacts VALUES (?, ?, ?, ?, ?)',
+                    [(run, kind, path, *self._describe(path))
+                     for kind, path in record.artifacts])
+                ids.append(run)
+        return ids
+
+    @staticmethod
+    def _describe(path):
+        try:
+            return file_hash(path), os.path.getsize(path)
+        except OSError:
+            return None, None
+
+    def ingest_jsonl(self, paths):
+        "Ingere registros gravados em JSONL por trabalhadores paralelos."
+        total = 0
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            for record in records:
+                record['phases'] = [tuple(p) for p in record['phases']]
+                record['metrics'] = {k: tuple(v) for k, v in
+                                     record['metrics'].items()}
+                record['artifacts'] = [tuple(a) for a in record['artifacts']]
+            total += len(self.append_many(records))
+        return total
+
+    def crosstab(self, by=('model', 'level', 'prompt_type'), **where):
+        """Contagens por grupo: execuções, rodou, funcional, precisa de
+        ajuste e erros por classe."""
+        for column in list(by) + list(where):
+            if column not in GROUP_COLUMNS:
+                raise ValueError('coluna inválida: %r' % column)
+        cols = ', '.join(by)
+        clauses = ' AND '.join('%s = ?' % c for c in where) or '1'
+        sql = ('SELECT %s, COUNT(*), SUM(ran), SUM(functional), '
+               'SUM(needs_adjustment), '
+               "SUM(error_class = 'sintaxe'), SUM(error_class = 'logica'), "
+               "SUM(error_class = 'alucinacao') "
+               'FROM runs WHERE %s GROUP BY %s ORDER BY %s'
+               % (cols, clauses, cols, cols))
+        header = list(by) + ['execucoes', 'rodou', 'funcional', 'ajuste',
+                             'sintaxe', 'logica', 'alucinacao']
+        rows = self.db.execute(sql, list(where.values())).fetchall()
+        n = len(by)
+        return header, [tuple('-' if v is None else v for v in r[:n])
+                        + tuple(v or 0 for v in r[n:]) for r in rows]
+
+    def metric_values(self, name, **where):
+        "Valores de uma métrica com as colunas de ``runs`` filtradas."
+        for column in where:
+            if column not in GROUP_COLUMNS:
+                raise ValueError('coluna inválida: %r' % column)
+        clauses = ''.join(' AND r.%s = ?' % c for c in where)
+        return [v for (v,) in self.db.execute(
+            'SELECT m.value FROM metrics m JOIN runs r ON r.id = m.run '
+            'WHERE m.name = ?' + clauses, [name] + list(where.values()))]
+
+    def close(self):
+        self.db.close()
+
+
+class JsonlSink:
+    """Grava registros em um JSONL por trabalhador (sem disputa pelo
+    banco); ingerir depois com ``ResultsStore.ingest_jsonl``."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, record):
+        line = json.dumps(record.to_dict(), ensure_ascii=False) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def validation_record(path, version=catalogo.DEFAULT_VERSION):
+    "Registro do estágio de simulação (verificação estática + dry-run)."
+    from avaliacao import erros, estatico, simulacao
+    record = RunRecord.for_script('simulacao', path, mnwifi_version=version)
+    start = time.time()
+    issues = estatico.check_file(path, catalogo.load(version))
+    record.phase('estatico', start, time.time() - start)
+    run = simulacao.dry_run(path, version)
+    record.phase('simulacao', start + record.phases[0][2], run.duration)
+    fatal = [i for i in issues if i.fatal]
+    record.ran = run.ok
+    record.duration = sum(p[2] for p in record.phases)
+    record.extra = {
+        'problemas': [str(i) for i in issues],
+        'simulacao': {'ok': run.ok, 'erro': run.error_type,
+                      'mensagem': run.message, 'linha': run.line,
+                      'traceback': run.traceback},
+    }
+    if fatal or not run.ok:
+        found = erros.classify(issues=issues,
+                               dry_run_traceback=run.traceback)
+        if found:
+            record.error_class = found.error_class
+            record.error_cause = found.cause
+            record.signature = found.signature
+        else:
+            record.error_cause = run.summary()
+    return record
+
+
+def _print_table(header, rows):
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    for row in [header] + rows:
+        print('  '.join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.resultados',
+        description='Repositório de resultados das execuções.')
+    parser.add_argument('--banco', default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    val = sub.add_parser('validar', help='verificação estática + simulação')
+    val.add_argument('scripts', nargs='+')
+    val.add_argument('--versao', default=catalogo.DEFAULT_VERSION)
+    ing = sub.add_parser('ingerir', help='ingere registros em JSONL')
+    ing.add_argument('arquivos', nargs='+')
+    res = sub.add_parser('resumo', help='tabela cruzada dos resultados')
+    res.add_argument('--por', nargs='+', choices=GROUP_COLUMNS,
+                     default=['model', 'level', 'prompt_type'])
+    res.add_argument('--estagio')
+    args = parser.parse_args(argv)
+    store = ResultsStore(args.banco)
+    if args.comando == 'validar':
+        records = [validation_record(p, args.versao) for p in args.scripts]
+        store.append_many(records)
+        print('%d registros' % len(records))
+    elif args.comando == 'ingerir':
+        print('%d registros' % store.ingest_jsonl(args.arquivos))
+    else:
+        where = {'stage': args.estagio} if args.estagio else {}
+        _print_table(*store.crosstab(args.por, **where))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Sessões roteirizadas no ``CLI(net)`` dos scripts interativos.
+
+O teste de fumaça do README é digitar ``sta1 ping sta2`` no prompt
+``mininet-wifi>``, e a maioria dos scripts gerados termina em
+``CLI(net)`` sugerindo comandos como ``distance sta1 ap1`` ou
+``py sta1.params['rssi']``. O executor (``avaliacao.execucao --cli``)
+roda o script num pseudoterminal e, quando o prompt aparece, digita a
+lista de comandos do cenário (``COMMANDS`` por nível ou um arquivo),
+um de cada vez, com tempo limite por comando (``Ctrl-C`` ao estourar).
+Comandos que citam nós inexistentes no script (segundo ``nodes``) são
+pulados. Numa vaga de rádios (``avaliacao.radios``), ``nodes`` lista
+APs e switches com o prefixo da vaga (``mn3_ap1``): o prefixo é
+descartado na comparação e os comandos digitados usam os nomes
+traduzidos. Ao final, ``exit`` encerra o CLI; scripts sem CLI terminam
+sozinhos e são tratados como os de lote.
+
+Cada comando vai para o registro com a latência até o prompt voltar e
+se a resposta indica erro.
+"""
+
+import os
+import pty
+import re
+import select
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+from avaliacao import cenarios
+
+PROMPT_RE = re.compile(r'mininet(?:-wifi)?> $')
+ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]|\x1b[=>]')
+NODE_RE = re.compile(r'(?<![\w.-])((?:sta|ap|car|h|s|c|r)\d+)(?![\w])')
+ERROR_RE = re.compile(r'^\*\*\* (?:Unknown command|Error)|Traceback|'
+                      r'\b[A-Z]\w*(?:Error|Exception)\b|No such', re.M)
+
+# Comandos por nível (``cenarios.LEVELS``), na linha do teste do README
+COMMANDS = {
+    'basico': ['sta1 ping -c 3 sta2', 'distance sta1 ap1',
+               "py sta1.params['rssi']"],
+    'intermed': ['pingall', 'distance sta1 ap1', "py sta1.params['rssi']",
+                 'sta1 iw dev sta1-wlan0 link'],
+    'avancado': ['pingall', 'iperf sta1 sta2', 'distance sta1 ap1',
+                 "py sta1.params['rssi']"],
+}
+DEFAULT_COMMANDS = ['pingall']
+
+COMMAND_TIMEOUT = 30.0
+EXIT_TIMEOUT = 60.0
+
+
+def load_commands(path):
+    "Comandos de um arquivo, um por linha (``#`` comenta)."
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith('#')]
+
+
+def clean(text):
+    return ANSI_RE.sub('', text).replace('\r', '')
+
+
+@dataclass
+class CommandResult:
+    "Resposta de um comando digitado no CLI."
+    command: str
+    output: str = ''
+    started: float = None
+    latency: float = None
+    timed_out: bool = False
+    skipped: bool = False
+
+    @property
+    def error(self):
+        return self.timed_out or bool(ERROR_RE.search(self.output))
+
+    def to_dict(self):
+        return {'comando': self.command, 'latencia': self.latency,
+                'tempo_limite': self.timed_out, 'pulado': self.skipped,
+                'erro': not self.skipped and self.error}
+
+
+class Terminal:
+    "Leitura do pseudoterminal até o prompt, com cópia para o log."
+
+    def __init__(self, fd, log):
+        self.fd = fd
+        self.log = log
+        self.eof = False
+
+    def read_until_prompt(self, deadline):
+        "Texto lido e se o prompt apareceu antes do prazo (ou do fim)."
+        chunks = []
+        tail = ''
+        while not self.eof:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                break
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:
+                data = b''
+            if not data:
+                self.eof = True
+                break
+            text = clean(data.decode('utf-8', errors='replace'))
+            self.log.write(text)
+            chunks.append(text)
+            tail = (tail + text)[-64:]
+            if PROMPT_RE.search(tail):
+                return ''.join(chunks), True
+        return ''.join(chunks), False
+
+    def send(self, line):
+        os.write(self.fd, line.encode() + b'\n')
+
+
+def _response(command, text):
+    "Resposta sem o eco do comando e sem o prompt."
+    text = PROMPT_RE.sub('', text).rstrip()
+    lines = text.split('\n')
+    if lines and lines[0].strip().endswith(command):
+        lines = lines[1:]
+    return '\n'.join(lines).strip()
+
+
+def parse_nodes(text, prefix=None):
+    "Nós listados pelo comando ``nodes`` do CLI, sem o prefixo da vaga."
+    text = text.split('available nodes are:', 1)[-1]
+    if prefix:
+        text = re.sub(r'(?<![\w.-])%s' % re.escape(prefix), '', text)
+    return set(NODE_RE.findall(text))
+
+
+@dataclass
+class SessionResult:
+    "Saída do script e comandos digitados na sessão."
+    output: str
+    returncode: int
+    timed_out: bool
+    pid: int
+    prompt: float = None
+    commands: list = field(default_factory=list)
+
+
+class Session:
+    "Roteiro de comandos para o CLI, por nível ou fixo."
+
+    def __init__(self, commands=None, command_timeout=COMMAND_TIMEOUT):
+        self.commands = commands
+        self.command_timeout = command_timeout
+
+    def commands_for(self, script):
+        if self.commands is not None:
+            return list(self.commands)
+        parsed = cenarios.parse_script_path(script)
+        return list(COMMANDS.get(parsed[0] if parsed else None,
+                                 DEFAULT_COMMANDS))
+
+    def drive(self, argv, path, script, timeout, kill, names=None):
+        """Roda ``argv`` num pseudoterminal com a saída em ``path`` e digita
+        os comandos do script no CLI; ``kill(proc)`` encerra o grupo e
+        ``names()``, numa vaga de rádios, devolve o ``radios.NameMap``
+        da execução."""
+        start = time.time()
+        deadline = start + timeout
+        master, slave = pty.openpty()
+        # ``setsid -c`` faz do pseudoterminal o terminal de controle (o
+        # ``Ctrl-C`` chega ao script) e, como ``start_new_session``, põe o
+        # script numa sessão própria com o grupo igual ao pid
+        ctty = shutil.which('setsid')
+        if ctty:
+            argv = [ctty, '-c'] + list(argv)
+        with open(path, 'w', encoding='utf-8', errors='replace') as log:
+            proc = subprocess.Popen(
+                argv, stdin=slave, stdout=slave, stderr=slave,
+                cwd=os.path.dirname(script), start_new_session=not ctty)
+            os.close(slave)
+            terminal = Terminal(master, log)
+            result = SessionResult('', None, False, proc.pid)
+            try:
+                _, prompt = terminal.read_until_prompt(deadline)
+                if prompt:
+                    result.prompt = time.time() - start
+                    self._script(terminal, script, deadline, result,
+                                 names and names())
+                    terminal.send('exit')
+                # Saída restante e encerramento da rede
+                while not terminal.eof and time.time() < deadline:
+                    terminal.read_until_prompt(deadline)
+                result.returncode = proc.wait(
+                    max(1.0, min(EXIT_TIMEOUT, deadline - time.time())))
+            except subprocess.TimeoutExpired:
+                result.timed_out = True
+                kill(proc)
+            finally:
+                os.close(master)
+        with open(path, encoding='utf-8', errors='replace') as log:
+            result.output = log.read()
+        return result
+
+    def _script(self, terminal, script, deadline, result, names=None):
+        terminal.send('nodes')
+        text, _ = terminal.read_until_prompt(
+            min(deadline, time.time() + self.command_timeout))
+        nodes = parse_nodes(text, names and names.prefix)
+        for command in self.commands_for(script):
+            entry = CommandResult(command)
+            result.commands.append(entry)
+            if terminal.eof or (
+                    nodes and not set(NODE_RE.findall(command)) <= nodes):
+                # Script encerrado ou nó que ele não criou
+                entry.skipped = True
+                continue
+            if time.time() >= deadline:
+                entry.timed_out = True
+                continue
+            typed = names.rewrite(command) if names else command
+            entry.started = time.time()
+            terminal.send(typed)
+            text, prompt = terminal.read_until_prompt(
+                min(deadline, entry.started + self.command_timeout))
+            entry.latency = time.time() - entry.started
+            entry.output = _response(typed, text)
+            if not prompt:
+                entry.timed_out = True
+                if terminal.eof:
+                    continue
+                # Ctrl-C interrompe o comando e devolve o prompt
+                os.write(terminal.fd, b'\x03')
+                terminal.read_until_prompt(min(deadline, time.time() + 5))
+
+
+def attach(record, result):
+    "Comandos da sessão como fases, métricas e ``extra['cli']``."
+    record.extra['cli'] = {
+        'prompt': result.prompt,
+        'comandos': [c.to_dict() for c in result.commands]}
+    executed = [c for c in result.commands if not c.skipped]
+    for entry in executed:
+        if entry.latency is not None:
+            record.phase('cli:%s' % entry.command, entry.started,
+                         entry.latency)
+    if result.prompt is not None:
+        record.metrics['cli_prompt'] = (result.prompt, 's')
+    if executed:
+        record.metrics['cli_comandos'] = (len(executed), 'comandos')
+        record.metrics['cli_erros'] = (
+            sum(1 for c in executed if c.error), 'comandos')
+        latencies = [c.latency for c in executed if c.latency is not None]
+        if latencies:
+            record.metrics['cli_latencia_max'] = (max(latencies), 's')
@@ -0,0 +1,322 @@
+"""
+Índice de similaridade de código entre os scripts gerados.
+
+Cada script vira uma sequência de rótulos da AST normalizada (nomes de
+variáveis anonimizados; nomes importados, atributos, argumentos
+nomeados e tipos de constantes preservados), da qual se extraem
+shingles de ``SHINGLE`` rótulos consecutivos. A assinatura MinHash
+(``PERMUTATIONS`` funções multiply-shift, vetorizadas com NumPy) é
+dividida em ``BANDS`` faixas para LSH: scripts que coincidem em alguma
+faixa são candidatos, e a similaridade de Jaccard é estimada pela
+fração de posições iguais da assinatura. A busca por vizinhos não
+compara o script com todo o corpus.
+
+``repeticoes`` mede o reaproveitamento de trechos prontos (o dicionário
+``station_config``, o laço de ``iw dev ... link``, os banners de
+``info()``): conta em quantos scripts e modelos aparece cada instrução
+com a mesma AST normalizada.
+
+Exemplo::
+
+    python3 -m avaliacao.similaridade indexar scripts
+    python3 -m avaliacao.similaridade vizinhos scripts/basico/d_claud.py
+"""
+
+import argparse
+import ast
+import hashlib
+import os
+import sqlite3
+import sys
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from avaliacao import cenarios, resultados
+
+DEFAULT_PATH = os.path.join(resultados.DEFAULT_DIR, 'similaridade.sqlite')
+
+SHINGLE = 6
+PERMUTATIONS = 128
+BANDS = 32
+SEED = 1
+# Instruções menores que isso não contam como trecho reaproveitado
+MIN_STATEMENT_NODES = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    model TEXT,
+    hash TEXT NOT NULL,
+    shingles INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    script INTEGER NOT NULL,
+    PRIMARY KEY (band, key, script)
+) WITHOUT ROWID;
+"""
+
+
+def imported_names(tree):
+    "Nomes vindos de imports (preservados na normalização)."
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split('.')[0])
+    return names
+
+
+def labels(node, keep):
+    "Rótulos da AST em pré-ordem, com nomes locais anonimizados."
+    out = []
+
+    def visit(node):
+        if isinstance(node, ast.Name):
+            out.append('Name:' + node.id if node.id in keep else 'Name')
+        elif isinstance(node, ast.Attribute):
+            out.append('Attr:' + node.attr)
+        elif isinstance(node, ast.keyword):
+            out.append('kw:%s' % node.arg)
+        elif isinstance(node, ast.Constant):
+            out.append('Const:' + type(node.value).__name__)
+        elif isinstance(node, (ast.expr_context, ast.Load)):
+            return
+        else:
+            out.append(type(node).__name__)
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(node)
+    return out
+
+
+def shingles(tokens, size=SHINGLE):
+    "Hashes (32 bits) dos shingles de ``size`` rótulos."
+    joined = ['\x1f'.join(tokens[i:i + size])
+              for i in range(max(1, len(tokens) - size + 1))]
+    return np.unique(np.fromiter((zlib.crc32(s.encode()) for s in joined),
+                                 dtype=np.uint64, count=len(joined)))
+
+
+class MinHasher:
+    "Família multiply-shift: h(x) = ((a·x + b) mod 2^64) >> 32, a ímpar."
+
+    def __init__(self, permutations=PERMUTATIONS, seed=SEED):
+        rng = np.random.default_rng(seed)
+        high = np.iinfo(np.uint64).max
+        self.a = rng.integers(1, high, size=permutations, dtype=np.uint64,
+                              endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, high, size=permutations, dtype=np.uint64,
+                              endpoint=True)
+
+    def signature(self, hashes):
+        if not len(hashes):
+            return np.full(len(self.a), 2 ** 32 - 1, dtype=np.uint32)
+        with np.errstate(over='ignore'):
+            values = (self.a[:, None] * hashes[None, :]
+                      + self.b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature, bands=BANDS):
+    rows = len(signature) // bands
+    return [hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(),
+                            digest_size=8).hexdigest()
+            for i in range(bands)]
+
+
+def similarity(sig1, sig2):
+    "Jaccard estimado pela fração de posições iguais das assinaturas."
+    return float(np.mean(sig1 == sig2))
+
+
+def fingerprint(source):
+    "Rótulos normalizados de um script (``None`` se não compila)."
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    return labels(tree, imported_names(tree))
+
+
+class SimilarityIndex:
+    "Assinaturas MinHash e faixas LSH persistidas em SQLite."
+
+    def __init__(self, path=DEFAULT_PATH, bands=BANDS,
+                 permutations=PERMUTATIONS):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.bands = bands
+        self.hasher = MinHasher(permutations)
+
+    def signature_of(self, source):
+        tokens = fingerprint(source)
+        if tokens is None:
+            return None, 0
+        hashes = shingles(tokens)
+        return self.hasher.signature(hashes), len(hashes)
+
+    def add(self, path):
+        "Indexa (ou reindexa, se mudou) um script; devolve se indexou."
+        path = os.path.abspath(path)
+        source = cenarios.read_text(path)
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        row = self.db.execute('SELECT id, hash FROM scripts WHERE path = ?',
+                              (path,)).fetchone()
+        if row and row[1] == digest:
+            return False
+        signature, count = self.signature_of(source)
+        if signature is None:
+            return False
+        parsed = cenarios.parse_script_path(path)
+        with self.db:
+            if row:
+                self.db.execute('DELETE FROM buckets WHERE script = ?',
+                                (row[0],))
+                self.db.execute('DELETE FROM scripts WHERE id = ?', (row[0],))
+            cur = self.db.execute(
+                'INSERT INTO scripts (path, model, hash, shingles, signature) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (path, parsed[2] if parsed else None, digest, count,
+                 signature.tobytes()))
+            self.db.executemany(
+                'INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)',
+                [(band, key, cur.lastrowid) for band, key in
+                 enumerate(band_keys(signature, self.bands))])
+        return True
+
+    def _signature(self, blob):
+        return np.frombuffer(blob, dtype=np.uint32)
+
+    def neighbors(self, source, k=10, exclude=None):
+        """Scripts mais parecidos com ``source`` entre os candidatos LSH:
+        ``[(similaridade, caminho)]``."""
+        signature, _ = self.signature_of(source)
+        if signature is None:
+            return []
+        keys = band_keys(signature, self.bands)
+        clause = ' OR '.join('(b.band = ? AND b.key = ?)' for _ in keys)
+        params = [v for pair in enumerate(keys) for v in pair]
+        rows = self.db.execute(
+            'SELECT DISTINCT s.path, s.signature FROM buckets b '
+            'JOIN scripts s ON s.id = b.script WHERE ' + clause,
+            params).fetchall()
+        found = [(similarity(signature, self._signature(blob)), path)
+                 for path, blob in rows if path != exclude]
+        return sorted(found, reverse=True)[:k]
+
+    def duplicates(self, threshold=0.8):
+        "Pares com similaridade estimada ≥ ``threshold`` (via faixas LSH)."
+        pairs = self.db.execute(
+            'SELECT DISTINCT a.script, b.script FROM buckets a '
+            'JOIN buckets b ON a.band = b.band AND a.key = b.key '
+            'AND a.script < b.script').fetchall()
+        signatures = {sid: (path, self._signature(blob)) for sid, path, blob
+                      in self.db.execute(
+                          'SELECT id, path, signature FROM scripts')}
+        found = []
+        for a, b in pairs:
+            score = similarity(signatures[a][1], signatures[b][1])
+            if score >= threshold:
+                found.append((score, signatures[a][0], signatures[b][0]))
+        return sorted(found, reverse=True)
+
+    def close(self):
+        self.db.close()
+
+
+def repeated_statements(paths, min_scripts=3):
+    """Instruções (com a AST normalizada idêntica) que aparecem em pelo
+    menos ``min_scripts`` scripts: ``[(scripts, modelos, exemplo)]``."""
+    seen = defaultdict(set)
+    example = {}
+    for path in paths:
+        source = cenarios.read_text(path)
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            continue
+        keep = imported_names(tree)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.stmt) or isinstance(
+                    node, (ast.FunctionDef, ast.ClassDef, ast.Module)):
+                continue
+            tokens = labels(node, keep)
+            if len(tokens) < MIN_STATEMENT_NODES:
+                continue
+            key = hashlib.sha1('\x1f'.join(tokens).encode()).digest()
+            seen[key].add(path)
+            if key not in example:
+                segment = ast.get_source_segment(source, node) or ''
+                example[key] = (segment.splitlines() or [''])[0].strip()
+    found = []
+    for key, scripts in seen.items():
+        if len(scripts) < min_scripts:
+            continue
+        models = {p[2] for p in map(cenarios.parse_script_path, scripts)
+                  if p}
+        found.append((len(scripts), len(models), example[key]))
+    return sorted(found, reverse=True)
+
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from cenarios.generated_scripts(path)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.similaridade',
+        description='Índice de similaridade entre scripts (MinHash/LSH).')
+    parser.add_argument('--banco', default=DEFAULT_PATH)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    idx = sub.add_parser('indexar', help='indexa scripts ou diretórios')
+    idx.add_argument('caminhos', nargs='+')
+    near = sub.add_parser('vizinhos', help='scripts mais parecidos')
+    near.add_argument('script')
+    near.add_argument('--k', type=int, default=10)
+    dup = sub.add_parser('duplicados', help='pares quase duplicados')
+    dup.add_argument('--limiar', type=float, default=0.8)
+    rep = sub.add_parser('repeticoes', help='trechos reaproveitados')
+    rep.add_argument('caminhos', nargs='+')
+    rep.add_argument('--min-scripts', type=int, default=3)
+    rep.add_argument('--max', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'repeticoes':
+        found = repeated_statements(list(_expand(args.caminhos)),
+                                    args.min_scripts)
+        for scripts, models, text in found[:args.max]:
+            print('%4d scripts %2d modelos  %s' % (scripts, models, text))
+        return 0
+    index = SimilarityIndex(args.banco)
+    if args.comando == 'indexar':
+        count = sum(index.add(p) for p in _expand(args.caminhos))
+        print('%d scripts indexados' % count)
+    elif args.comando == 'vizinhos':
+        source = cenarios.read_text(args.script)
+        for score, path in index.neighbors(
+                source, args.k, exclude=os.path.abspath(args.script)):
+            print('%.3f  %s' % (score, os.path.relpath(path)))
+    else:
+        for score, a, b in index.duplicates(args.limiar):
+            print('%.3f  %s  %s' % (score, os.path.relpath(a),
+                                    os.path.relpath(b)))
+    index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
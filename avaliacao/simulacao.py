@@ -0,0 +1,437 @@
+"""
+Execução simulada (dry-run) de um script gerado, sem Mininet-WiFi.
+
+O script roda em um processo filho com módulos ``mininet`` e
+``mn_wifi`` substitutos construídos a partir do catálogo de APIs:
+imports inexistentes falham com ``ImportError``, argumentos rejeitados
+pelo construtor do ``Mininet_wifi`` levantam ``TypeError`` e métodos
+inventados levantam ``AttributeError``, como na biblioteca real.
+Nenhuma interface é criada e nenhum privilégio é necessário.
+
+``time.sleep`` avança um relógio virtual em vez de esperar; quando o
+relógio passa do horizonte configurado a simulação é encerrada com
+sucesso, o que cobre laços de monitoramento infinitos. Comandos de
+shell (``os.system``, ``subprocess``) não são executados.
+
+Exemplo::
+
+    python3 -m avaliacao.simulacao scripts/basico/d_claud.py
+"""
+
+import argparse
+import importlib.abc
+import importlib.machinery
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import types
+from dataclasses import asdict, dataclass
+
+from avaliacao import catalogo
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_HORIZON = 600.0
+
+_RESULT_ENV = 'AVALIACAO_SIMULACAO_RESULTADO'
+
+
+@dataclass
+class DryRun:
+    "Resultado da execução simulada."
+    ok: bool
+    error_type: str = ''
+    message: str = ''
+    line: int = 0
+    traceback: str = ''
+    horizon: bool = False
+    timeout: bool = False
+    duration: float = 0.0
+
+    def summary(self):
+        if self.ok:
+            return 'ok'
+        if self.timeout:
+            return 'o script não terminou (timeout)'
+        where = ' (linha %d)' % self.line if self.line else ''
+        return '%s: %s%s' % (self.error_type, self.message, where)
+
+
+class HorizonReached(BaseException):
+    "Relógio virtual passou do horizonte; fora de ``except Exception``."
+
+
+# ---------------------------------------------------------------------
+# Objetos substitutos (executados no processo filho)
+
+class _Params(dict):
+    "``params`` dos nós: chaves ausentes viram objetos permissivos."
+
+    def __missing__(self, key):
+        return Permissive(key)
+
+
+class Permissive:
+    """Objeto que aceita qualquer atributo ou chamada; usado para nós,
+    interfaces e valores cujo comportamento não importa na simulação."""
+
+    def __init__(self, name='obj', *args, **params):
+        self.name = name
+        self.params = _Params(params)
+        self.args = args
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return Permissive(attr)
+
+    def __call__(self, *args, **kwargs):
+        return Permissive(self.name)
+
+    def cmd(self, *args, **kwargs):
+        return ''
+
+    def cmdPrint(self, *args, **kwargs):
+        return ''
+
+    def popen(self, *args, **kwargs):
+        return _FakePopen()
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __getitem__(self, key):
+        return Permissive(str(key))
+
+    def __str__(self):
+        return str(self.name)
+
+    __repr__ = __str__
+
+    def __format__(self, spec):
+        try:
+            return format(0, spec)
+        except ValueError:
+            return format(str(self), spec)
+
+    def __int__(self):
+        return 0
+
+    def __float__(self):
+        return 0.0
+
+    def __index__(self):
+        return 0
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return id(self)
+
+    def __lt__(self, other):
+        return False
+
+    __gt__ = __le__ = __ge__ = __lt__
+
+    def __add__(self, other):
+        return self
+
+    __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = __add__
+    __truediv__ = __rtruediv__ = __floordiv__ = __mod__ = __add__
+
+
+class _FakePopen:
+    returncode = 0
+    pid = 0
+    stdout = stderr = None
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def communicate(self, *args, **kwargs):
+        return b'', b''
+
+    def wait(self, *args, **kwargs):
+        return 0
+
+    def poll(self):
+        return 0
+
+    def kill(self):
+        pass
+
+    terminate = kill
+
+
+def _check_kwargs(label, entry, kwargs):
+    "Reproduz o ``TypeError`` de argumentos nomeados não aceitos."
+    if entry is None or 'params' not in entry or entry.get('varkw'):
+        return
+    params = set(entry['params'])
+    for key in kwargs:
+        if key not in params:
+            raise TypeError("%s() got an unexpected keyword argument '%s'"
+                            % (label, key))
+
+
+_NODE_LISTS = {
+    'addStation': 'stations', 'addCar': 'stations', 'addSensor': 'stations',
+    'addModem': 'stations', 'addAccessPoint': 'aps',
+    'addApSensor': 'aps', 'addSwitch': 'switches', 'addHost': 'hosts',
+    'addController': 'controllers', 'addLink': 'links', 'addNAT': 'hosts',
+}
+
+
+def _make_class(catalog, qualname, entry):
+    "Classe substituta para uma entrada ``class`` do catálogo."
+    name = qualname.rpartition('.')[2]
+    methods = entry.get('methods')
+
+    def __init__(self, *args, **kwargs):
+        _check_kwargs('__init__', entry, kwargs)
+        self.name = args[0] if args and isinstance(args[0], str) else name
+        self.params = _Params(kwargs)
+        self.nameToNode = {}
+        for attr in set(_NODE_LISTS.values()):
+            setattr(self, attr, [])
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if methods is None:
+            return Permissive(attr)
+        method = methods.get(attr)
+        if method is None:
+            raise AttributeError("'%s' object has no attribute '%s'"
+                                 % (name, attr))
+        if method.get('kind') == 'value':
+            return []
+        return lambda *args, **kwargs: _call_method(self, attr, method,
+                                                    args, kwargs)
+
+    attrs = {'__init__': __init__, '__getattr__': __getattr__,
+             '__module__': qualname.rpartition('.')[0],
+             '_catalog_entry': entry}
+    return type(name, (object,), attrs)
+
+
+def _call_method(obj, attr, entry, args, kwargs):
+    _check_kwargs(attr, entry, kwargs)
+    if attr in _NODE_LISTS:
+        node_name = args[0] if args and isinstance(args[0], str) else \
+            kwargs.get('name', attr)
+        node = Permissive(node_name, **kwargs)
+        getattr(obj, _NODE_LISTS[attr]).append(node)
+        if attr != 'addLink':
+            obj.nameToNode[node_name] = node
+        return node
+    if attr in ('get', 'getNodeByName'):
+        found = [obj.nameToNode.get(n, Permissive(n)) for n in args]
+        return found[0] if len(found) == 1 else found
+    if attr in ('pingAll', 'ping'):
+        return 0.0
+    if attr in ('pingFull', 'pingAllFull'):
+        # Lista de (origem, destino, (enviados, recebidos, rtts...))
+        return []
+    if attr == 'iperf':
+        return ['0 Mbits/sec', '0 Mbits/sec']
+    return Permissive(attr)
+
+
+class _StubModule(types.ModuleType):
+    "Módulo substituto: nomes do catálogo ou ``AttributeError``."
+
+    def __init__(self, name, catalog):
+        super().__init__(name)
+        self.__path__ = []
+        self._catalog = catalog
+        self._cache = {}
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if attr in self._cache:
+            return self._cache[attr]
+        qualname = '%s.%s' % (self.__name__, attr)
+        entry = self._catalog.lookup(qualname)
+        if entry is None:
+            if self._catalog.exhaustive(self.__name__):
+                raise AttributeError("module '%s' has no attribute '%s'"
+                                     % (self.__name__, attr))
+            value = Permissive(attr)
+        elif entry.get('kind') == 'class':
+            value = _make_class(self._catalog, qualname, entry)
+        elif entry.get('kind') == 'function':
+            value = _make_function(attr, entry)
+        else:
+            value = Permissive(attr)
+        self._cache[attr] = value
+        return value
+
+
+def _make_function(name, entry):
+    def function(*args, **kwargs):
+        _check_kwargs(name, entry, kwargs)
+        if name in ('info', 'output', 'warn', 'warning', 'error'):
+            sys.stdout.write(' '.join(str(a) for a in args))
+        return None
+    function.__name__ = name
+    return function
+
+
+class StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    "Responde aos imports de ``mininet``/``mn_wifi`` com módulos substitutos."
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def find_spec(self, fullname, path=None, target=None):
+        if not self.catalog.tracked(fullname):
+            return None
+        if not self.catalog.has_module(fullname):
+            return None
+        return importlib.machinery.ModuleSpec(fullname, self,
+                                              is_package=True)
+
+    def create_module(self, spec):
+        return _StubModule(spec.name, self.catalog)
+
+    def exec_module(self, module):
+        pass
+
+
+class VirtualClock:
+    "Relógio que avança com ``sleep`` sem esperar."
+
+    def __init__(self, horizon):
+        self.now = time.time()
+        self.start = self.now
+        self.horizon = horizon
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, float(seconds))
+        if self.now - self.start > self.horizon:
+            raise HorizonReached()
+
+
+def _install(catalog, horizon):
+    sys.meta_path.insert(0, StubFinder(catalog))
+    clock = VirtualClock(horizon)
+    time.sleep = clock.sleep
+    time.time = clock.time
+    os.system = lambda command: 0
+    os.popen = lambda *args, **kwargs: __import__('io').StringIO('')
+    subprocess.Popen = _FakePopen
+    subprocess.call = subprocess.check_call = lambda *a, **k: 0
+    subprocess.check_output = lambda *a, **k: b''
+    subprocess.getoutput = lambda *a, **k: ''
+    subprocess.run = lambda *a, **k: subprocess.CompletedProcess(a, 0, b'',
+                                                                 b'')
+    import builtins
+    builtins.input = lambda *args: ''
+
+
+def _script_line(tb, script):
+    for frame in reversed(traceback.extract_tb(tb)):
+        if os.path.abspath(frame.filename) == script:
+            return frame.lineno
+    return 0
+
+
+def _child(script, version, horizon):
+    "Ponto de entrada do processo filho."
+    import runpy
+    script = os.path.abspath(script)
+    _install(catalogo.load(version), horizon)
+    result = DryRun(ok=True)
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except HorizonReached:
+        result.horizon = True
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            result = DryRun(ok=False, error_type='SystemExit',
+                            message=str(exc.code))
+    except BaseException as exc:  # pylint: disable=broad-except
+        result = DryRun(ok=False, error_type=type(exc).__name__,
+                        message=str(exc),
+                        line=(getattr(exc, 'lineno', 0)
+                              if isinstance(exc, SyntaxError)
+                              else _script_line(exc.__traceback__, script)),
+                        traceback=traceback.format_exc())
+    with open(os.environ[_RESULT_ENV], 'w', encoding='utf-8') as f:
+        json.dump(asdict(result), f)
+    sys.stdout.flush()
+    # Threads de monitoramento deixadas pelo script não devem segurar o fim
+    os._exit(0)
+
+
+def dry_run(script, version=catalogo.DEFAULT_VERSION,
+            timeout=DEFAULT_TIMEOUT, horizon=DEFAULT_HORIZON):
+    "Executa o script simulado em um processo filho e devolve ``DryRun``."
+    start = time.monotonic()
+    script = os.path.abspath(script)
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, **{_RESULT_ENV: result_path})
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(
+        p for p in (root, env.get('PYTHONPATH')) if p)
+    cmd = [sys.executable, '-m', 'avaliacao.simulacao', '--filho',
+           '--versao', version, '--horizonte', str(horizon), script]
+    try:
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, timeout=timeout, check=False,
+                       cwd=os.path.dirname(script))
+        with open(result_path, encoding='utf-8') as f:
+            text = f.read()
+        result = DryRun(**json.loads(text)) if text else \
+            DryRun(ok=False, error_type='Crash',
+                   message='processo encerrado sem resultado')
+    except subprocess.TimeoutExpired:
+        result = DryRun(ok=False, timeout=True, error_type='Timeout',
+                        message='excedeu %.0fs' % timeout)
+    finally:
+        os.unlink(result_path)
+    result.duration = time.monotonic() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m avaliacao.simulacao',
+        description='Executa scripts sem Mininet-WiFi, com módulos '
+                    'substitutos gerados a partir do catálogo.')
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--versao', default=catalogo.DEFAULT_VERSION)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--horizonte', type=float, default=DEFAULT_HORIZON,
+                        help='segundos virtuais antes de encerrar')
+    parser.add_argument('--filho', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.filho:
+        _child(args.scripts[0], args.versao, args.horizonte)
+    failed = 0
+    for path in args.scripts:
+        result = dry_run(path, args.versao, args.timeout, args.horizonte)
+        failed += not result.ok
+        print('%s: %s (%.2fs)' % (path, result.summary(), result.duration))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())